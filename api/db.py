@@ -1,7 +1,21 @@
 import sqlite3
+import time
 from pathlib import Path
+from typing import Any, Optional
 
-from utils.db_schema import DB_SCHEMA
+from utils.categories import backfill_category_ids, interests_mask, seed_categories
+from utils.db_schema import DB_COLUMN_MIGRATIONS, DB_SCHEMA
+from utils.metrics import record_fetch, record_query
+from utils.query_stats import (
+    SLOW_QUERY_MS,
+    StatementStats,
+    log_slow_statement,
+    statement_stats,
+)
+from utils.request_context import shared_connection
+from utils.schedule import normalize_event_times
+from utils.skills import backfill_user_skills
+from utils.user_search import backfill_user_trigrams
 
 DATABASE_PATH = Path(__file__).resolve().parent / "app.db"
 
@@ -14,17 +28,160 @@ def init_db() -> None:
     """
     with sqlite3.connect(DATABASE_PATH, check_same_thread=False) as conn:
         conn.execute("PRAGMA foreign_keys = ON;")
+        added = _add_missing_columns(conn)
         conn.executescript(DB_SCHEMA)
+        seed_categories(conn)
+        backfill_category_ids(conn)
+        if ("users", "interests_mask") in added:
+            _backfill_interests_masks(conn)
+        if ("events", "effective_end") in added:
+            normalize_event_times(conn)
+        backfill_user_trigrams(conn)
+        backfill_user_skills(conn)
         conn.commit()
 
 
-def get_connection():
+def _add_missing_columns(conn: sqlite3.Connection) -> list[tuple[str, str]]:
+    """
+    Add columns from ``DB_COLUMN_MIGRATIONS`` to tables created by an older schema.
+
+    Tables that do not exist yet are skipped, ``DB_SCHEMA`` creates them with every column.
+    Returns the ``(table, column)`` pairs that were added, so callers can backfill them.
+    """
+    added = []
+    for table, column, definition in DB_COLUMN_MIGRATIONS:
+        # table_xinfo, unlike table_info, also lists generated columns
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+        if existing and column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            added.append((table, column))
+    return added
+
+
+def _backfill_interests_masks(conn: sqlite3.Connection) -> None:
+    """Compute ``users.interests_mask`` from ``user_interests`` for existing users."""
+    rows = conn.execute("SELECT user_id, category FROM user_interests").fetchall()
+    categories: dict[int, list[str]] = {}
+    for user_id, category in rows:
+        categories.setdefault(user_id, []).append(category)
+    conn.executemany(
+        "UPDATE users SET interests_mask = ? WHERE user_id = ?",
+        [(interests_mask(values), user_id) for user_id, values in categories.items()],
+    )
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor reporting its statements to ``utils.metrics`` and ``utils.query_stats``.
+
+    A statement's latency is measured up to its first row; later ``fetchone``/
+    ``fetchmany``/``fetchall`` calls add to its total time and row count, and can still
+    push it over the slow-query threshold. Rows read by iterating over the cursor are
+    not timed or counted.
+    """
+
+    _stats: Optional[StatementStats] = None
+    _sql = ""
+    _parameters: Any = None
+    _elapsed = 0.0
+    _slow_logged = False
+
+    def execute(self, sql, parameters=(), /):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._executed(sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._executed(sql, None, time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(time.perf_counter() - start, len(rows))
+        return rows
+
+    def _executed(self, sql: str, parameters: Any, seconds: float) -> None:
+        record_query(seconds)
+        self._stats = statement_stats(sql)
+        self._stats.record(seconds)
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = seconds
+        self._slow_logged = False
+        self._check_slow()
+
+    def _fetched(self, seconds: float, rows: int) -> None:
+        record_fetch(seconds)
+        if self._stats is None:
+            return
+        self._stats.record_fetch(seconds, rows)
+        self._elapsed += seconds
+        self._check_slow()
+
+    def _check_slow(self) -> None:
+        if not self._slow_logged and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            self._slow_logged = True
+            log_slow_statement(
+                self.connection, self._stats, self._sql, self._parameters, self._elapsed
+            )
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the implicit ones, are ``InstrumentedCursor``."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect() -> sqlite3.Connection:
+    """
+    Open a new connection configured the same way as the request-scoped one.
+
+    Useful for work that outlives the request, such as streaming responses, where
+    the connection yielded by ``get_connection`` is already closed.
+    """
     # the check_same_thread prevents a common issue where sqlite flags the fact
     # that the connection is being used across multiple threads
     # (which can happen in a web server context)
-    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+    conn = sqlite3.connect(
+        DATABASE_PATH, check_same_thread=False, factory=InstrumentedConnection
+    )
     conn.execute("PRAGMA foreign_keys = ON;")
     conn.row_factory = sqlite3.Row
+    return conn
+
+
+def get_connection():
+    shared = shared_connection.get()
+    if shared is not None:
+        # a sub-request of a batch, which owns and closes the connection
+        yield shared
+        return
+    conn = connect()
     try:
         yield conn
     finally:
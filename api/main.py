@@ -1,17 +1,33 @@
 import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from db import init_db
+from db import connect, init_db
 from routes.auth import router as auth_router
+from routes.batch import router as batch_router
+from routes.debug import has_debug_access, router as debug_router
+from routes.deletion_jobs import router as deletion_jobs_router
 from routes.event_registrations import router as event_registrations_router
 from routes.events import router as events_router
+from routes.metrics import router as metrics_router
+from routes.me import router as me_router
 from routes.organization import router as organization_router
 from routes.roles import router as roles_router
 from routes.users import router as users_router
+from utils.deletion_jobs import deletion_worker
 from utils.logger import get_logger, setup_logging
+from utils.metrics import MetricsMiddleware
+from utils.profiling import ProfilingMiddleware, attribute_endpoints
+from utils.revocation import load_revocations
+from utils.sessions import SessionCheckpointer, session_store
+from utils.security import (
+    PasswordHasherBusy,
+    calibrate_bcrypt_rounds,
+    shutdown_password_pool,
+)
 
 setup_logging()
 logger = get_logger(__name__)
@@ -26,7 +42,20 @@ async def lifespan(app: FastAPI):
     otherwise without a DB connection the server is useless.
     """
     init_db()
+    conn = connect()
+    try:
+        load_revocations(conn)
+        session_store.load(conn)
+    finally:
+        conn.close()
+    calibrate_bcrypt_rounds()
+    session_checkpointer = SessionCheckpointer(connect)
+    session_checkpointer.start()
+    deletion_worker.start()
     yield
+    deletion_worker.stop()
+    session_checkpointer.stop()
+    shutdown_password_pool()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -49,10 +78,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type"],
+    # pagination metadata sent alongside list responses
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
 logger.info(f"CORS configured with allowed origins: {_allowed_origins}")
 
+# profiles requests sent with X-Profile and a valid X-Debug-Token, or a sampled share
+app.add_middleware(ProfilingMiddleware, authorize=has_debug_access)
+
+# added last so it is the outermost middleware and times whole requests
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """
+    The bcrypt pool is saturated (e.g. during a login storm). Shed the request right
+    away rather than letting it queue up behind the others.
+    """
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication is busy, please try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 
 # Helper/demo endpoints below
 @app.get("/api")
@@ -67,8 +118,15 @@ async def check():
 
 # include nested routers here
 app.include_router(auth_router, prefix="/api")
+app.include_router(me_router, prefix="/api")
 app.include_router(users_router, prefix="/api")
 app.include_router(organization_router, prefix="/api")
 app.include_router(events_router, prefix="/api")
 app.include_router(event_registrations_router, prefix="/api")
 app.include_router(roles_router, prefix="/api")
+app.include_router(debug_router, prefix="/api")
+app.include_router(deletion_jobs_router, prefix="/api")
+app.include_router(batch_router, prefix="/api")
+# scraped by Prometheus at the conventional path, outside /api
+app.include_router(metrics_router)
+attribute_endpoints(app)
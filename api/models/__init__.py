@@ -1,5 +1,12 @@
-from .event import Event, EventIn, EventUpdate
+from .batch import BatchRequest, BatchResponse, BatchResponseItem
+from .deletion_job import DeletionJob
+from .event import Event, EventIn, EventUpdate, EventWithRegistrationCount
 from .event_registration import EventRegistrationIn, EventRegistrationWithEvent
-from .organization import Organization, OrganizationCreate, OrganizationUpdate
+from .organization import (
+    Organization,
+    OrganizationCreate,
+    OrganizationOverview,
+    OrganizationUpdate,
+)
 from .role import Role, RoleAndUser, RoleCreate, RoleUpdate
 from .user import User
@@ -0,0 +1,26 @@
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel
+
+
+class BatchRequestItem(BaseModel):
+    # echoed back so the client can match responses, defaults to the item's index
+    id: Optional[str] = None
+    method: Literal["GET"] = "GET"
+    # e.g. "/api/events?limit=5"
+    path: str
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchRequestItem]
+
+
+class BatchResponseItem(BaseModel):
+    id: str
+    status: int
+    headers: dict[str, str] = {}
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchResponseItem]
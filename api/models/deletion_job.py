@@ -0,0 +1,15 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, PositiveInt
+
+
+class DeletionJob(BaseModel):
+    job_id: str
+    kind: Literal["organization", "account"]
+    target_id: PositiveInt
+    status: Literal["pending", "running", "done", "failed"]
+    # rows removed so far, across every dependent table
+    deleted_rows: int
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
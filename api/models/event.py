@@ -2,14 +2,17 @@ from datetime import datetime
 from pydantic import BaseModel, PositiveInt
 from typing import Optional
 
+from utils.categories import CategorySlug
+
 
 class EventIn(BaseModel):
     name: str
     description: str
     location: str
     date_time: datetime
+    end_date_time: Optional[datetime] = None
     organization_id: PositiveInt
-    category: Optional[str] = None
+    category: Optional[CategorySlug] = None
 
 
 class EventUpdate(BaseModel):
@@ -17,8 +20,9 @@ class EventUpdate(BaseModel):
     description: Optional[str] = None
     location: Optional[str] = None
     date_time: Optional[datetime] = None
+    end_date_time: Optional[datetime] = None
     organization_id: Optional[PositiveInt] = None
-    category: Optional[str] = None
+    category: Optional[CategorySlug] = None
 
 
 class Event(BaseModel):
@@ -27,5 +31,10 @@ class Event(BaseModel):
     description: str
     location: str
     date_time: datetime
+    end_date_time: Optional[datetime] = None
     organization_id: PositiveInt
     category: Optional[str] = None
+
+
+class EventWithRegistrationCount(Event):
+    registration_count: int
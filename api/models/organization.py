@@ -1,25 +1,36 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, PositiveInt
 
-from utils.categories import categoriesEnum
+from models.event import EventWithRegistrationCount
+from models.role import RoleAndUser
+from utils.categories import CategorySlug
 
 
 class Organization(BaseModel):
     organization_id: PositiveInt
     name: str
     description: Optional[str] = None
-    category: categoriesEnum
+    category: CategorySlug
     created_by_user_id: PositiveInt
 
 
 class OrganizationCreate(BaseModel):
     name: str
     description: Optional[str] = None
-    category: categoriesEnum
+    category: CategorySlug
 
 
 class OrganizationUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
-    category: categoriesEnum
+    category: CategorySlug
+
+
+class OrganizationOverview(BaseModel):
+    organization: Organization
+    member_count: int
+    admins: list[RoleAndUser]
+    upcoming_events: list[EventWithRegistrationCount]
+    # the caller's role in the organization, None for non-members and anonymous callers
+    my_role: Optional[Literal["admin", "volunteer"]] = None
@@ -22,6 +22,20 @@ class User(BaseModel):
     interests: list[str] = []
 
 
+class UserImportRowError(BaseModel):
+    row: int
+    email: Optional[str] = None
+    error: str
+
+
+class UserImportReport(BaseModel):
+    imported: int
+    failed: int
+    # capped, ``failed`` counts every rejected row
+    errors: list[UserImportRowError]
+    aborted: Optional[str] = None
+
+
 class UserUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
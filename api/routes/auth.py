@@ -1,32 +1,57 @@
 import logging
 import os
 import sqlite3
+import time
 from datetime import timedelta
 
 import jwt
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
-from db import get_connection
+from db import connect, get_connection
 from models.auth import (
     RequestResetBody,
     ResetPasswordBody,
     SignupRequest,
     SignupResponse,
 )
-from utils.auth import get_current_user
+from utils.auth import get_current_user, invalidate_principal
+from utils.deletion_jobs import create_job, find_active_job, submit_job
+from utils.latency import LatencyTracker
+from utils.rate_limit import (
+    client_ip,
+    enforce_rate_limits,
+    login_email_limiter,
+    login_ip_limiter,
+    reset_email_limiter,
+    reset_ip_limiter,
+)
+from utils.revocation import (
+    is_token_revoked,
+    revoke_token,
+    revoke_user_tokens,
+    sync_revocations,
+)
 from utils.security import (
     create_access_token,
     decode_access_token,
+    PasswordHasherBusy,
     hash_password,
+    needs_rehash,
     verify_password,
 )
+from utils.sessions import is_session_id, opaque_sessions_enabled, session_store
+from utils.skills import sync_user_skills
+from utils.user_search import index_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 _IS_PRODUCTION = os.environ.get("ENV", "development") != "development"
 
+# Latency of the whole login handler, reported separately from other routes.
+login_latency = LatencyTracker()
+
 
 @router.post(
     "/signup", response_model=SignupResponse, status_code=status.HTTP_201_CREATED
@@ -52,6 +77,8 @@ def signup(payload: SignupRequest, _conn: sqlite3.Connection = Depends(get_conne
         (payload.email, payload.first_name, payload.last_name, payload.skills),
     )
     user_id = user_cursor.lastrowid
+    index_user(_conn, user_id, payload.email, payload.first_name, payload.last_name)
+    sync_user_skills(_conn, user_id, payload.skills)
 
     # Insert user interests
     for category in payload.interests:
@@ -76,8 +103,34 @@ def signup(payload: SignupRequest, _conn: sqlite3.Connection = Depends(get_conne
     )
 
 
+def _rehash_password(user_id: int, plain_password: str, old_hash: str) -> None:
+    """
+    Replace a hash made with an outdated bcrypt cost. Runs after the login response
+    has been sent, on its own connection.
+
+    The update only applies if the stored hash is still ``old_hash``, so a password
+    reset that happened in the meantime is never overwritten.
+    """
+    try:
+        new_hash = hash_password(plain_password)
+    except PasswordHasherBusy:
+        # the pool is busy, the hash will be upgraded on a later login
+        return
+    conn = connect()
+    try:
+        conn.execute(
+            "UPDATE credentials SET hashed_password = ? WHERE user_id = ? AND hashed_password = ?",
+            (new_hash, user_id, old_hash),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
 @router.post("/login")
 def login(
+    request: Request,
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
     _conn: sqlite3.Connection = Depends(get_connection),
 ):
@@ -85,7 +138,34 @@ def login(
     Authenticate a user and return a JWT access token.
 
     Accepts `username` (the user's email) and `password` via OAuth2 form data.
+
+    Attempts are throttled per client IP and per email; requests over the limit get 429
+    before any database query or password check runs. Successful logins don't count
+    against the email's allowance.
+
+    Password hashes made with an outdated bcrypt cost are upgraded in the background
+    after a successful login.
     """
+    email = form_data.username.strip().lower()
+    enforce_rate_limits(
+        (login_ip_limiter, client_ip(request)),
+        (login_email_limiter, email),
+    )
+
+    start = time.perf_counter()
+    try:
+        response = _login(form_data, background_tasks, _conn)
+        login_email_limiter.undo(email)
+        return response
+    finally:
+        login_latency.record(time.perf_counter() - start)
+
+
+def _login(
+    form_data: OAuth2PasswordRequestForm,
+    background_tasks: BackgroundTasks,
+    _conn: sqlite3.Connection,
+) -> JSONResponse:
     # Look up user by email
     # Note: Auth2 spec uses "username" field
     user = _conn.execute(
@@ -111,7 +191,18 @@ def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    token = create_access_token({"sub": str(user["user_id"])})
+    if needs_rehash(cred["hashed_password"]):
+        background_tasks.add_task(
+            _rehash_password,
+            user["user_id"],
+            form_data.password,
+            cred["hashed_password"],
+        )
+
+    if opaque_sessions_enabled():
+        token = session_store.create(_conn, user["user_id"])
+    else:
+        token = create_access_token({"sub": str(user["user_id"])})
 
     response = JSONResponse(content={"access_token": token, "token_type": "bearer"})
     response.set_cookie(
@@ -126,7 +217,9 @@ def login(
 
 
 @router.post("/refresh")
-def refresh_session(request: Request):
+def refresh_session(
+    request: Request, _conn: sqlite3.Connection = Depends(get_connection)
+):
     """
     Issue a fresh JWT using the existing valid session cookie.
 
@@ -136,6 +229,9 @@ def refresh_session(request: Request):
     If the current session cookie is present and has not expired, a new token
     is generated with a reset expiry window and written back as the session
     cookie. Returns 401 if the cookie is absent or the token is invalid/expired.
+
+    Server-side sessions (``SESSION_MODE=opaque``) are simply extended; nothing is
+    signed and the cookie stays the same.
     """
     token = request.cookies.get("session")
     if not token:
@@ -144,6 +240,14 @@ def refresh_session(request: Request):
             detail="No session",
         )
 
+    if is_session_id(token):
+        if session_store.resolve(_conn, token) is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired session",
+            )
+        return {"ok": True}
+
     try:
         claims = decode_access_token(token)
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
@@ -152,6 +256,13 @@ def refresh_session(request: Request):
             detail="Invalid or expired token",
         )
 
+    sync_revocations(_conn)
+    if is_token_revoked(claims):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+        )
+
     new_token = create_access_token({"sub": claims["sub"]})
     response = JSONResponse(content={"ok": True})
     response.set_cookie(
@@ -166,10 +277,20 @@ def refresh_session(request: Request):
 
 
 @router.post("/logout")
-def logout():
+def logout(request: Request, _conn: sqlite3.Connection = Depends(get_connection)):
     """
-    Clear the session cookie, effectively logging the user out.
+    Clear the session cookie and revoke its token, logging the user out.
     """
+    token = request.cookies.get("session")
+    if token and is_session_id(token):
+        session_store.delete(_conn, token)
+    elif token:
+        try:
+            revoke_token(_conn, decode_access_token(token))
+        except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
+            # nothing to revoke, the token is unusable already
+            pass
+
     response = JSONResponse(content={"message": "Logged out successfully"})
     response.delete_cookie(key="session", path="/")
     return response
@@ -181,14 +302,22 @@ logger = logging.getLogger(__name__)
 
 @router.post("/request-reset")
 def request_reset(
-    payload: RequestResetBody, _conn: sqlite3.Connection = Depends(get_connection)
+    request: Request,
+    payload: RequestResetBody,
+    _conn: sqlite3.Connection = Depends(get_connection),
 ):
     """
     Request a password reset. If the email exists, a short-lived reset token is
     generated and logged to the console.
 
-    Always returns 200 with a generic message to prevent email enumeration.
+    Always returns 200 with a generic message to prevent email enumeration. Requests
+    are throttled per client IP and per email (429 when over the limit).
     """
+    enforce_rate_limits(
+        (reset_ip_limiter, client_ip(request)),
+        (reset_email_limiter, payload.email.lower()),
+    )
+
     user = _conn.execute(
         "SELECT user_id FROM users WHERE email = ?",
         (payload.email,),
@@ -226,6 +355,13 @@ def reset_password(
             detail="Invalid reset token",
         )
 
+    sync_revocations(_conn)
+    if is_token_revoked(claims):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired reset token",
+        )
+
     user_id = claims.get("sub")
 
     # Update the hashed password in credentials
@@ -239,6 +375,10 @@ def reset_password(
             detail="User not found",
         )
     _conn.commit()
+    invalidate_principal(user_id)
+    # log out every existing session, which also makes this reset token single-use
+    revoke_user_tokens(_conn, user_id)
+    session_store.delete_user_sessions(_conn, int(user_id))
 
     return {"message": "Password has been reset successfully"}
 
@@ -278,7 +418,7 @@ def get_me(
     }
 
 
-@router.delete("/delete-account")
+@router.delete("/delete-account", status_code=status.HTTP_202_ACCEPTED)
 def delete_account(
     current_user: dict = Depends(get_current_user),
     _conn: sqlite3.Connection = Depends(get_connection),
@@ -286,16 +426,34 @@ def delete_account(
     """
     Delete the currently authenticated user's account.
 
-    Removes credentials and the user record.
+    Sign-in stops working right away: credentials are removed and every token and session
+    issued to the user is revoked. The user record, roles, interests and registrations
+    are then removed in the background; the returned ``job_id`` can be followed at
+    ``/api/deletion-jobs/{job_id}``.
+
+    Users who created organizations must delete them first (409).
     """
     user_id = current_user["user_id"]
 
-    # Delete credentials (password hash)
-    _conn.execute("DELETE FROM credentials WHERE user_id = ?", (user_id,))
-
-    # Delete the user record
-    _conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+    owned = _conn.execute(
+        "SELECT 1 FROM organizations WHERE created_by_user_id = ? LIMIT 1", (user_id,)
+    ).fetchone()
+    if owned is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Delete the organizations you created before deleting your account",
+        )
 
+    # Delete credentials (password hash) so the account can't be signed into again
+    _conn.execute("DELETE FROM credentials WHERE user_id = ?", (user_id,))
+    job = find_active_job(_conn, "account", user_id) or create_job(
+        _conn, "account", user_id, user_id
+    )
     _conn.commit()
+    submit_job(job["job_id"])
+
+    invalidate_principal(user_id)
+    revoke_user_tokens(_conn, user_id)
+    session_store.delete_user_sessions(_conn, user_id)
 
-    return {"message": "Account deleted successfully"}
+    return {"message": "Account deletion started", "job_id": job["job_id"]}
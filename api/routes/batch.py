@@ -0,0 +1,94 @@
+import sqlite3
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from db import get_connection
+from models import BatchRequest, BatchResponse, BatchResponseItem
+from utils.auth import get_optional_current_user
+from utils.batching import (
+    BATCH_MAX_REQUESTS,
+    BatchBudget,
+    dispatch_get,
+    validate_batch_path,
+)
+from utils.logger import get_logger
+from utils.request_context import shared_connection, shared_principal
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+
+@router.post("", response_model=BatchResponse)
+async def batch(
+    payload: BatchRequest,
+    request: Request,
+    _conn: sqlite3.Connection = Depends(get_connection),
+    current_user: Optional[dict] = Depends(get_optional_current_user),
+):
+    """
+    Run several GET requests in one round trip and return every response.
+
+    Sub-requests go through the regular routers in-process, one after the other, with
+    the caller's credentials. They share this request's database connection and
+    authenticated user, so the user is only resolved once. Each item gets its own status;
+    a failing item doesn't fail the batch. Once the batch's time or response size budget
+    is used up, the remaining items are answered with 504 or 413 without being run.
+
+    :param payload: the sub-requests, at most ``BATCH_MAX_REQUESTS``
+    :type payload: BatchRequest
+    :param _conn: the connection to the database, shared with the sub-requests
+    :type _conn: sqlite3.Connection
+    """
+    if not payload.requests:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="No requests to run"
+        )
+    if len(payload.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_MAX_REQUESTS} requests per batch",
+        )
+
+    budget = BatchBudget()
+    responses = []
+    connection_token = shared_connection.set(_conn)
+    principal_token = shared_principal.set(current_user)
+    try:
+        for index, item in enumerate(payload.requests):
+            item_id = item.id if item.id is not None else str(index)
+            error = validate_batch_path(item.path)
+            if error is not None:
+                responses.append(
+                    BatchResponseItem(id=item_id, status=400, body={"detail": error})
+                )
+                continue
+            exhausted = budget.exhausted()
+            if exhausted is not None:
+                status_code, detail = exhausted
+                responses.append(
+                    BatchResponseItem(
+                        id=item_id, status=status_code, body={"detail": detail}
+                    )
+                )
+                continue
+            try:
+                result = await dispatch_get(request.app, request, item.path)
+            except Exception:
+                logger.exception("Batch sub-request GET %s failed", item.path)
+                responses.append(
+                    BatchResponseItem(
+                        id=item_id,
+                        status=500,
+                        body={"detail": "Internal Server Error"},
+                    )
+                )
+                continue
+            budget.response_bytes += result.pop("size")
+            responses.append(BatchResponseItem(id=item_id, **result))
+    finally:
+        shared_principal.reset(principal_token)
+        shared_connection.reset(connection_token)
+
+    return BatchResponse(responses=responses)
@@ -0,0 +1,135 @@
+import os
+import secrets
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from routes.auth import login_latency
+from utils.profiling import (
+    PROFILE_BUFFER_SIZE,
+    PROFILE_INTERVAL_MS,
+    PROFILE_SAMPLE_RATE,
+    clear_profiles,
+    get_profile,
+    recent_profiles,
+)
+from utils.query_stats import (
+    QUERY_STATS_MAX_FINGERPRINTS,
+    SLOW_QUERY_MS,
+    reset_statement_stats,
+    top_statements,
+)
+from utils.security import (
+    password_hash_latency,
+    password_pool_queue_depth,
+    password_verify_latency,
+)
+
+# Shared secret for the debug endpoints, sent in the X-Debug-Token header. When unset,
+# the endpoints are only available in development.
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN", "")
+_IS_DEVELOPMENT = os.environ.get("ENV", "development") == "development"
+
+
+def has_debug_access(token: Optional[str]) -> bool:
+    """Return True if the given X-Debug-Token value unlocks the debug endpoints."""
+    if DEBUG_TOKEN:
+        return token is not None and secrets.compare_digest(token, DEBUG_TOKEN)
+    return _IS_DEVELOPMENT
+
+
+def require_debug_access(x_debug_token: Optional[str] = Header(default=None)) -> None:
+    """Dependency guarding operational endpoints that expose server internals."""
+    if not has_debug_access(x_debug_token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+router = APIRouter(
+    prefix="/debug", tags=["debug"], dependencies=[Depends(require_debug_access)]
+)
+
+
+@router.get("/auth-latency")
+def auth_latency():
+    """
+    Latency percentiles for authentication, reported separately from other routes so
+    auth storms are visible on their own.
+
+    - ``login``: the whole ``/api/auth/login`` handler
+    - ``password_hash`` / ``password_verify``: bcrypt calls, including the wait for a pool worker
+    - ``password_pool_queue_depth``: bcrypt calls currently queued or running
+    """
+    return {
+        "login": login_latency.summary(),
+        "password_hash": password_hash_latency.summary(),
+        "password_verify": password_verify_latency.summary(),
+        "password_pool_queue_depth": password_pool_queue_depth(),
+    }
+
+
+@router.get("/queries")
+def query_stats(
+    limit: int = Query(20, ge=1, le=QUERY_STATS_MAX_FINGERPRINTS),
+    order_by: Literal["total", "p99", "count", "rows"] = "total",
+):
+    """
+    The heaviest SQL statements since startup (or the last reset), one row per
+    fingerprint: literals replaced by ``?`` and ``IN`` lists collapsed.
+
+    Each row has the run count, p50/p90/p99/max latency up to the first row (over the
+    last runs), total and mean time including fetching, and the rows fetched.
+
+    :param limit: number of statements to return
+    :type limit: int
+    :param order_by: ``total`` time, ``p99`` latency, run ``count`` or ``rows`` fetched
+    :type order_by: str
+    """
+    return {
+        "slow_query_ms": SLOW_QUERY_MS,
+        "statements": top_statements(limit, order_by),
+    }
+
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT)
+def reset_query_stats():
+    """Forget the statement statistics, e.g. before a load test."""
+    reset_statement_stats()
+
+
+@router.get("/profiles")
+def list_profiles():
+    """
+    The most recent request profiles, newest first.
+
+    Send a request with the ``X-Profile: 1`` and ``X-Debug-Token`` headers to profile
+    it; its id comes back in the ``X-Profile-Id`` response header. With
+    ``PROFILE_SAMPLE_RATE`` set, a share of all requests is profiled as well.
+    """
+    return {
+        "sample_rate": PROFILE_SAMPLE_RATE,
+        "interval_ms": PROFILE_INTERVAL_MS,
+        "buffer_size": PROFILE_BUFFER_SIZE,
+        "profiles": [profile.summary() for profile in recent_profiles()],
+    }
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def profile_stacks(profile_id: str):
+    """
+    The stack samples of one profile as collapsed stacks, one ``frame;frame;... count``
+    line per distinct stack, for flamegraph.pl or speedscope.
+
+    :param profile_id: the ``X-Profile-Id`` of the profiled response
+    :type profile_id: str
+    """
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return profile.collapsed()
+
+
+@router.delete("/profiles", status_code=status.HTTP_204_NO_CONTENT)
+def delete_profiles():
+    """Forget the stored profiles."""
+    clear_profiles()
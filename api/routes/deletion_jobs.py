@@ -0,0 +1,33 @@
+import sqlite3
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from db import get_connection
+from models import DeletionJob
+from utils.deletion_jobs import get_job
+
+router = APIRouter(prefix="/deletion-jobs", tags=["deletion-jobs"])
+
+
+@router.get("/{job_id}", response_model=DeletionJob)
+def get_deletion_job(
+    job_id: str,
+    _conn: sqlite3.Connection = Depends(get_connection),
+):
+    """
+    Get the progress of an organization or account deletion.
+
+    No authentication is required: the job ID is a random UUID only handed to whoever
+    requested the deletion, and a deleted account can no longer authenticate.
+
+    :param job_id: the ID returned when the deletion was requested
+    :type job_id: str
+    :param _conn: the connection to the database
+    :type _conn: sqlite3.Connection
+    """
+    job = get_job(_conn, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Deletion job not found"
+        )
+    return DeletionJob(**job)
@@ -5,6 +5,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from db import get_connection
 from models import EventRegistrationIn, EventRegistrationWithEvent
 from utils.auth import get_current_user
+from utils.dashboard import invalidate_dashboard
+from utils.deletion_jobs import ensure_organization_not_deleted
+from utils.org_overview import invalidate_organization_overview
+from utils.schedule import find_conflicting_events
 
 router = APIRouter(prefix="/event-registrations", tags=["event_registrations"])
 
@@ -154,9 +158,7 @@ def get_event_registration(
             status_code=status.HTTP_404_NOT_FOUND, detail="Registration not found"
         )
     if row["user_id"] != current_user["user_id"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden"
-        )
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
     return EventRegistrationIn(
         user_id=row["user_id"],
@@ -171,31 +173,62 @@ def get_event_registration(
 )
 def create_event_registration(
     payload: EventRegistrationIn,
+    allow_conflicts: bool = False,
     _conn: sqlite3.Connection = Depends(get_connection),
     _current_user: dict = Depends(get_current_user),
 ):
     """
     Create a new event registration.
 
+    The registration is always made for the current user. ``organization_id`` must be
+    the organization of the event (400 otherwise).
+
+    Registrations that overlap an event the user is already registered for are rejected
+    with 409, listing the conflicting events, unless ``allow_conflicts`` is set.
+
     :param payload: the event registration details
     :type payload: EventRegistrationIn
+    :param allow_conflicts: register even if the event overlaps the user's existing registrations
+    :type allow_conflicts: bool
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
     """
+    event_row = _conn.execute(
+        "SELECT id, organization_id FROM events WHERE id = ?", (payload.event_id,)
+    ).fetchone()
+    if event_row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
+        )
+    organization_id = event_row["organization_id"]
+    if payload.organization_id != organization_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="organization_id does not match the event's organization",
+        )
+    ensure_organization_not_deleted(_conn, organization_id)
+    user_id = _current_user["user_id"]
+
+    if not allow_conflicts:
+        conflicts = find_conflicting_events(_conn, user_id, payload.event_id)
+        if conflicts:
+            names = ", ".join(row["name"] for row in conflicts)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"This event overlaps events you are already registered for: {names}",
+            )
+
     try:
         _conn.execute(
             """
 			INSERT INTO event_registrations (user_id, event_id, organization_id, registration_time)
 			VALUES (?, ?, ?, ?)
 			""",
-            (
-                _current_user["user_id"],
-                payload.event_id,
-                payload.organization_id,
-                payload.registration_time,
-            ),
+            (user_id, payload.event_id, organization_id, payload.registration_time),
         )
         _conn.commit()
+        invalidate_organization_overview(organization_id)
+        invalidate_dashboard(user_id)
     except sqlite3.IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -203,9 +236,9 @@ def create_event_registration(
         )
 
     return EventRegistrationIn(
-        user_id=_current_user["user_id"],
+        user_id=user_id,
         event_id=payload.event_id,
-        organization_id=payload.organization_id,
+        organization_id=organization_id,
         registration_time=payload.registration_time,
     )
 
@@ -259,6 +292,14 @@ def delete_event_registration(
         (organization_id, event_id, user_id),
     )
     _conn.commit()
+    # the overview listing the event is the one of its current organization, which
+    # older registrations may not have stored
+    event_row = _conn.execute(
+        "SELECT organization_id FROM events WHERE id = ?", (event_id,)
+    ).fetchone()
+    if event_row is not None:
+        invalidate_organization_overview(event_row["organization_id"])
+    invalidate_dashboard(user_id)
 
     return EventRegistrationIn(
         user_id=row["user_id"],
@@ -1,15 +1,47 @@
 import sqlite3
+from datetime import datetime, timezone
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from db import get_connection
 from models import Event, EventIn, EventUpdate
-from utils.auth import get_current_user
+from utils.auth import get_current_user, get_optional_current_user
+from utils.authorization import ensure_org_admin, get_current_memberships
+from utils.deletion_jobs import ensure_organization_not_deleted
+from utils.categories import category_ids_filter
+from utils.org_overview import invalidate_organization_overview
+from utils.recommendations import load_recommended_events
+from utils.schedule import conflicting_event_ids_sql
 
 router = APIRouter(prefix="/events", tags=["events"])
 
 
+def _as_stored(value: datetime) -> datetime:
+    """Naive UTC for times with an offset, like the events table triggers store them."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _validate_event_interval(start: datetime | str, end: datetime | str | None) -> None:
+    """
+    Raise 400 if an event ends before (or at the same time as) it starts.
+
+    Values read back from the database are strings, so both sides are parsed before
+    comparing. Times with an offset are compared in UTC, which is how they are stored.
+    """
+    if end is None:
+        return
+    start_dt = _as_stored(datetime.fromisoformat(str(start)))
+    end_dt = _as_stored(datetime.fromisoformat(str(end)))
+    if end_dt <= start_dt:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Event end time must be after its start time",
+        )
+
+
 @router.get("", response_model=None)
 def list_events(
     # TODO: improve type
@@ -24,7 +56,9 @@ def list_events(
     # TODO: Option B — split location into city/state columns for structured filtering
     location: Optional[str] = None,
     limit: Optional[int] = None,
+    exclude_conflicts: bool = False,
     _conn=Depends(get_connection),
+    current_user: Optional[dict] = Depends(get_optional_current_user),
 ):
     """
     Get a list of all events with optional filtering by date/time and availability matching.
@@ -46,14 +80,23 @@ def list_events(
     :type organization_id: Optional[List[int]]
     :param availability: one or more availability options to filter by. Accepts 'Mornings' (06:00-11:59), 'Afternoons' (12:00-16:59), 'Evenings' (17:00-21:59), 'Weekends', or 'Flexible' (no restriction). Multiple values are combined with OR logic. If not provided or 'Flexible' is included, no availability filtering is applied
     :type availability: Optional[List[str]]
-    :param category: one or more category names to filter by. Only events with a matching category will be returned
+    :param category: one or more category slugs (or display names) to filter by. Only events with a matching category will be returned
     :type category: Optional[List[str]]
     :param limit: the maximum number of events to return. If omitted, all matching events are returned
     :type limit: Optional[int]
+    :param exclude_conflicts: when True, leave out events that overlap events the current user is already registered for. Requires authentication
+    :type exclude_conflicts: bool
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
     """
-    query = "SELECT id, name, description, location, date_time, organization_id, category FROM events WHERE 1=1"
+    if exclude_conflicts and current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    query = "SELECT id, name, description, location, date_time, end_date_time, organization_id, category FROM events WHERE 1=1"
     params = []
 
     # Apply time-based filtering - compares only the time portion, ignoring date
@@ -66,13 +109,14 @@ def list_events(
         params.append(end_time)
 
     # Apply date-based filtering
-    # Note: This assumes date_time column might contain date information or we use SQLite date functions
+    # date_time is stored as 'YYYY-MM-DD HH:MM:SS', so whole days are plain text ranges
+    # on the raw column (idx_events_schedule)
     if begin_date is not None:
-        query += " AND date(date_time) >= date(?)"
+        query += " AND date_time >= date(?)"
         params.append(begin_date)
 
     if end_date is not None:
-        query += " AND date(date_time) <= date(?)"
+        query += " AND date_time < date(?, '+1 day')"
         params.append(end_date)
 
     # Apply weekday filtering using SQLite's strftime function
@@ -123,15 +167,22 @@ def list_events(
             query += " AND (" + " OR ".join(availability_conditions) + ")"
 
     if category:
-        placeholders = ",".join("?" * len(category))
-        query += f" AND category IN ({placeholders})"
-        params.extend(category)
+        category_ids = category_ids_filter(category)
+        if not category_ids:
+            return []
+        placeholders = ",".join("?" * len(category_ids))
+        query += f" AND category_id IN ({placeholders})"
+        params.extend(category_ids)
 
     # Option A: free-text substring match on location field
     if location:
         query += " AND LOWER(location) LIKE LOWER(?)"
         params.append(f"%{location}%")
 
+    if exclude_conflicts:
+        query += f" AND id NOT IN ({conflicting_event_ids_sql()})"
+        params.append(current_user["user_id"])
+
     query += " ORDER BY date_time ASC"
 
     if limit is not None:
@@ -146,6 +197,7 @@ def list_events(
             description=row["description"],
             location=row["location"],
             date_time=row["date_time"],
+            end_date_time=row["end_date_time"],
             organization_id=row["organization_id"],
             category=row["category"],
         )
@@ -162,51 +214,21 @@ def recommended_events(
     """
     Get a list of events recommended for the currently authenticated user.
 
-    Recommendations are based on the user's interests (stored in the ``user_interests``
-    table). Events the user has already registered for are excluded. Results are
-    ordered so that events whose ``category`` matches one of the user's interests
-    appear first, followed by all other events, both groups sorted by
-    ``date_time`` ascending.
+    Recommendations are based on the user's interests (the ``interests_mask`` bitmask
+    kept in sync with the ``user_interests`` table). Events the user has already
+    registered for are excluded. Results are ordered so that events whose ``category``
+    matches one of the user's interests appear first, followed by all other events,
+    both groups sorted by ``date_time`` ascending.
 
     :param limit: maximum number of events to return (default 10)
     :type limit: int
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
     """
-    user_id = current_user["user_id"]
-    # Load the user's interest categories
-    interest_rows = _conn.execute(
-        "SELECT category FROM user_interests WHERE user_id = ?", (user_id,)
-    ).fetchall()
-    interests = [r["category"] for r in interest_rows]
-
-    if interests:
-        placeholders = ",".join("?" * len(interests))
-        query = f"""
-            SELECT id, name, description, location, date_time, organization_id, category
-            FROM events
-            WHERE id NOT IN (
-                SELECT event_id FROM event_registrations WHERE user_id = ?
-            )
-            ORDER BY CASE WHEN category IN ({placeholders}) THEN 0 ELSE 1 END,
-                     date_time ASC
-            LIMIT ?
-        """
-        params: list = [user_id] + interests + [limit]
-    else:
-        query = """
-            SELECT id, name, description, location, date_time, organization_id, category
-            FROM events
-            WHERE id NOT IN (
-                SELECT event_id FROM event_registrations WHERE user_id = ?
-            )
-            ORDER BY date_time ASC
-            LIMIT ?
-        """
-        params = [user_id, limit]
-
-    rows = _conn.execute(query, params).fetchall()
-    return [Event(**dict(row)) for row in rows]
+    return [
+        Event(**event)
+        for event in load_recommended_events(_conn, current_user["user_id"], limit)
+    ]
 
 
 @router.get("/{event_id}", response_model=Event)
@@ -220,7 +242,7 @@ def get_event(event_id: int, _conn=Depends(get_connection)):
     :type _conn: sqlite3.Connection
     """
     row = _conn.execute(
-        "SELECT id, name, description, location, date_time, organization_id, category FROM events WHERE id = ?",
+        "SELECT id, name, description, location, date_time, end_date_time, organization_id, category FROM events WHERE id = ?",
         (event_id,),
     ).fetchone()
     if row is None:
@@ -233,6 +255,7 @@ def get_event(event_id: int, _conn=Depends(get_connection)):
         description=row["description"],
         location=row["location"],
         date_time=row["date_time"],
+        end_date_time=row["end_date_time"],
         organization_id=row["organization_id"],
         category=row["category"],
     )
@@ -242,7 +265,7 @@ def get_event(event_id: int, _conn=Depends(get_connection)):
 def add_event(
     payload: EventIn,
     _conn=Depends(get_connection),
-    _current_user: dict = Depends(get_current_user),
+    _memberships: dict[int, str] = Depends(get_current_memberships),
 ):
     """
     Create a new event and add it to the database.
@@ -253,34 +276,36 @@ def add_event(
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
     """
-    role_row = _conn.execute(
-        "SELECT permission_level FROM roles WHERE organization_id = ? AND user_id = ?",
-        (payload.organization_id, _current_user["user_id"]),
-    ).fetchone()
-    if role_row is None or role_row["permission_level"] != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only organization admins can create events",
-        )
+    ensure_org_admin(
+        _memberships,
+        payload.organization_id,
+        detail="Only organization admins can create events",
+    )
+    ensure_organization_not_deleted(_conn, payload.organization_id)
+
+    _validate_event_interval(payload.date_time, payload.end_date_time)
 
     cursor = _conn.execute(
-        "INSERT INTO events (name, description, location, date_time, organization_id, category) VALUES (?, ?, ?, ?, ?, ?)",
+        "INSERT INTO events (name, description, location, date_time, end_date_time, organization_id, category) VALUES (?, ?, ?, ?, ?, ?, ?)",
         (
             payload.name,
             payload.description,
             payload.location,
             payload.date_time,
+            payload.end_date_time,
             payload.organization_id,
             payload.category,
         ),
     )
     _conn.commit()
+    invalidate_organization_overview(payload.organization_id)
     return Event(
         id=cursor.lastrowid,
         name=payload.name,
         description=payload.description,
         location=payload.location,
         date_time=payload.date_time,
+        end_date_time=payload.end_date_time,
         organization_id=payload.organization_id,
         category=payload.category,
     )
@@ -291,7 +316,7 @@ def update_event(
     event_id: int,
     payload: EventUpdate,
     _conn: sqlite3.Connection = Depends(get_connection),
-    _current_user: dict = Depends(get_current_user),
+    _memberships: dict[int, str] = Depends(get_current_memberships),
 ):
     """
     Update an existing event with new data. Only fields provided in the payload will be updated.
@@ -306,7 +331,7 @@ def update_event(
     """
     row = _conn.execute(
         """
-        SELECT id, name, description, location, date_time, organization_id, category
+        SELECT id, name, description, location, date_time, end_date_time, organization_id, category
         FROM events
         WHERE id = ?
         """,
@@ -317,15 +342,12 @@ def update_event(
             status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
         )
 
-    role_row = _conn.execute(
-        "SELECT permission_level FROM roles WHERE organization_id = ? AND user_id = ?",
-        (row["organization_id"], _current_user["user_id"]),
-    ).fetchone()
-    if role_row is None or role_row["permission_level"] != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only organization admins can update events",
-        )
+    # moving an event to another organization requires admin rights in both
+    ensure_org_admin(
+        _memberships,
+        {row["organization_id"], payload.organization_id or row["organization_id"]},
+        detail="Only organization admins can update events",
+    )
 
     updated_name = payload.name if payload.name is not None else row["name"]
     updated_description = (
@@ -337,11 +359,20 @@ def update_event(
     updated_date_time = (
         payload.date_time if payload.date_time is not None else row["date_time"]
     )
+    # an explicit null clears the end time, a missing field keeps it
+    updated_end_date_time = (
+        payload.end_date_time
+        if "end_date_time" in payload.model_fields_set
+        else row["end_date_time"]
+    )
+    _validate_event_interval(updated_date_time, updated_end_date_time)
     updated_organization_id = (
         payload.organization_id
         if payload.organization_id is not None
         else row["organization_id"]
     )
+    for organization_id in {row["organization_id"], updated_organization_id}:
+        ensure_organization_not_deleted(_conn, organization_id)
     updated_category = (
         payload.category if payload.category is not None else row["category"]
     )
@@ -349,7 +380,7 @@ def update_event(
     _conn.execute(
         """
         UPDATE events
-        SET name = ?, description = ?, location = ?, date_time = ?, organization_id = ?, category = ?
+        SET name = ?, description = ?, location = ?, date_time = ?, end_date_time = ?, organization_id = ?, category = ?
         WHERE id = ?
         """,
         (
@@ -357,12 +388,15 @@ def update_event(
             updated_description,
             updated_location,
             updated_date_time,
+            updated_end_date_time,
             updated_organization_id,
             updated_category,
             event_id,
         ),
     )
     _conn.commit()
+    invalidate_organization_overview(row["organization_id"])
+    invalidate_organization_overview(updated_organization_id)
 
     return Event(
         id=event_id,
@@ -370,6 +404,7 @@ def update_event(
         description=updated_description,
         location=updated_location,
         date_time=updated_date_time,
+        end_date_time=updated_end_date_time,
         organization_id=updated_organization_id,
         category=updated_category,
     )
@@ -379,7 +414,7 @@ def update_event(
 def delete_event(
     event_id: int,
     _conn=Depends(get_connection),
-    _current_user: dict = Depends(get_current_user),
+    _memberships: dict[int, str] = Depends(get_current_memberships),
 ):
     """
     Delete an event from the database. Only admins of the event's organization may delete it.
@@ -402,18 +437,15 @@ def delete_event(
             status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
         )
 
-    role_row = _conn.execute(
-        "SELECT permission_level FROM roles WHERE organization_id = ? AND user_id = ?",
-        (row["organization_id"], _current_user["user_id"]),
-    ).fetchone()
-    if role_row is None or role_row["permission_level"] != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only organization admins can delete events",
-        )
+    ensure_org_admin(
+        _memberships,
+        row["organization_id"],
+        detail="Only organization admins can delete events",
+    )
 
     _conn.execute(
         "DELETE FROM events WHERE id = ?",
         (event_id,),
     )
     _conn.commit()
+    invalidate_organization_overview(row["organization_id"])
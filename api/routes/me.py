@@ -0,0 +1,49 @@
+import sqlite3
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from db import get_connection
+from utils.auth import get_current_user
+from utils.dashboard import DASHBOARD_SECTIONS, load_dashboard, parse_field_selection
+
+router = APIRouter(prefix="/me", tags=["me"])
+
+
+@router.get("/dashboard", response_model=None)
+def get_dashboard(
+    sections: Optional[list[str]] = Query(None),
+    fields: Optional[list[str]] = Query(None),
+    limit: int = Query(5, ge=1, le=50),
+    _conn: sqlite3.Connection = Depends(get_connection),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Return everything the client needs after sign-in in one request: the user's
+    profile, interests, memberships, next registered events and recommended events.
+
+    The user is authenticated once and every section is read on the same connection.
+    Sections are cached per user for a few seconds; the user's own changes show up
+    right away.
+
+    :param sections: sections to return, all of them when omitted
+    :type sections: list[str] | None
+    :param fields: fields to keep, as ``section.field`` (repeatable or comma-separated);
+        sections without selected fields are returned whole
+    :type fields: list[str] | None
+    :param limit: max number of registrations and of recommendations
+    :type limit: int
+    :param _conn: the connection to the database
+    :type _conn: sqlite3.Connection
+    """
+    try:
+        selection = parse_field_selection(sections or DASHBOARD_SECTIONS, fields or [])
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    dashboard = load_dashboard(_conn, current_user["user_id"], selection, limit)
+    if "profile" in dashboard and dashboard["profile"] is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return dashboard
@@ -0,0 +1,75 @@
+import anyio.to_thread
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from routes.debug import require_debug_access
+from utils.cache import registered_caches
+from utils.logger import dropped_log_records, log_queue_depth
+from utils.metrics import MetricsWriter, write_request_metrics
+from utils.security import PASSWORD_HASH_MAX_PENDING, password_pool_queue_depth
+
+router = APIRouter(tags=["metrics"], dependencies=[Depends(require_debug_access)])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Metrics in the Prometheus text format, guarded like the debug endpoints.
+
+    Besides the per-route request, latency and database series this reports the sync
+    threadpool usage, the hit and miss counts of every named cache, the bcrypt pool
+    backlog and the log queue. The handler runs on the event loop, where the request
+    series are updated, so it reads them without locking.
+    """
+    writer = MetricsWriter()
+    write_request_metrics(writer)
+
+    # sync endpoints and dependencies run in anyio's default thread limiter
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    writer.family("threadpool_threads", "gauge", "Size of the sync threadpool.")
+    writer.sample("threadpool_threads", limiter.total_tokens)
+    writer.family(
+        "threadpool_threads_busy", "gauge", "Threadpool threads running a task."
+    )
+    writer.sample("threadpool_threads_busy", limiter.borrowed_tokens)
+    writer.family(
+        "threadpool_tasks_waiting", "gauge", "Tasks waiting for a threadpool thread."
+    )
+    writer.sample("threadpool_tasks_waiting", limiter.statistics().tasks_waiting)
+
+    caches = sorted(registered_caches().items())
+    writer.family("cache_hits_total", "counter", "Cache lookups that found an entry.")
+    for name, cache in caches:
+        writer.sample("cache_hits_total", cache.hits, {"cache": name})
+    writer.family("cache_misses_total", "counter", "Cache lookups that missed.")
+    for name, cache in caches:
+        writer.sample("cache_misses_total", cache.misses, {"cache": name})
+    writer.family("cache_entries", "gauge", "Entries currently cached.")
+    for name, cache in caches:
+        writer.sample("cache_entries", len(cache), {"cache": name})
+
+    writer.family(
+        "password_hash_queue_depth",
+        "gauge",
+        "bcrypt calls queued or running in the password pool.",
+    )
+    writer.sample("password_hash_queue_depth", password_pool_queue_depth())
+    writer.family(
+        "password_hash_queue_limit",
+        "gauge",
+        "bcrypt calls allowed in flight before requests are shed.",
+    )
+    writer.sample("password_hash_queue_limit", PASSWORD_HASH_MAX_PENDING)
+
+    writer.family("log_queue_depth", "gauge", "Log records waiting to be written.")
+    writer.sample("log_queue_depth", log_queue_depth())
+    writer.family(
+        "log_records_dropped_total",
+        "counter",
+        "Log records dropped because the log queue was full.",
+    )
+    writer.sample("log_records_dropped_total", dropped_log_records())
+
+    return PlainTextResponse(
+        writer.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,14 +1,50 @@
+import csv
+import io
 import sqlite3
-
-from fastapi import APIRouter, Depends, HTTPException, status
-
-from db import get_connection
-from models import Organization, OrganizationCreate, OrganizationUpdate
+from typing import Iterator, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from db import connect, get_connection
+from models import (
+    DeletionJob,
+    Organization,
+    OrganizationCreate,
+    OrganizationOverview,
+    OrganizationUpdate,
+)
 from routes.organization_roles import router as organization_roles_router
-from utils.auth import get_current_user
+from utils.auth import get_current_user, get_optional_current_user
+from utils.authorization import (
+    ensure_org_admin,
+    get_current_memberships,
+    invalidate_memberships,
+    load_memberships,
+)
+from utils.categories import category_ids_filter
+from utils.deletion_jobs import create_job, find_active_job, submit_job
+from utils.org_overview import (
+    invalidate_organization_overview,
+    load_organization_overview,
+)
 
 router = APIRouter(prefix="/organization", tags=["organization"])
 
+# number of rows pulled from sqlite per fetchmany call while streaming exports
+EXPORT_FETCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "event_id",
+    "event_name",
+    "event_date_time",
+    "user_id",
+    "first_name",
+    "last_name",
+    "email",
+    "registration_time",
+]
+
 
 @router.get("", response_model=list[Organization])
 def list_organizations(
@@ -16,9 +52,10 @@ def list_organizations(
     skip: int = 0,
     limit: int = 10,
     query: str | None = None,
+    category: list[str] | None = Query(None),
 ):
     """
-    List organizations with pagination and optional search query.
+    List organizations with pagination, optional search query and category filter.
 
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
@@ -28,20 +65,30 @@ def list_organizations(
     :type limit: int, optional
     :param query: optional search query to filter organizations by name or description, defaults to None
     :type query: str | None, optional
+    :param category: optional category slugs to filter organizations by, defaults to None
+    :type category: list[str] | None, optional
     """
     base_sql = """
         SELECT organization_id, name, description, category, created_by_user_id
         FROM organizations
     """
     params: list[object] = []
+    conditions: list[str] = []
     if query:
-        base_sql += """
-            WHERE lower(name) LIKE ?
-               OR lower(description) LIKE ?
-        """
+        conditions.append("(lower(name) LIKE ? OR lower(description) LIKE ?)")
         term = f"%{query.lower()}%"
         params.extend([term, term])
 
+    if category:
+        category_ids = category_ids_filter(category)
+        if not category_ids:
+            return []
+        conditions.append(f"category_id IN ({', '.join('?' for _ in category_ids)})")
+        params.extend(category_ids)
+
+    if conditions:
+        base_sql += " WHERE " + " AND ".join(conditions)
+
     base_sql += " ORDER BY organization_id LIMIT ? OFFSET ?"
     params.extend([limit, skip])
 
@@ -113,6 +160,7 @@ def create_organization(
         (user_id, organization_id, "admin"),
     )
     _conn.commit()
+    invalidate_memberships(user_id)
 
     return Organization(
         organization_id=organization_id,
@@ -155,7 +203,41 @@ def get_organization(
     )
 
 
-@router.delete("/{organization_id}", response_model=Organization)
+@router.get("/{organization_id}/overview", response_model=OrganizationOverview)
+def get_organization_overview(
+    organization_id: int,
+    _conn: sqlite3.Connection = Depends(get_connection),
+    current_user: Optional[dict] = Depends(get_optional_current_user),
+):
+    """
+    Get everything the organization page shows in one request: the organization, its
+    member count and admins, its upcoming events with their registration counts, and
+    the caller's own role (None when anonymous or not a member).
+
+    Everything but the caller's role is cached per organization and refreshed whenever
+    the organization, its members, events or registrations change.
+
+    :param organization_id: the ID of the organization to retrieve
+    :type organization_id: int
+    :param _conn: the connection to the database
+    :type _conn: sqlite3.Connection
+    """
+    overview = load_organization_overview(_conn, organization_id)
+    if overview is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found"
+        )
+    my_role = None
+    if current_user is not None:
+        my_role = load_memberships(_conn, current_user["user_id"]).get(organization_id)
+    return OrganizationOverview(**overview, my_role=my_role)
+
+
+@router.delete(
+    "/{organization_id}",
+    response_model=DeletionJob,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 def delete_organization(
     organization_id: int,
     _conn: sqlite3.Connection = Depends(get_connection),
@@ -164,17 +246,17 @@ def delete_organization(
     """
     Delete an organization if the requesting user is the creator.
 
+    The organization, its events, their registrations and its roles are removed in the
+    background, in small chunks. Returns the deletion job, whose progress can be followed
+    at ``/api/deletion-jobs/{job_id}``. Repeating the request returns the same job.
+
     :param organization_id: the organization to delete
     :type organization_id: int
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
     """
     row = _conn.execute(
-        """
-        SELECT organization_id, name, description, category, created_by_user_id
-        FROM organizations
-        WHERE organization_id = ?
-        """,
+        "SELECT created_by_user_id FROM organizations WHERE organization_id = ?",
         (organization_id,),
     ).fetchone()
     if row is None:
@@ -188,19 +270,14 @@ def delete_organization(
             detail="Only the organization creator can delete this organization",
         )
 
-    _conn.execute(
-        "DELETE FROM organizations WHERE organization_id = ?",
-        (organization_id,),
-    )
-    _conn.commit()
-
-    return Organization(
-        organization_id=row["organization_id"],
-        name=row["name"],
-        description=row["description"],
-        category=row["category"],
-        created_by_user_id=row["created_by_user_id"],
-    )
+    job = find_active_job(_conn, "organization", organization_id)
+    if job is None:
+        job = create_job(
+            _conn, "organization", organization_id, _current_user["user_id"]
+        )
+        _conn.commit()
+        submit_job(job["job_id"])
+    return DeletionJob(**job)
 
 
 @router.put("/{organization_id}", response_model=Organization)
@@ -208,7 +285,7 @@ def update_organization(
     organization_id: int,
     payload: OrganizationUpdate,
     _conn: sqlite3.Connection = Depends(get_connection),
-    _current_user: dict = Depends(get_current_user),
+    _memberships: dict[int, str] = Depends(get_current_memberships),
 ):
     """
     Update organization name/description if the user is an admin.
@@ -233,19 +310,11 @@ def update_organization(
             status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found"
         )
 
-    role_row = _conn.execute(
-        """
-        SELECT permission_level
-        FROM roles
-        WHERE organization_id = ? AND user_id = ?
-        """,
-        (organization_id, _current_user["user_id"]),
-    ).fetchone()
-    if role_row is None or role_row["permission_level"] != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only organization admins can update this organization",
-        )
+    ensure_org_admin(
+        _memberships,
+        organization_id,
+        detail="Only organization admins can update this organization",
+    )
 
     updated_name = payload.name if payload.name is not None else row["name"]
     updated_description = (
@@ -264,6 +333,7 @@ def update_organization(
         (updated_name, updated_description, updated_category, organization_id),
     )
     _conn.commit()
+    invalidate_organization_overview(organization_id)
 
     return Organization(
         organization_id=row["organization_id"],
@@ -274,5 +344,106 @@ def update_organization(
     )
 
 
+def _stream_roster_rows(
+    query: str, params: list[object], delimiter: str
+) -> Iterator[str]:
+    """
+    Yield the export as delimited text, one chunk per ``fetchmany`` batch.
+
+    Runs on its own connection because the request-scoped one is closed before
+    the response body is streamed.
+    """
+    conn = connect()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=delimiter)
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(tuple(row) for row in rows)
+            yield buffer.getvalue()
+    finally:
+        conn.close()
+
+
+@router.get("/{organization_id}/registrations/export")
+def export_organization_registrations(
+    organization_id: int,
+    event_id: Optional[int] = None,
+    begin_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    format: Literal["csv", "tsv"] = "csv",
+    _memberships: dict[int, str] = Depends(get_current_memberships),
+):
+    """
+    Export the registration roster of an organization, including volunteer names and emails.
+    Only admins of the organization may export its roster.
+
+    Rows are streamed straight from a single joined query, so memory use does not grow
+    with the size of the export.
+
+    :param organization_id: the organization to export registrations for
+    :type organization_id: int
+    :param event_id: only export registrations for this event
+    :type event_id: Optional[int]
+    :param begin_date: only export registrations for events on or after this date
+    :type begin_date: Optional[str]
+    :param end_date: only export registrations for events on or before this date
+    :type end_date: Optional[str]
+    :param format: ``csv`` (comma separated) or ``tsv`` (tab separated), defaults to ``csv``
+    :type format: str
+    """
+    ensure_org_admin(
+        _memberships,
+        organization_id,
+        detail="Only organization admins can export registrations",
+    )
+
+    # scoped on the organization owning the event, not the organization_id stored on
+    # the registration, so events moved between organizations export correctly
+    query = """
+        SELECT er.event_id, e.name AS event_name, e.date_time AS event_date_time,
+               er.user_id, u.first_name, u.last_name, u.email, er.registration_time
+        FROM events e
+        JOIN event_registrations er ON er.event_id = e.id
+        JOIN users u ON u.user_id = er.user_id
+        WHERE e.organization_id = ?
+    """
+    params: list[object] = [organization_id]
+
+    if event_id is not None:
+        query += " AND e.id = ?"
+        params.append(event_id)
+
+    # compared on the raw ISO text so idx_events_org_date narrows the range
+    if begin_date is not None:
+        query += " AND e.date_time >= date(?)"
+        params.append(begin_date)
+
+    if end_date is not None:
+        query += " AND e.date_time < date(?, '+1 day')"
+        params.append(end_date)
+
+    # idx_events_org_date yields the events in this order and
+    # idx_event_registrations_event their volunteers, so no temporary sort is needed
+    query += " ORDER BY e.date_time, e.id, er.user_id"
+
+    delimiter = "\t" if format == "tsv" else ","
+    media_type = "text/tab-separated-values" if format == "tsv" else "text/csv"
+    filename = f"organization-{organization_id}-registrations.{format}"
+    return StreamingResponse(
+        _stream_roster_rows(query, params, delimiter),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 # TODO: not sure if this is the right pattern or not?
 router.include_router(organization_roles_router, prefix="/{organization_id}/users")
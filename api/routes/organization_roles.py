@@ -1,12 +1,33 @@
+import base64
 import sqlite3
+from dataclasses import asdict
 from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
 from pydantic import BaseModel, PositiveInt
 
 from db import get_connection
 from models import RoleAndUser, RoleUpdate
+from models.user import UserImportReport
 from utils.auth import get_current_user
+from utils.authorization import (
+    ensure_org_admin,
+    get_current_memberships,
+    invalidate_memberships,
+    require_org_admin,
+)
+from utils.deletion_jobs import ensure_organization_not_deleted
+from utils.org_overview import invalidate_organization_overview
+from utils.user_import import ImportFileError, import_users, read_import_rows
 
 
 class RoleCreateRequest(BaseModel):
@@ -16,31 +37,91 @@ class RoleCreateRequest(BaseModel):
 
 router = APIRouter(prefix="")
 
+MEMBERS_PAGE_SIZE = 100
+MEMBERS_MAX_PAGE_SIZE = 500
+
 
 @router.get("", response_model=list[RoleAndUser])
 def list_organization_users(
-    organization_id: int, _conn: sqlite3.Connection = Depends(get_connection), _current_user: dict = Depends(get_current_user)
+    organization_id: int,
+    response: Response,
+    _conn: sqlite3.Connection = Depends(get_connection),
+    _current_user: dict = Depends(get_current_user),
+    limit: int = Query(MEMBERS_PAGE_SIZE, ge=1, le=MEMBERS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    permission_level: Optional[Literal["admin", "volunteer"]] = None,
+    query: Optional[str] = None,
 ):
     """
-    List all users in an organization, along with their role. This is used to manage users in an organization, and to display the list of users in an organization.
+    List users in an organization, along with their role. This is used to manage users in an organization, and to display the list of users in an organization.
 
-    TODO: add pagination/filtering against role
+    Members are ordered admins first, then by user ID, and returned one page at a time.
+    The ``X-Total-Count`` response header holds the number of members matching the
+    filters and ``X-Next-Cursor`` the cursor for the next page (absent on the last page).
 
     :param organization_id: the ID of the organization to list users for
     :type organization_id: int
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
+    :param limit: maximum number of members to return, defaults to 100
+    :type limit: int, optional
+    :param cursor: the ``X-Next-Cursor`` value of the previous page, defaults to None
+    :type cursor: str | None, optional
+    :param permission_level: only list members with this role, defaults to None
+    :type permission_level: str | None, optional
+    :param query: only list members whose name contains this text, defaults to None
+    :type query: str | None, optional
     """
+    conditions = ["r.organization_id = ?"]
+    params: list[object] = [organization_id]
+    if permission_level is not None:
+        conditions.append("r.permission_level = ?")
+        params.append(permission_level)
+
+    # the join to users is only needed to search by name
+    join = ""
+    if query:
+        join = "JOIN users u ON u.user_id = r.user_id"
+        conditions.append("lower(u.first_name || ' ' || u.last_name) LIKE ?")
+        params.append(f"%{query.lower()}%")
+
+    where = " AND ".join(conditions)
+    # answered from idx_roles_org_level alone unless searching by name
+    total = _conn.execute(
+        f"SELECT COUNT(*) FROM roles r {join} WHERE {where}", params
+    ).fetchone()[0]
+
+    page_conditions = list(conditions)
+    page_params = list(params)
+    if cursor is not None:
+        after = _decode_members_cursor(cursor)
+        page_conditions.append("(r.permission_level, r.user_id) > (?, ?)")
+        page_params.extend(after)
+
     rows = _conn.execute(
-        """
-        SELECT r.user_id, r.organization_id,  r.permission_level, u.first_name, u.last_name
-        FROM roles r
-        JOIN users u ON r.user_id = u.user_id
-        WHERE r.organization_id = ?
+        f"""
+        SELECT r.user_id, r.permission_level, u.first_name, u.last_name
+        FROM (
+            SELECT r.user_id, r.permission_level
+            FROM roles r {join}
+            WHERE {" AND ".join(page_conditions)}
+            ORDER BY r.permission_level, r.user_id
+            LIMIT ?
+        ) r
+        JOIN users u ON u.user_id = r.user_id
+        ORDER BY r.permission_level, r.user_id
         """,
-        (organization_id,),
+        [*page_params, limit + 1],
     ).fetchall()
 
+    response.headers["X-Total-Count"] = str(total)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_members_cursor(
+            last["permission_level"], last["user_id"]
+        )
+
     return [
         RoleAndUser(
             user_id=row["user_id"],
@@ -52,6 +133,22 @@ def list_organization_users(
     ]
 
 
+def _encode_members_cursor(permission_level: str, user_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{permission_level}:{user_id}".encode()).decode()
+
+
+def _decode_members_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        permission_level, user_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        )
+        return permission_level, int(user_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
 @router.post("", response_model=RoleAndUser, status_code=status.HTTP_201_CREATED)
 def add_organization_user(
     organization_id: int,
@@ -71,6 +168,7 @@ def add_organization_user(
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
     """
+    ensure_organization_not_deleted(_conn, organization_id)
     effective_user_id = (
         payload.user_id if payload.user_id is not None else _current_user["user_id"]
     )
@@ -93,6 +191,8 @@ def add_organization_user(
             (effective_user_id, organization_id, payload.permission_level),
         )
         _conn.commit()
+        invalidate_memberships(effective_user_id)
+        invalidate_organization_overview(organization_id)
     except sqlite3.IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -107,6 +207,49 @@ def add_organization_user(
     )
 
 
+@router.post("/import", response_model=UserImportReport)
+def import_organization_users(
+    organization_id: int,
+    file: UploadFile = File(...),
+    _conn: sqlite3.Connection = Depends(get_connection),
+    _memberships: dict[int, str] = Depends(require_org_admin),
+):
+    """
+    Create users in bulk from a CSV file and add them to the organization as volunteers.
+
+    The file needs ``email``, ``first_name`` and ``last_name`` columns, and may have
+    ``availability``, ``skills`` and ``interests`` (separated by ``;``). Rows are
+    streamed and inserted in batches, each batch in its own transaction. Invalid rows
+    and rows whose email is already taken are skipped and listed in the report.
+
+    Imported users have no password yet; they set one with the password reset flow.
+
+    :param organization_id: the organization to add the users to
+    :type organization_id: int
+    :param file: the CSV file to import
+    :type file: UploadFile
+    :param _conn: the connection to the database
+    :type _conn: sqlite3.Connection
+    """
+    exists = _conn.execute(
+        "SELECT 1 FROM organizations WHERE organization_id = ?", (organization_id,)
+    ).fetchone()
+    if exists is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found"
+        )
+    ensure_organization_not_deleted(_conn, organization_id)
+
+    try:
+        rows = read_import_rows(file.file)
+    except ImportFileError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    report = import_users(_conn, organization_id, rows)
+    invalidate_organization_overview(organization_id)
+    return UserImportReport(**asdict(report))
+
+
 @router.delete(
     "/{user_id}",
     response_model=RoleAndUser,
@@ -117,6 +260,7 @@ def remove_organization_user(
     user_id: int,
     _conn: sqlite3.Connection = Depends(get_connection),
     _current_user: dict = Depends(get_current_user),
+    _memberships: dict[int, str] = Depends(get_current_memberships),
 ):
     """
     Remove a user from an organization by deleting their role connecting the user and the organization. This can only be performed by users within the organization with the role of admin, or
@@ -132,15 +276,11 @@ def remove_organization_user(
 
     # Check permission: must be the target user or an org admin
     if user_id != _current_user["user_id"]:
-        admin_row = _conn.execute(
-            "SELECT permission_level FROM roles WHERE organization_id = ? AND user_id = ? AND permission_level = 'admin'",
-            (organization_id, _current_user["user_id"]),
-        ).fetchone()
-        if admin_row is None:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only admins or the user themselves can remove a member",
-            )
+        ensure_org_admin(
+            _memberships,
+            organization_id,
+            detail="Only admins or the user themselves can remove a member",
+        )
 
     row = _conn.execute(
         """
@@ -162,6 +302,8 @@ def remove_organization_user(
         (organization_id, user_id),
     )
     _conn.commit()
+    invalidate_memberships(user_id)
+    invalidate_organization_overview(organization_id)
 
     return RoleAndUser(
         user_id=row["user_id"],
@@ -181,7 +323,7 @@ def update_organization_user_role(
     user_id: int,
     payload: RoleUpdate,
     _conn: sqlite3.Connection = Depends(get_connection),
-    _current_user: dict = Depends(get_current_user),
+    _memberships: dict[int, str] = Depends(require_org_admin),
 ):
     """
     Update a user's permission level in an organization.
@@ -195,15 +337,6 @@ def update_organization_user_role(
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
     """
-    admin_row = _conn.execute(
-        "SELECT permission_level FROM roles WHERE organization_id = ? AND user_id = ? AND permission_level = 'admin'",
-        (organization_id, _current_user["user_id"]),
-    ).fetchone()
-    if admin_row is None:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only organization admins can update member roles",
-        )
 
     row = _conn.execute(
         """
@@ -218,6 +351,7 @@ def update_organization_user_role(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
+    ensure_organization_not_deleted(_conn, organization_id)
 
     _conn.execute(
         """
@@ -228,6 +362,8 @@ def update_organization_user_role(
         (payload.permission_level, organization_id, user_id),
     )
     _conn.commit()
+    invalidate_memberships(user_id)
+    invalidate_organization_overview(organization_id)
 
     return RoleAndUser(
         user_id=row["user_id"],
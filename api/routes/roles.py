@@ -1,10 +1,11 @@
 import sqlite3
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends
 
 from db import get_connection
 from models import Role
 from utils.auth import get_current_user
+from utils.authorization import load_memberships
 
 router = APIRouter(prefix="/roles")
 
@@ -22,28 +23,13 @@ def get_user_roles(
     """
     user_id = current_user["user_id"]
 
-    user_row = _conn.execute(
-        "SELECT user_id FROM users WHERE user_id = ?", (user_id,)
-    ).fetchone()
-    if user_row is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
-
-    rows = _conn.execute(
-        """
-        SELECT user_id, organization_id, permission_level
-        FROM roles
-        WHERE user_id = ?
-        """,
-        (user_id,),
-    ).fetchall()
-
     return [
         Role(
-            user_id=row["user_id"],
-            organization_id=row["organization_id"],
-            permission_level=row["permission_level"],
+            user_id=user_id,
+            organization_id=organization_id,
+            permission_level=permission_level,
         )
-        for row in rows
+        for organization_id, permission_level in load_memberships(
+            _conn, user_id
+        ).items()
     ]
@@ -1,11 +1,16 @@
 import sqlite3
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from db import get_connection
 from models import User
 from models.user import UserUpdate
-from utils.auth import get_current_user
+from utils.auth import get_current_user, invalidate_principal
+from utils.categories import CATEGORY_BITS, category_slug, interests_mask
+from utils.dashboard import invalidate_dashboard
+from utils.skills import MAX_SKILLS_PER_QUERY, skills_filter_sql, sync_user_skills
+from utils.user_search import index_user, load_interests, search_user_ids
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -17,11 +22,21 @@ def list_users(
     limit: int = 10,
     query: str | None = None,
     availability: str | None = None,
+    interests: list[str] | None = Query(None),
+    interests_match: Literal["any", "all"] = "any",
+    skills: list[str] | None = Query(None, max_length=MAX_SKILLS_PER_QUERY),
+    skills_match: Literal["any", "all"] = "any",
 ):
     """
     List users with pagination, optional search query and the ability to filter by specific properties, currently supporting:
 
     - availability
+    - interests, matching users with any (or all) of the given categories
+    - skills, matching users with any (or all) of the given skills
+
+    The search query is matched against email, first name and last name through a
+    trigram index, so it tolerates typos; results are ordered by match quality.
+    Without a query, users are listed in ``user_id`` order.
 
     :param _conn: the connection to the database
     :type _conn: sqlite3.Connection
@@ -31,35 +46,72 @@ def list_users(
     :type limit: int, optional
     :param query: optional search query to filter users by email, first name, or last name, defaults to None
     :type query: str | None, optional
+    :param availability: optional availability to filter users by, defaults to None
+    :type availability: str | None, optional
+    :param interests: optional interest categories to filter users by, defaults to None
+    :type interests: list[str] | None, optional
+    :param interests_match: whether users need "any" or "all" of ``interests``, defaults to "any"
+    :type interests_match: str, optional
+    :param skills: optional skills to filter users by, compared case-insensitively, defaults to None
+    :type skills: list[str] | None, optional
+    :param skills_match: whether users need "any" or "all" of ``skills``, defaults to "any"
+    :type skills_match: str, optional
     """
-
-    base_sql = """
-        SELECT u.user_id, u.email, u.first_name, u.last_name, u.availability, u.skills,
-               GROUP_CONCAT(ui.category) as interests_str
-        FROM users u
-        LEFT JOIN user_interests ui ON u.user_id = ui.user_id
-    """
-    params: list[object] = []
     conditions: list[str] = []
-
-    if query:
-        conditions.append(
-            "(lower(u.email) LIKE ? OR lower(u.first_name) LIKE ? OR lower(u.last_name) LIKE ?)"
-        )
-        term = f"%{query.lower()}%"
-        params.extend([term, term, term])
-
+    params: list[object] = []
     if availability:
         conditions.append("u.availability = ?")
         params.append(availability)
-
-    if conditions:
-        base_sql += " WHERE " + " AND ".join(conditions)
-
-    base_sql += " GROUP BY u.user_id ORDER BY u.user_id LIMIT ? OFFSET ?"
-    params.extend([limit, skip])
-
-    rows = _conn.execute(base_sql, params).fetchall()
+    if interests:
+        unknown = [i for i in interests if category_slug(i) not in CATEGORY_BITS]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown interest categories: {', '.join(unknown)}",
+            )
+        mask = interests_mask(interests)
+        if interests_match == "all":
+            conditions.append("u.interests_mask & ? = ?")
+            params.extend([mask, mask])
+        else:
+            conditions.append("u.interests_mask & ? != 0")
+            params.append(mask)
+
+    if skills:
+        skills_filter = skills_filter_sql(_conn, skills, skills_match)
+        if skills_filter is None:
+            return []
+        conditions.append(skills_filter[0])
+        params.extend(skills_filter[1])
+
+    if query and query.strip():
+        user_ids = search_user_ids(_conn, query, limit, skip, conditions, params)
+        if not user_ids:
+            return []
+        placeholders = ", ".join("?" for _ in user_ids)
+        rows = _conn.execute(
+            f"""
+            SELECT user_id, email, first_name, last_name, availability, skills
+            FROM users
+            WHERE user_id IN ({placeholders})
+            """,
+            user_ids,
+        ).fetchall()
+        rank = {user_id: position for position, user_id in enumerate(user_ids)}
+        rows.sort(key=lambda row: rank[row["user_id"]])
+    else:
+        base_sql = """
+            SELECT u.user_id, u.email, u.first_name, u.last_name, u.availability, u.skills
+            FROM users u
+        """
+        if conditions:
+            base_sql += " WHERE " + " AND ".join(conditions)
+        base_sql += " ORDER BY u.user_id LIMIT ? OFFSET ?"
+        params.extend([limit, skip])
+        rows = _conn.execute(base_sql, params).fetchall()
+
+    # interests are only gathered for the page being returned
+    interests = load_interests(_conn, [row["user_id"] for row in rows])
     return [
         User(
             user_id=row["user_id"],
@@ -68,7 +120,7 @@ def list_users(
             last_name=row["last_name"],
             availability=row["availability"],
             skills=row["skills"] or "",
-            interests=row["interests_str"].split(",") if row["interests_str"] else [],
+            interests=interests[row["user_id"]],
         )
         for row in rows
     ]
@@ -144,6 +196,15 @@ def update_user(
         ),
     )
 
+    if (updated_first_name, updated_last_name) != (
+        row["first_name"],
+        row["last_name"],
+    ):
+        index_user(_conn, user_id, row["email"], updated_first_name, updated_last_name)
+
+    if payload.skills is not None:
+        sync_user_skills(_conn, user_id, updated_skills)
+
     # Upsert user_interests if provided
     if payload.interests is not None:
         _conn.execute(
@@ -157,6 +218,8 @@ def update_user(
             )
 
     _conn.commit()
+    invalidate_principal(user_id)
+    invalidate_dashboard(user_id)
 
     # Fetch updated interests
     interest_rows = _conn.execute(
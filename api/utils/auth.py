@@ -1,4 +1,5 @@
 import sqlite3
+import time
 from typing import Optional
 
 import jwt
@@ -6,11 +7,81 @@ from fastapi import Cookie, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 from db import get_connection
+from utils.cache import TTLCache
+from utils.request_context import shared_principal
+from utils.revocation import is_token_revoked, sync_revocations
 from utils.security import decode_access_token
+from utils.sessions import (
+    SESSION_PRINCIPAL_TTL_SECONDS,
+    is_session_id,
+    session_store,
+)
 
 # Points to our login endpoint so Swagger UI knows where to send credentials. We are telling FastAPI to look for a bearer token in the Auth header.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
+PRINCIPAL_CACHE_SIZE = 10_000
+PRINCIPAL_CACHE_TTL_SECONDS = 60
+
+# Authenticated principals keyed by the token's "sub" claim, so authenticated requests
+# don't need a users lookup. Call invalidate_principal whenever a user row changes.
+_principal_cache = TTLCache(
+    maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS, name="principals"
+)
+
+
+def invalidate_principal(user_id: int | str) -> None:
+    """
+    Drop the cached principal for a user. Must be called after the user's row is
+    updated or deleted, or their credentials change.
+    """
+    _principal_cache.pop(str(user_id))
+    session_store.forget_principal(int(user_id))
+
+
+def _load_principal(conn: sqlite3.Connection, user_id: int | str) -> dict:
+    """Return the principal for a user ID, from the cache or the database."""
+    principal = _principal_cache.get(str(user_id))
+    if principal is None:
+        row = conn.execute(
+            "SELECT user_id, email, first_name, last_name FROM users WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        principal = {
+            "user_id": row["user_id"],
+            "email": row["email"],
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+        }
+        _principal_cache.set(str(user_id), principal)
+    return principal
+
+
+def _resolve_session(conn: sqlite3.Connection, session_id: str) -> dict:
+    """Resolve an opaque session ID (SESSION_MODE=opaque) to its principal."""
+    session = session_store.resolve(conn, session_id)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired session",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    now = time.monotonic()
+    if (
+        session.principal is None
+        or now - session.principal_loaded_at > SESSION_PRINCIPAL_TTL_SECONDS
+    ):
+        session.principal = _load_principal(conn, session.user_id)
+        session.principal_loaded_at = now
+    return session.principal
+
 
 def get_current_user(
     bearer_token: Optional[str] = Depends(oauth2_scheme),
@@ -21,12 +92,24 @@ def get_current_user(
     Decode the JWT from the session cookie or Authorization header, fetch the
     user from the DB, and return a dict with user info.
 
+    Users are cached for ``PRINCIPAL_CACHE_TTL_SECONDS`` after the first lookup, so
+    repeated requests with the same user skip the DB entirely.
+
     The session cookie is checked first; the Authorization Bearer header is
     kept as a fallback so Swagger UI continues to work.
 
+    With ``SESSION_MODE=opaque`` the cookie holds a server-side session ID instead,
+    which resolves to the session and its principal with one lookup.
+
     Raises 401 if neither is present, the token is invalid/expired, or the
     user no longer exists.
+
+    Sub-requests of a batch reuse the principal the batch already resolved.
     """
+    shared = shared_principal.get()
+    if shared is not None:
+        return dict(shared)
+
     token = session or bearer_token
     if token is None:
         raise HTTPException(
@@ -35,6 +118,10 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if is_session_id(token):
+        # hand out a copy so callers can't mutate the cached entry
+        return dict(_resolve_session(conn, token))
+
     try:
         claims = decode_access_token(token)
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
@@ -44,28 +131,42 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user_id = claims.get("sub")
-    if user_id is None:
+    sync_revocations(conn)
+    if is_token_revoked(claims):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token claims",
+            detail="Token has been revoked",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    row = conn.execute(
-        "SELECT user_id, email, first_name, last_name FROM users WHERE user_id = ?",
-        (user_id,),
-    ).fetchone()
-    if row is None:
+    user_id = claims.get("sub")
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            detail="Invalid token claims",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return {
-        "user_id": row["user_id"],
-        "email": row["email"],
-        "first_name": row["first_name"],
-        "last_name": row["last_name"],
-    }
+    principal = _load_principal(conn, user_id)
+
+    # hand out a copy so callers can't mutate the cached entry
+    return dict(principal)
+
+
+def get_optional_current_user(
+    bearer_token: Optional[str] = Depends(oauth2_scheme),
+    session: Optional[str] = Cookie(default=None),
+    conn: sqlite3.Connection = Depends(get_connection),
+) -> Optional[dict]:
+    """
+    Like ``get_current_user``, but for routes that also serve anonymous visitors.
+
+    Returns None instead of raising 401 when no token is present or the token is
+    invalid/expired, so a stale cookie never breaks a public page.
+    """
+    if session is None and bearer_token is None:
+        return None
+    try:
+        return get_current_user(bearer_token=bearer_token, session=session, conn=conn)
+    except HTTPException:
+        return None
@@ -0,0 +1,119 @@
+"""
+Organization-level authorization shared by the routers.
+
+A user's memberships (organization ID -> permission level) are loaded with a single
+query, cached for ``MEMBERSHIP_CACHE_TTL_SECONDS`` and resolved at most once per request
+through the ``get_current_memberships`` dependency. Any code that changes the ``roles``
+table must call ``invalidate_memberships`` (or ``invalidate_organization_memberships``)
+afterwards.
+"""
+
+import sqlite3
+from typing import Iterable
+
+from fastapi import Depends, HTTPException, status
+
+from db import get_connection
+from utils.auth import get_current_user
+from utils.cache import TTLCache
+
+MEMBERSHIP_CACHE_SIZE = 10_000
+MEMBERSHIP_CACHE_TTL_SECONDS = 60
+
+_membership_cache = TTLCache(
+    maxsize=MEMBERSHIP_CACHE_SIZE, ttl=MEMBERSHIP_CACHE_TTL_SECONDS, name="memberships"
+)
+
+
+def load_memberships(conn: sqlite3.Connection, user_id: int) -> dict[int, str]:
+    """
+    Return the user's memberships as a mapping of organization ID to permission level.
+
+    :param conn: the connection to the database, only used on a cache miss
+    :type conn: sqlite3.Connection
+    :param user_id: the user to load memberships for
+    :type user_id: int
+    """
+    memberships = _membership_cache.get(user_id)
+    if memberships is None:
+        rows = conn.execute(
+            "SELECT organization_id, permission_level FROM roles WHERE user_id = ?",
+            (user_id,),
+        ).fetchall()
+        memberships = {row["organization_id"]: row["permission_level"] for row in rows}
+        _membership_cache.set(user_id, memberships)
+    # hand out a copy so callers can't mutate the cached entry
+    return dict(memberships)
+
+
+def invalidate_memberships(user_id: int) -> None:
+    """Drop the cached memberships of a user after one of their roles changed."""
+    _membership_cache.pop(user_id)
+
+
+def invalidate_organization_memberships(organization_id: int) -> None:
+    """Drop the cached memberships of every member of an organization."""
+    _membership_cache.pop_where(lambda _, memberships: organization_id in memberships)
+
+
+def _as_ids(organization_ids: int | Iterable[int]) -> list[int]:
+    if isinstance(organization_ids, int):
+        return [organization_ids]
+    return list(organization_ids)
+
+
+def ensure_org_admin(
+    memberships: dict[int, str],
+    organization_ids: int | Iterable[int],
+    detail: str = "Only organization admins can perform this action",
+) -> None:
+    """
+    Raise 403 unless the memberships grant admin in every given organization.
+
+    Accepts a single ID or many, so bulk endpoints can check all their organizations
+    with one call and no extra queries.
+    """
+    if any(memberships.get(org_id) != "admin" for org_id in _as_ids(organization_ids)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
+def ensure_member(
+    memberships: dict[int, str],
+    organization_ids: int | Iterable[int],
+    detail: str = "Only organization members can perform this action",
+) -> None:
+    """Raise 403 unless the memberships include every given organization, with any role."""
+    if any(org_id not in memberships for org_id in _as_ids(organization_ids)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
+def get_current_memberships(
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_connection),
+) -> dict[int, str]:
+    """Dependency returning the authenticated user's memberships."""
+    return load_memberships(conn, current_user["user_id"])
+
+
+def require_org_admin(
+    organization_id: int,
+    memberships: dict[int, str] = Depends(get_current_memberships),
+) -> dict[int, str]:
+    """
+    Dependency for routes with an ``organization_id`` parameter that only admins of
+    that organization may call. Returns the caller's memberships.
+    """
+    ensure_org_admin(memberships, organization_id)
+    return memberships
+
+
+def require_member(
+    organization_id: int,
+    memberships: dict[int, str] = Depends(get_current_memberships),
+) -> dict[int, str]:
+    """
+    Dependency for routes with an ``organization_id`` parameter that any member of that
+    organization may call. Returns the caller's memberships.
+    """
+    ensure_member(memberships, organization_id)
+    return memberships
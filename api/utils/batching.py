@@ -0,0 +1,110 @@
+"""
+In-process dispatch of batched GET sub-requests.
+
+Each sub-request is run through the ASGI app itself, so it gets the same routing,
+validation, dependencies and error handling as a request from the network. They run
+one after the other on the batch's connection (``utils.request_context``), and the
+batch stops dispatching once its time budget or response size budget is used up.
+"""
+
+import json
+import time
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message
+
+BATCH_MAX_REQUESTS = 10
+# checked between sub-requests; a sub-request that already started runs to the end
+BATCH_TIME_BUDGET_SECONDS = 5.0
+BATCH_MAX_RESPONSE_BYTES = 2_000_000
+
+BATCH_PATH = "/api/batch"
+# only the caller's credentials are passed on to sub-requests
+_FORWARDED_HEADERS = (b"cookie", b"authorization")
+
+
+def validate_batch_path(path: str) -> Optional[str]:
+    """Return why ``path`` can't be batched, or None if it can."""
+    parts = urlsplit(path)
+    if parts.scheme or parts.netloc or not parts.path.startswith("/api/"):
+        return "Sub-request paths must be absolute /api/ paths"
+    if parts.path.rstrip("/") == BATCH_PATH:
+        return "Batches can't be nested"
+    return None
+
+
+async def dispatch_get(app: ASGIApp, request: Request, path: str) -> dict[str, Any]:
+    """
+    Run ``GET path`` through ``app`` with the credentials of ``request`` and return its
+    ``status``, ``headers`` and ``body`` (decoded from JSON when it is JSON).
+    """
+    parts = urlsplit(path)
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": request.scope.get("scheme", "http"),
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "root_path": request.scope.get("root_path", ""),
+        "query_string": parts.query.encode(),
+        "headers": [
+            (name, value)
+            for name, value in request.scope["headers"]
+            if name in _FORWARDED_HEADERS
+        ],
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+    }
+
+    request_sent = False
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.disconnect"}
+
+    status_code = 500
+    headers: dict[str, str] = {}
+    chunks: list[bytes] = []
+
+    async def send(message: Message) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            headers.update(
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in message.get("headers", [])
+            )
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+
+    raw = b"".join(chunks)
+    headers.pop("content-length", None)
+    body: Any = raw.decode("utf-8", errors="replace")
+    if headers.get("content-type", "").startswith("application/json") and raw:
+        body = json.loads(raw)
+    return {"status": status_code, "headers": headers, "body": body, "size": len(raw)}
+
+
+class BatchBudget:
+    """Tracks the time and response bytes a batch has used."""
+
+    def __init__(self) -> None:
+        self._deadline = time.monotonic() + BATCH_TIME_BUDGET_SECONDS
+        self.response_bytes = 0
+
+    def exhausted(self) -> Optional[tuple[int, str]]:
+        """Return the status and reason to fail the remaining sub-requests with, if any."""
+        if time.monotonic() >= self._deadline:
+            return 504, "Batch time budget exceeded"
+        if self.response_bytes >= BATCH_MAX_RESPONSE_BYTES:
+            return 413, "Batch response size limit exceeded"
+        return None
@@ -0,0 +1,65 @@
+"""
+Microbenchmark for the per-request authentication overhead.
+
+Compares what get_current_user did before caching (full JWT verification plus a users
+lookup on every request) with the current path (verified-token cache plus principal
+cache), using an in-memory database.
+
+Run from the api directory:
+
+    python -m utils.bench_auth
+"""
+
+import sqlite3
+import time
+from typing import Callable
+
+import jwt
+
+from utils.auth import get_current_user
+from utils.security import ALGORITHM, SECRET_KEY, create_access_token
+
+ITERATIONS = 20_000
+
+
+def _setup_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE users (user_id INTEGER PRIMARY KEY, email TEXT, first_name TEXT, last_name TEXT)"
+    )
+    conn.execute("INSERT INTO users VALUES (1, 'bench@example.com', 'Bench', 'Mark')")
+    return conn
+
+
+def _uncached(token: str, conn: sqlite3.Connection) -> dict:
+    """The pre-cache path: verify the JWT and look the user up on every call."""
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    row = conn.execute(
+        "SELECT user_id, email, first_name, last_name FROM users WHERE user_id = ?",
+        (claims["sub"],),
+    ).fetchone()
+    return dict(row)
+
+
+def _time_per_call(func: Callable[[], object]) -> float:
+    func()  # warm up caches
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func()
+    return (time.perf_counter() - start) / ITERATIONS * 1_000_000
+
+
+if __name__ == "__main__":
+    conn = _setup_db()
+    token = create_access_token({"sub": "1"})
+
+    before = _time_per_call(lambda: _uncached(token, conn))
+    after = _time_per_call(
+        lambda: get_current_user(bearer_token=None, session=token, conn=conn)
+    )
+
+    print(f"{ITERATIONS} iterations")
+    print(f"before (verify + SELECT): {before:8.2f} us/request")
+    print(f"after  (cached):          {after:8.2f} us/request")
+    print(f"speedup:                  {before / after:8.1f}x")
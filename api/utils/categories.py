@@ -1,5 +1,9 @@
 import random
+import sqlite3
 from enum import Enum
+from typing import Annotated, Any, Iterable, Optional
+
+from pydantic import BeforeValidator
 
 
 class categoriesEnum(str, Enum):
@@ -26,6 +30,116 @@ class categoriesEnum(str, Enum):
     technology_and_digital_literacy = "technology_and_digital_literacy"
 
 
+# Display names, as shown by the client and used by the event data generator
+CATEGORY_NAMES = {
+    categoriesEnum.animal_welfare: "Animal Welfare",
+    categoriesEnum.hunger_and_food_security: "Hunger and Food Security",
+    categoriesEnum.homelessness_and_housing: "Homelessness and Housing",
+    categoriesEnum.education_and_tutoring: "Education & Tutoring",
+    categoriesEnum.youth_and_children: "Youth and Children",
+    categoriesEnum.senior_care_and_support: "Senior Care and Support",
+    categoriesEnum.health_and_medical: "Health & Medical",
+    categoriesEnum.environmental_conservation: "Environmental Conservation",
+    categoriesEnum.community_development: "Community Development",
+    categoriesEnum.arts_and_culture: "Arts & Culture",
+    categoriesEnum.disaster_relief: "Disaster Relief",
+    categoriesEnum.veterans_and_military_families: "Veterans & Military Families",
+    categoriesEnum.immigrants_and_refugees: "Immigrants & Refugees",
+    categoriesEnum.disability_services: "Disability Services",
+    categoriesEnum.mental_health_and_crisis_support: "Mental Health & Crisis Support",
+    categoriesEnum.advocacy_and_human_rights: "Advocacy & Human Rights",
+    categoriesEnum.faith_based_services: "Faith-Based Services",
+    categoriesEnum.sports_and_recreation: "Sports & Recreation",
+    categoriesEnum.job_training_and_employment: "Job Training & Employment",
+    categoriesEnum.technology_and_digital_literacy: "Technology & Digital Literacy",
+}
+
+# Each category gets a fixed bit, its position in categoriesEnum, so a set of categories
+# fits in one integer (see users.interests_mask). Only ever append new categories.
+CATEGORY_BITS = {category.value: bit for bit, category in enumerate(categoriesEnum)}
+
+
+def category_slug(value: str) -> str:
+    """
+    Normalize a category as stored by the clients ("Arts & Culture", "Faith-Based
+    Services") to its categoriesEnum value ("arts_and_culture", "faith_based_services").
+
+    Must stay in sync with ``category_slug_sql``.
+    """
+    return (
+        value.strip()
+        .lower()
+        .replace(" & ", "_and_")
+        .replace("-", "_")
+        .replace(" ", "_")
+    )
+
+
+def category_slug_sql(expr: str) -> str:
+    """SQL equivalent of ``category_slug`` applied to the SQL expression ``expr``."""
+    return f"replace(replace(replace(lower(trim({expr})), ' & ', '_and_'), '-', '_'), ' ', '_')"
+
+
+def category_id(value: str) -> Optional[int]:
+    """Integer key of a category given as slug or display name, None if unknown."""
+    bit = CATEGORY_BITS.get(category_slug(value))
+    return None if bit is None else bit + 1
+
+
+def category_ids_filter(values: Iterable[str]) -> list[int]:
+    """Integer keys of the known categories among ``values``, for ``IN`` filters."""
+    return sorted({key for key in map(category_id, values) if key is not None})
+
+
+def _to_category_slug(value: Any) -> Any:
+    return category_slug(value) if isinstance(value, str) else value
+
+
+# categoriesEnum field that also accepts display names ("Arts & Culture")
+CategorySlug = Annotated[categoriesEnum, BeforeValidator(_to_category_slug)]
+
+
+def interests_mask(categories: Iterable[str]) -> int:
+    """Bitmask of the known categories in ``categories``; unknown ones are ignored."""
+    mask = 0
+    for category in categories:
+        bit = CATEGORY_BITS.get(category_slug(category))
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def seed_categories(conn: sqlite3.Connection) -> None:
+    """Make sure the categories table lists every categoriesEnum value."""
+    conn.executemany(
+        """
+        INSERT INTO categories (category_id, slug, name) VALUES (?, ?, ?)
+        ON CONFLICT (category_id) DO UPDATE SET slug = excluded.slug, name = excluded.name
+        """,
+        [
+            (bit + 1, slug, CATEGORY_NAMES[categoriesEnum(slug)])
+            for slug, bit in CATEGORY_BITS.items()
+        ],
+    )
+
+
+def backfill_category_ids(conn: sqlite3.Connection) -> None:
+    """
+    Resolve ``category_id`` for events and organizations written before the column
+    existed. New rows are handled by the triggers in DB_SCHEMA.
+    """
+    for table in ("events", "organizations"):
+        conn.execute(
+            f"""
+            UPDATE {table}
+            SET category_id = c.category_id, category = c.slug
+            FROM categories c
+            WHERE {table}.category_id IS NULL
+              AND c.slug = {category_slug_sql(f"{table}.category")}
+            """
+        )
+
+
 def generate_category():
     # Return a category for database seeding
     org_categories = [
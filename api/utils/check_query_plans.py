@@ -0,0 +1,515 @@
+"""
+Query-plan regression gate.
+
+Builds a synthetic database at production scale, sends every query shape the GET
+routes can produce through the app (every filter combination of ``list_events``, the
+user search and skill/interest filters, member listings, ...) and captures each SQL
+statement they run. For every statement fingerprint (see ``utils.query_stats``) the
+``EXPLAIN QUERY PLAN`` and the median time are compared with
+``query_plan_baseline.json``:
+
+- a full ``SCAN`` of a hot table that the baseline does not list for that fingerprint
+  fails the check (new fingerprints have an empty baseline);
+- a median time above the fingerprint's ``budget`` fails the check. Budgets are
+  relative to a calibration query (a full scan of ``events``) timed in the same run,
+  so they hold on slower or busier machines than the one that wrote the baseline.
+
+Some scans are expected, e.g. ``list_events`` without a date range walks every event in
+date order. They are recorded in the baseline, so only new ones are reported. Requests
+answered with an error fail the check, their queries would not be covered.
+
+Run from the api directory, and pass ``--update`` to accept the current plans and
+budgets after an intended change:
+
+    python -m utils.check_query_plans [--scale 1.0] [--update]
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+# hashing only has to work, not be slow; set before the app is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+import db  # noqa: E402
+from utils.categories import CATEGORY_BITS  # noqa: E402
+from utils.query_stats import fingerprint  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "query_plan_baseline.json"
+
+# rows per table at --scale 1
+USERS = 20_000
+ORGANIZATIONS = 500
+EVENTS = 20_000
+ROLES_PER_ORGANIZATION = 80
+REGISTRATIONS = 100_000
+
+HOT_TABLES = {
+    "users",
+    "events",
+    "event_registrations",
+    "roles",
+    "organizations",
+    "user_interests",
+    "user_skills",
+    "user_trigrams",
+    "credentials",
+}
+
+# query whose median time is the unit of the budgets
+CALIBRATION_SQL = "SELECT count(*), max(name), max(location) FROM events"
+CALIBRATION_RUNS = 25
+# budgets written by --update, in calibration units: the measured median times this
+# factor, at least the floor
+BUDGET_FACTOR = 5
+BUDGET_FLOOR = 2.0
+
+SKILLS = ["python", "cooking", "first aid", "driving", "teaching", "carpentry"]
+FIRST_NAMES = ["John", "Jane", "Alex", "Maria", "Sam", "Priya", "Chen", "Omar"]
+LAST_NAMES = ["Smith", "Jones", "Garcia", "Khan", "Nguyen", "Brown", "Silva"]
+CITIES = ["Austin, TX", "Denver, CO", "Portland, OR", "Boston, MA", "Remote"]
+
+_TABLE_RE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.I)
+_SCAN_RE = re.compile(r"^SCAN (\w+)")
+_SUBQUERY_RE = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\w+)")
+
+
+class _CapturingCursor(db.InstrumentedCursor):
+    """Instrumented cursor that also keeps every statement it runs, with its timing."""
+
+    captured: list[list[Any]] = []
+    _capture: Optional[list[Any]] = None
+
+    def _executed(self, sql, parameters, seconds):
+        super()._executed(sql, parameters, seconds)
+        self._capture = [sql, parameters, seconds]
+        self.captured.append(self._capture)
+
+    def _fetched(self, seconds, rows):
+        super()._fetched(seconds, rows)
+        if self._capture is not None:
+            self._capture[2] += seconds
+
+
+class _CapturingConnection(db.InstrumentedConnection):
+    def cursor(self, factory=_CapturingCursor):
+        return super().cursor(factory)
+
+
+def _connect_capturing():
+    conn = db.sqlite3.connect(
+        db.DATABASE_PATH, check_same_thread=False, factory=_CapturingConnection
+    )
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.row_factory = db.sqlite3.Row
+    return conn
+
+
+def build_database(scale: float) -> None:
+    """Create the schema at ``db.DATABASE_PATH`` and fill it with synthetic rows."""
+    rng = random.Random(42)
+    users = int(USERS * scale)
+    organizations = max(2, int(ORGANIZATIONS * scale))
+    events = int(EVENTS * scale)
+    registrations = int(REGISTRATIONS * scale)
+    categories = list(CATEGORY_BITS)
+
+    db.init_db()
+    conn = db.sqlite3.connect(db.DATABASE_PATH)
+    conn.executemany(
+        """
+        INSERT INTO users (email, first_name, last_name, availability, skills)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (
+            (
+                f"user{i}@example.com",
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                rng.choice(["Mornings", "Evenings", "Weekends", "Flexible", None]),
+                ", ".join(rng.sample(SKILLS, rng.randint(0, 3))),
+            )
+            for i in range(users)
+        ),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_interests (user_id, category) VALUES (?, ?)",
+        (
+            (user_id, category)
+            for user_id in range(1, users + 1)
+            for category in rng.sample(categories, rng.randint(0, 3))
+        ),
+    )
+    conn.executemany(
+        """
+        INSERT INTO organizations (name, description, category, created_by_user_id)
+        VALUES (?, ?, ?, ?)
+        """,
+        (
+            (
+                f"Organization {i}",
+                "Helping out",
+                rng.choice(categories),
+                rng.randint(1, users),
+            )
+            for i in range(organizations)
+        ),
+    )
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO roles (user_id, organization_id, permission_level)
+        VALUES (?, ?, ?)
+        """,
+        (
+            (
+                rng.randint(1, users),
+                organization_id,
+                "admin" if rng.random() < 0.05 else "volunteer",
+            )
+            for organization_id in range(1, organizations + 1)
+            for _ in range(ROLES_PER_ORGANIZATION)
+        ),
+    )
+    conn.executemany(
+        """
+        INSERT INTO events
+            (name, description, location, date_time, end_date_time, organization_id, category)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            (
+                f"Event {i}",
+                "Volunteering",
+                rng.choice(CITIES),
+                f"2030-{month:02d}-{day:02d} {hour:02d}:00:00",
+                f"2030-{month:02d}-{day:02d} {hour + length:02d}:00:00"
+                if length
+                else None,
+                rng.randint(1, organizations),
+                rng.choice(categories),
+            )
+            for i, month, day, hour, length in (
+                (
+                    i,
+                    rng.randint(1, 12),
+                    rng.randint(1, 28),
+                    rng.randint(6, 19),
+                    rng.choice([0, 1, 2, 4]),
+                )
+                for i in range(events)
+            )
+        ),
+    )
+    event_orgs = dict(conn.execute("SELECT id, organization_id FROM events"))
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO event_registrations
+            (user_id, event_id, organization_id, registration_time)
+        VALUES (?, ?, ?, '2029-01-01T00:00:00')
+        """,
+        (
+            (rng.randint(1, users), event_id, event_orgs[event_id])
+            for event_id in (rng.randint(1, events) for _ in range(registrations))
+        ),
+    )
+    conn.commit()
+    conn.close()
+    # builds the trigram and skill indexes of the inserted users
+    db.init_db()
+
+
+def _list_events_shapes() -> list[dict]:
+    """One parameter set per combination of the list_events filters."""
+    filters = {
+        "time": {"begin_time": "08:00", "end_time": "18:00"},
+        "date": {"begin_date": "2030-03-01", "end_date": "2030-06-30"},
+        "weekday": {"is_weekday": "true"},
+        "organization": {"organization_id": [1, 2, 3]},
+        "availability": {"availability": ["Mornings", "Weekends"]},
+        "category": {"category": ["animal_welfare", "education_and_tutoring"]},
+        "location": {"location": "austin"},
+        "limit": {"limit": 20},
+        "exclude_conflicts": {"exclude_conflicts": "true"},
+    }
+    shapes = []
+    for flags in itertools.product([False, True], repeat=len(filters)):
+        params: dict = {}
+        for enabled, values in zip(flags, filters.values()):
+            if enabled:
+                params.update(values)
+        shapes.append(params)
+    return shapes
+
+
+def _requests() -> list[tuple[str, dict]]:
+    """Every (path, query parameters) pair to run, covering the GET query shapes."""
+    requests: list[tuple[str, dict]] = [
+        ("/api/events", params) for params in _list_events_shapes()
+    ]
+    requests += [
+        ("/api/events/recommended", {}),
+        ("/api/events/1", {}),
+        ("/api/auth/me", {}),
+        ("/api/roles", {}),
+        ("/api/me/dashboard", {}),
+        ("/api/organization", {}),
+        ("/api/organization", {"query": "organization 1"}),
+        ("/api/organization", {"category": ["animal_welfare"]}),
+        (
+            "/api/organization",
+            {"category": ["education_and_tutoring"], "query": "help"},
+        ),
+        ("/api/organization/1", {}),
+        ("/api/organization/1/overview", {}),
+        ("/api/organization/1/users", {}),
+        ("/api/organization/1/users", {"permission_level": "volunteer"}),
+        ("/api/organization/1/users", {"query": "john smith"}),
+        ("/api/organization/1/registrations/export", {}),
+        ("/api/organization/1/registrations/export", {"event_id": 1}),
+        (
+            "/api/organization/1/registrations/export",
+            {"begin_date": "2030-01-01", "end_date": "2030-12-31"},
+        ),
+        ("/api/event-registrations", {}),
+        ("/api/event-registrations", {"include_event_details": "true"}),
+        ("/api/event-registrations", {"organization_id": 1, "event_id": 1}),
+    ]
+    user_filters = {
+        "query": [{}, {"query": "jon smith"}],
+        "availability": [{}, {"availability": "Weekends"}],
+        "interests": [
+            {},
+            {"interests": ["animal_welfare"]},
+            {
+                "interests": ["animal_welfare", "education_and_tutoring"],
+                "interests_match": "all",
+            },
+        ],
+        "skills": [
+            {},
+            {"skills": ["python"]},
+            {"skills": ["python", "cooking"], "skills_match": "all"},
+        ],
+    }
+    for combination in itertools.product(*user_filters.values()):
+        params: dict = {"limit": 20}
+        for values in combination:
+            params.update(values)
+        requests.append(("/api/users", params))
+    return requests
+
+
+def _tables(sql: str) -> dict[str, str]:
+    """Map the names and aliases used in ``sql`` to table names."""
+    names = {}
+    for table, alias in _TABLE_RE.findall(sql):
+        names[table] = table
+        if alias and alias.upper() not in {"WHERE", "ON", "JOIN", "LEFT", "USING"}:
+            names[alias] = table
+    return names
+
+
+def hot_scans(conn, sql: str, parameters: Any) -> list[str]:
+    """Return the ``SCAN`` lines of the statement's plan that read a hot table."""
+    tables = _tables(sql)
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    parents = {row[0]: row[1] for row in plan}
+    # subqueries in FROM show up as CO-ROUTINE or MATERIALIZE nodes; a SCAN of their
+    # alias outside of that node reads the subquery's rows, not a table
+    subqueries = {}
+    for row in plan:
+        match = _SUBQUERY_RE.match(row[3])
+        if match:
+            subqueries[match.group(1)] = row[0]
+
+    def inside(node_id: int, ancestor_id: int) -> bool:
+        while node_id:
+            if node_id == ancestor_id:
+                return True
+            node_id = parents.get(node_id, 0)
+        return False
+
+    scans = []
+    for node_id, _, _, detail in plan:
+        match = _SCAN_RE.match(detail)
+        if not match:
+            continue
+        name = match.group(1)
+        if name in subqueries and not inside(node_id, subqueries[name]):
+            continue
+        if tables.get(name, name) in HOT_TABLES:
+            scans.append(detail)
+    return scans
+
+
+def calibrate(conn) -> float:
+    """Median time in ms of ``CALIBRATION_SQL``, the unit of the budgets."""
+    times = []
+    for _ in range(CALIBRATION_RUNS):
+        started = time.perf_counter()
+        conn.execute(CALIBRATION_SQL).fetchall()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def run_requests() -> tuple[dict[str, dict], float]:
+    """
+    Run every request shape and return the captured statements by fingerprint, and
+    the calibration time measured right after them.
+    """
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # also where ``from db import connect`` bound it by name (e.g. the roster export)
+    original_connect = db.connect
+    for module in list(sys.modules.values()):
+        if getattr(module, "connect", None) is original_connect:
+            module.connect = _connect_capturing
+    for name in ("httpx", "api.access"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    statements: dict[str, dict] = {}
+    with TestClient(main.app) as client:
+        client.post(
+            "/api/auth/signup",
+            json={
+                "email": "plans@example.com",
+                "password": "Check-plans-1",
+                "first_name": "Plan",
+                "last_name": "Checker",
+                "interests": ["animal_welfare"],
+            },
+        )
+        client.post(
+            "/api/auth/login",
+            data={"username": "plans@example.com", "password": "Check-plans-1"},
+        )
+        conn = _connect_capturing()
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO roles (user_id, organization_id, permission_level)
+            SELECT user_id, 1, 'admin' FROM users WHERE email = 'plans@example.com'
+            """
+        )
+        conn.commit()
+
+        requests = _requests()
+        # follow a members page cursor too
+        first_page = client.get("/api/organization/1/users", params={"limit": 20})
+        next_cursor = first_page.headers.get("x-next-cursor")
+        if next_cursor:
+            requests.append(("/api/organization/1/users", {"cursor": next_cursor}))
+
+        _CapturingCursor.captured.clear()
+        for path, params in requests:
+            # run twice: the first run fills the caches, both are timed
+            for _ in range(2):
+                start = len(_CapturingCursor.captured)
+                response = client.get(path, params=params)
+                if response.status_code >= 400:
+                    raise RuntimeError(f"GET {path} {params} failed: {response.text}")
+                for sql, parameters, seconds in _CapturingCursor.captured[start:]:
+                    if parameters is None or not sql.lstrip().upper().startswith(
+                        ("SELECT", "WITH")
+                    ):
+                        continue
+                    entry = statements.setdefault(
+                        fingerprint(sql),
+                        {
+                            "sql": sql,
+                            "parameters": parameters,
+                            "example": f"GET {path} {json.dumps(params)}",
+                            "times": [],
+                        },
+                    )
+                    entry["times"].append(seconds * 1000)
+
+        for entry in statements.values():
+            entry["scans"] = hot_scans(conn, entry["sql"], entry["parameters"])
+            entry["median_ms"] = statistics.median(entry["times"])
+        calibration_ms = calibrate(conn)
+        conn.close()
+    return statements, calibration_ms
+
+
+def compare(
+    statements: dict[str, dict], baseline: dict[str, dict], calibration_ms: float
+) -> list[str]:
+    """Return one message per regression against the baseline."""
+    failures = []
+    for key, entry in sorted(statements.items()):
+        expected = baseline.get(key, {})
+        new_scans = [s for s in entry["scans"] if s not in expected.get("scans", [])]
+        if new_scans:
+            failures.append(
+                f"new full scan {new_scans} in {entry['example']}\n    {key}"
+            )
+        budget = expected.get("budget")
+        if budget is not None and entry["median_ms"] > budget * calibration_ms:
+            failures.append(
+                f"{entry['median_ms']:.1f} ms over the {budget * calibration_ms:.1f} ms "
+                f"budget ({budget} x {calibration_ms:.2f} ms) in "
+                f"{entry['example']}\n    {key}"
+            )
+    return failures
+
+
+def write_baseline(statements: dict[str, dict], calibration_ms: float) -> None:
+    baseline = {
+        key: {
+            "example": entry["example"],
+            "scans": entry["scans"],
+            "budget": round(
+                max(entry["median_ms"] / calibration_ms * BUDGET_FACTOR, BUDGET_FLOOR),
+                1,
+            ),
+        }
+        for key, entry in sorted(statements.items())
+    }
+    BASELINE_PATH.write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument(
+        "--update", action="store_true", help="accept the current plans and times"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db.DATABASE_PATH = Path(directory) / "plans.db"
+        started = time.perf_counter()
+        build_database(args.scale)
+        print(f"Built the database in {time.perf_counter() - started:.1f} s")
+        started = time.perf_counter()
+        statements, calibration_ms = run_requests()
+        print(
+            f"Checked {len(statements)} statement shapes in "
+            f"{time.perf_counter() - started:.1f} s "
+            f"(calibration query: {calibration_ms:.2f} ms)"
+        )
+
+    if args.update:
+        write_baseline(statements, calibration_ms)
+        print(f"Wrote {BASELINE_PATH.name}")
+        sys.exit(0)
+
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    failures = compare(statements, baseline, calibration_ms)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("No query plan regressions")
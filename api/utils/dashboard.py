@@ -0,0 +1,172 @@
+"""
+Personal dashboard: the signed-in user's profile, interests, memberships, upcoming
+registrations and recommendations, loaded on one connection.
+
+Sections are cached per user for ``DASHBOARD_CACHE_TTL_SECONDS``. Changes made by the
+user themselves (profile, interests, registrations) call ``invalidate_dashboard``;
+changes to other people's events only show up once the entry expires. Memberships are
+not cached here, they come from the membership cache in ``utils.authorization``, which
+is invalidated on every role change.
+"""
+
+import sqlite3
+from typing import Iterable, Optional
+
+from models import Event, EventRegistrationWithEvent, Role
+from utils.authorization import load_memberships
+from utils.cache import TTLCache
+from utils.recommendations import load_recommended_events
+from utils.schedule import utc_today
+
+DASHBOARD_CACHE_SIZE = 10_000
+DASHBOARD_CACHE_TTL_SECONDS = 30
+
+# section -> fields that can be selected; interests is a plain list of categories
+DASHBOARD_FIELDS: dict[str, tuple[str, ...]] = {
+    "profile": (
+        "user_id",
+        "email",
+        "first_name",
+        "last_name",
+        "availability",
+        "skills",
+    ),
+    "interests": (),
+    "memberships": tuple(Role.model_fields),
+    "registrations": tuple(EventRegistrationWithEvent.model_fields),
+    "recommendations": tuple(Event.model_fields),
+}
+DASHBOARD_SECTIONS = tuple(DASHBOARD_FIELDS)
+
+# keyed by (user_id, section, limit)
+_dashboard_cache = TTLCache(
+    maxsize=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL_SECONDS, name="dashboard"
+)
+
+
+def invalidate_dashboard(user_id: int) -> None:
+    """Drop the cached dashboard sections of a user after they changed their data."""
+    _dashboard_cache.pop_where(lambda key, _: key[0] == user_id)
+
+
+def parse_field_selection(
+    sections: Iterable[str], fields: Iterable[str]
+) -> dict[str, Optional[set[str]]]:
+    """
+    Map each requested section to the fields to return, None meaning all of them.
+
+    ``fields`` entries are ``section.field`` and may be comma-separated. Raises
+    ``ValueError`` for unknown sections or fields, or fields of a section that was not
+    requested.
+    """
+    selection: dict[str, Optional[set[str]]] = {}
+    for section in sections:
+        if section not in DASHBOARD_FIELDS:
+            raise ValueError(f"Unknown section: {section}")
+        selection[section] = None
+
+    for entry in (part.strip() for value in fields for part in value.split(",")):
+        if not entry:
+            continue
+        section, _, field = entry.partition(".")
+        if section not in selection:
+            raise ValueError(f"Fields given for a section not requested: {entry}")
+        if field not in DASHBOARD_FIELDS[section]:
+            raise ValueError(f"Unknown field: {entry}")
+        if selection[section] is None:
+            selection[section] = set()
+        selection[section].add(field)
+    return selection
+
+
+def _load_profile(conn: sqlite3.Connection, user_id: int, _: int) -> Optional[dict]:
+    row = conn.execute(
+        """
+        SELECT user_id, email, first_name, last_name, availability, skills
+        FROM users
+        WHERE user_id = ?
+        """,
+        (user_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    return {**dict(row), "skills": row["skills"] or ""}
+
+
+def _load_interests(conn: sqlite3.Connection, user_id: int, _: int) -> list[str]:
+    rows = conn.execute(
+        "SELECT category FROM user_interests WHERE user_id = ?", (user_id,)
+    ).fetchall()
+    return [row["category"] for row in rows]
+
+
+def _load_registrations(
+    conn: sqlite3.Connection, user_id: int, limit: int
+) -> list[dict]:
+    # the user's next registered events, soonest first; events from earlier today (in
+    # UTC, like the stored times) are still listed
+    rows = conn.execute(
+        """
+        SELECT er.user_id, er.event_id, er.organization_id, er.registration_time,
+               e.name AS event_name, e.location AS event_location,
+               e.date_time AS event_date_time
+        FROM event_registrations er
+        JOIN events e ON e.id = er.event_id
+        WHERE er.user_id = ? AND e.date_time >= ?
+        ORDER BY e.date_time
+        LIMIT ?
+        """,
+        (user_id, utc_today(), limit),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+_SECTION_LOADERS = {
+    "profile": _load_profile,
+    "interests": _load_interests,
+    "registrations": _load_registrations,
+    "recommendations": load_recommended_events,
+}
+
+
+def _project(value, fields: Optional[set[str]]):
+    if fields is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [{k: v for k, v in item.items() if k in fields} for item in value]
+    return {k: v for k, v in value.items() if k in fields}
+
+
+def load_dashboard(
+    conn: sqlite3.Connection,
+    user_id: int,
+    selection: dict[str, Optional[set[str]]],
+    limit: int,
+) -> dict:
+    """
+    Return the selected sections of a user's dashboard, reduced to the selected fields.
+
+    ``limit`` caps the registrations and recommendations. Sections are cached whole and
+    projected on the way out, so different field selections share cache entries.
+    """
+    dashboard = {}
+    for section, fields in selection.items():
+        if section == "memberships":
+            value = [
+                {
+                    "user_id": user_id,
+                    "organization_id": organization_id,
+                    "permission_level": permission_level,
+                }
+                for organization_id, permission_level in load_memberships(
+                    conn, user_id
+                ).items()
+            ]
+        else:
+            key = (user_id, section, limit)
+            value = _dashboard_cache.get(key)
+            if value is None:
+                value = _SECTION_LOADERS[section](conn, user_id, limit)
+                _dashboard_cache.set(key, value)
+        dashboard[section] = _project(value, fields)
+    return dashboard
@@ -1,19 +1,40 @@
 # DB schema definition for sqlite3 database, is used by the initialization function  in db.py
 # and is used in the populate_db.py script, which can be ran to populate the database with fake data
-DB_SCHEMA = """
+try:
+    from utils.categories import category_slug_sql
+except ImportError:  # run as a script from utils/, like populate_db.py
+    from categories import category_slug_sql
+
+# events without an end time last this long, see utils/schedule.py
+DEFAULT_EVENT_DURATION_MINUTES = 60
+# generated events columns: the end time with that default applied, and the length
+EVENT_EFFECTIVE_END_SQL = (
+    "COALESCE(end_date_time, "
+    f"datetime(date_time, '+{DEFAULT_EVENT_DURATION_MINUTES} minutes'))"
+)
+EVENT_DURATION_SECONDS_SQL = (
+    "CAST(round((julianday(effective_end) - julianday(date_time)) * 86400) AS INTEGER)"
+)
+# the categories row a written category resolves to, see the category triggers
+_NEW_CATEGORY_SLUG = category_slug_sql("NEW.category")
+
+DB_SCHEMA = f"""
 CREATE TABLE IF NOT EXISTS users (
     user_id INTEGER PRIMARY KEY AUTOINCREMENT,
     email TEXT NOT NULL UNIQUE,
     first_name TEXT NOT NULL,
     last_name TEXT NOT NULL,
     availability TEXT DEFAULT NULL CHECK (availability IS NULL OR availability IN ('Mornings', 'Afternoons', 'Evenings', 'Weekends', 'Flexible')),
-    skills TEXT DEFAULT ''
+    skills TEXT DEFAULT '',
+    -- one bit per category (category_id - 1), kept in sync with user_interests by triggers
+    interests_mask INTEGER NOT NULL DEFAULT 0
 );
 CREATE TABLE IF NOT EXISTS organizations (
     organization_id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL,
     description TEXT,
     category TEXT,
+    category_id INTEGER DEFAULT NULL REFERENCES categories(category_id),
     created_by_user_id INTEGER NOT NULL,
     FOREIGN KEY (created_by_user_id) REFERENCES users(user_id)
         ON UPDATE CASCADE
@@ -32,6 +53,9 @@ CREATE TABLE IF NOT EXISTS roles (
         ON UPDATE CASCADE
         ON DELETE CASCADE
 );
+-- organization member listings: filter by role, page through in (role, user) order
+CREATE INDEX IF NOT EXISTS idx_roles_org_level
+    ON roles (organization_id, permission_level, user_id);
 CREATE TABLE IF NOT EXISTS credentials (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL UNIQUE,
@@ -47,25 +71,227 @@ CREATE TABLE IF NOT EXISTS event_registrations (
     registration_time TEXT NOT NULL,
     PRIMARY KEY (user_id, organization_id, event_id)
 );
+-- no statement reads registrations by organization_id alone any more
+DROP INDEX IF EXISTS idx_event_registrations_org_event;
+-- volunteers of one event in user order, read by the roster export, the overview and
+-- the organization deletion job
+CREATE INDEX IF NOT EXISTS idx_event_registrations_event
+    ON event_registrations (event_id, user_id);
 CREATE TABLE IF NOT EXISTS events (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL, 
     description TEXT NOT NULL, 
     location TEXT NOT NULL, 
     date_time TEXT NOT NULL,
+    end_date_time TEXT DEFAULT NULL,
     organization_id INTEGER NOT NULL,
     category TEXT DEFAULT NULL,
+    category_id INTEGER DEFAULT NULL REFERENCES categories(category_id),
+    effective_end TEXT GENERATED ALWAYS AS ({EVENT_EFFECTIVE_END_SQL}) VIRTUAL,
+    duration_seconds INTEGER GENERATED ALWAYS AS ({EVENT_DURATION_SECONDS_SQL}) VIRTUAL,
     FOREIGN KEY (organization_id) REFERENCES organizations(organization_id)
 );
+-- date_time and end_date_time are stored as 'YYYY-MM-DD HH:MM:SS' (UTC), whatever
+-- writes them, so range filters and the schedule-conflict checks in utils/schedule.py
+-- compare the raw columns and can use the indexes below
+CREATE TRIGGER IF NOT EXISTS trg_events_insert_times
+AFTER INSERT ON events
+WHEN NEW.date_time IS NOT datetime(NEW.date_time)
+  OR NEW.end_date_time IS NOT datetime(NEW.end_date_time)
+BEGIN
+    UPDATE events
+    SET date_time = COALESCE(datetime(NEW.date_time), NEW.date_time),
+        end_date_time = datetime(NEW.end_date_time)
+    WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_events_update_times
+AFTER UPDATE OF date_time, end_date_time ON events
+WHEN NEW.date_time IS NOT datetime(NEW.date_time)
+  OR NEW.end_date_time IS NOT datetime(NEW.end_date_time)
+BEGIN
+    UPDATE events
+    SET date_time = COALESCE(datetime(NEW.date_time), NEW.date_time),
+        end_date_time = datetime(NEW.end_date_time)
+    WHERE id = NEW.id;
+END;
+-- replaced by idx_events_schedule, its end_date_time may be NULL
+DROP INDEX IF EXISTS idx_events_interval;
+-- date range filters and ordering, and the overlap probes of the conflict checks
+CREATE INDEX IF NOT EXISTS idx_events_schedule
+    ON events (date_time, effective_end);
+-- longest event, bounding how far back the overlap probes search
+CREATE INDEX IF NOT EXISTS idx_events_duration ON events (duration_seconds);
+-- upcoming events of one organization, read by the organization overview
+CREATE INDEX IF NOT EXISTS idx_events_org_date
+    ON events (organization_id, date_time);
 CREATE TABLE IF NOT EXISTS user_interests (
     user_id   INTEGER NOT NULL,
     category  TEXT NOT NULL,
     PRIMARY KEY (user_id, category),
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS token_watermarks (
+    user_id INTEGER PRIMARY KEY,
+    not_before REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_hash TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id);
+-- trigram posting lists for fuzzy user search, maintained by utils/user_search.py
+CREATE TABLE IF NOT EXISTS user_trigrams (
+    trigram TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_trigrams_user ON user_trigrams (user_id);
+CREATE TRIGGER IF NOT EXISTS trg_users_delete_trigrams
+AFTER DELETE ON users
+BEGIN
+    DELETE FROM user_trigrams WHERE user_id = OLD.user_id;
+END;
+CREATE INDEX IF NOT EXISTS idx_users_availability ON users (availability, user_id);
+-- normalized skills dictionary and its user postings, maintained by utils/skills.py
+CREATE TABLE IF NOT EXISTS skills (
+    skill_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS user_skills (
+    skill_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (skill_id, user_id),
+    FOREIGN KEY (skill_id) REFERENCES skills(skill_id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_skills_user ON user_skills (user_id, skill_id);
+-- category_id - 1 is the category's bit in users.interests_mask, see utils/categories.py
+CREATE TABLE IF NOT EXISTS categories (
+    category_id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL DEFAULT ''
+);
+-- events and organizations are filtered on category_id. Whatever writes a category
+-- (the API, the populate scripts) gets it resolved here: category_id is set and the
+-- stored category normalized to its slug, with utils.categories.category_slug_sql.
+-- The categories table has to be seeded first (seed_categories).
+CREATE INDEX IF NOT EXISTS idx_events_category ON events (category_id, date_time);
+CREATE INDEX IF NOT EXISTS idx_organizations_category
+    ON organizations (category_id, organization_id);
+CREATE TRIGGER IF NOT EXISTS trg_events_insert_category
+AFTER INSERT ON events
+BEGIN
+    UPDATE events
+    SET category_id = (SELECT category_id FROM categories WHERE slug = {_NEW_CATEGORY_SLUG}),
+        category = COALESCE((SELECT slug FROM categories WHERE slug = {_NEW_CATEGORY_SLUG}), NEW.category)
+    WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_events_update_category
+AFTER UPDATE OF category ON events
+BEGIN
+    UPDATE events
+    SET category_id = (SELECT category_id FROM categories WHERE slug = {_NEW_CATEGORY_SLUG}),
+        category = COALESCE((SELECT slug FROM categories WHERE slug = {_NEW_CATEGORY_SLUG}), NEW.category)
+    WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_organizations_insert_category
+AFTER INSERT ON organizations
+BEGIN
+    UPDATE organizations
+    SET category_id = (SELECT category_id FROM categories WHERE slug = {_NEW_CATEGORY_SLUG}),
+        category = COALESCE((SELECT slug FROM categories WHERE slug = {_NEW_CATEGORY_SLUG}), NEW.category)
+    WHERE organization_id = NEW.organization_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_organizations_update_category
+AFTER UPDATE OF category ON organizations
+BEGIN
+    UPDATE organizations
+    SET category_id = (SELECT category_id FROM categories WHERE slug = {_NEW_CATEGORY_SLUG}),
+        category = COALESCE((SELECT slug FROM categories WHERE slug = {_NEW_CATEGORY_SLUG}), NEW.category)
+    WHERE organization_id = NEW.organization_id;
+END;
+-- background deletions of organizations and accounts, see utils/deletion_jobs.py
+CREATE TABLE IF NOT EXISTS deletion_jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL CHECK (kind IN ('organization', 'account')),
+    target_id INTEGER NOT NULL,
+    requested_by INTEGER NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    deleted_rows INTEGER NOT NULL DEFAULT 0,
+    error TEXT DEFAULT NULL,
+    -- comma-separated ids of the organizations whose caches the job invalidates,
+    -- recorded when the job is created (NULL for jobs created before the column)
+    affected_organizations TEXT DEFAULT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deletion_jobs_status
+    ON deletion_jobs (status, kind, target_id);
+-- user_interests stays the source of truth for interests; these triggers keep
+-- users.interests_mask in sync inside the same transaction. The category is
+-- normalized with utils.categories.category_slug_sql before looking up its bit.
+CREATE TRIGGER IF NOT EXISTS trg_user_interests_insert_mask
+AFTER INSERT ON user_interests
+BEGIN
+    UPDATE users
+    SET interests_mask = interests_mask | COALESCE((
+        SELECT 1 << (category_id - 1) FROM categories
+        WHERE slug = {_NEW_CATEGORY_SLUG}
+    ), 0)
+    WHERE user_id = NEW.user_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_user_interests_delete_mask
+AFTER DELETE ON user_interests
+BEGIN
+    UPDATE users
+    SET interests_mask = (
+        SELECT COALESCE(SUM(DISTINCT 1 << (c.category_id - 1)), 0)
+        FROM user_interests ui
+        JOIN categories c
+          ON c.slug = {category_slug_sql("ui.category")}
+        WHERE ui.user_id = OLD.user_id
+    )
+    WHERE user_id = OLD.user_id;
+END;
 """
 
 
+# Columns added after a table was first created. CREATE TABLE IF NOT EXISTS leaves
+# existing tables untouched, so init_db adds any of these that are missing before
+# running DB_SCHEMA. Each entry is (table, column, column definition).
+DB_COLUMN_MIGRATIONS = [
+    ("events", "end_date_time", "TEXT DEFAULT NULL"),
+    ("users", "interests_mask", "INTEGER NOT NULL DEFAULT 0"),
+    ("categories", "name", "TEXT NOT NULL DEFAULT ''"),
+    (
+        "events",
+        "category_id",
+        "INTEGER DEFAULT NULL REFERENCES categories(category_id)",
+    ),
+    (
+        "organizations",
+        "category_id",
+        "INTEGER DEFAULT NULL REFERENCES categories(category_id)",
+    ),
+    (
+        "events",
+        "effective_end",
+        f"TEXT GENERATED ALWAYS AS ({EVENT_EFFECTIVE_END_SQL}) VIRTUAL",
+    ),
+    (
+        "events",
+        "duration_seconds",
+        f"INTEGER GENERATED ALWAYS AS ({EVENT_DURATION_SECONDS_SQL}) VIRTUAL",
+    ),
+    ("deletion_jobs", "affected_organizations", "TEXT DEFAULT NULL"),
+]
+
+
 # DB schema for nuking the database, useful for testing and development when you want to reset the database
 DROP_DB_SQL = """
 DROP TABLE IF EXISTS user_interests;
@@ -75,4 +301,12 @@ DROP TABLE IF EXISTS roles;
 DROP TABLE IF EXISTS event_registrations;
 DROP TABLE IF EXISTS credentials;
 DROP TABLE IF EXISTS events;
+DROP TABLE IF EXISTS revoked_tokens;
+DROP TABLE IF EXISTS token_watermarks;
+DROP TABLE IF EXISTS sessions;
+DROP TABLE IF EXISTS user_trigrams;
+DROP TABLE IF EXISTS categories;
+DROP TABLE IF EXISTS user_skills;
+DROP TABLE IF EXISTS skills;
+DROP TABLE IF EXISTS deletion_jobs;
 """
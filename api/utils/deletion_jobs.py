@@ -0,0 +1,314 @@
+"""
+Background deletion of organizations and accounts.
+
+Deleting an organization or an account removes every dependent row: registrations,
+events, roles, interests and so on. Instead of one long transaction in the request, a
+deletion job is recorded in ``deletion_jobs`` and a background thread purges the rows in
+chunks of ``DELETION_CHUNK_SIZE``, committing after each chunk and pausing briefly so
+requests waiting for the write lock get their turn. The parent row goes last, so a job
+interrupted by a restart is simply resumed at startup.
+
+While an organization is being deleted, the routes writing to it answer 409
+(``ensure_organization_not_deleted``). Rows that still slip in are removed together
+with the parent row, in one transaction, so they can't make its delete fail.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Literal, Optional
+
+from fastapi import HTTPException, status
+
+from db import connect
+from utils.authorization import (
+    invalidate_memberships,
+    invalidate_organization_memberships,
+)
+from utils.dashboard import invalidate_dashboard
+from utils.logger import get_logger
+from utils.org_overview import invalidate_organization_overview
+
+DELETION_CHUNK_SIZE = 500
+# pause between chunks, lets other writers take the database lock
+DELETION_PAUSE_SECONDS = 0.01
+
+JobKind = Literal["organization", "account"]
+
+logger = get_logger(__name__)
+
+# (table, condition) pairs deleted in order, the parent row last; each condition takes
+# the target id once
+_DELETION_STEPS: dict[str, list[tuple[str, str]]] = {
+    "organization": [
+        # a registration's organization is its event's, see create_event_registration
+        (
+            "event_registrations",
+            "event_id IN (SELECT id FROM events WHERE organization_id = ?)",
+        ),
+        ("events", "organization_id = ?"),
+        ("roles", "organization_id = ?"),
+        ("organizations", "organization_id = ?"),
+    ],
+    "account": [
+        ("event_registrations", "user_id = ?"),
+        ("user_interests", "user_id = ?"),
+        ("roles", "user_id = ?"),
+        ("sessions", "user_id = ?"),
+        ("credentials", "user_id = ?"),
+        # user_skills cascade and user_trigrams are cleared by a trigger
+        ("users", "user_id = ?"),
+    ],
+}
+
+
+def create_job(
+    conn: sqlite3.Connection, kind: JobKind, target_id: int, requested_by: int
+) -> dict:
+    """
+    Record a pending deletion job and return it. The caller commits.
+
+    The organizations whose caches change are stored with the job: once it has run
+    (even partly, before a restart) the roles they were derived from are gone.
+    """
+    now = time.time()
+    job_id = str(uuid.uuid4())
+    conn.execute(
+        """
+        INSERT INTO deletion_jobs
+            (job_id, kind, target_id, requested_by, status, deleted_rows,
+             affected_organizations, created_at, updated_at)
+        VALUES (?, ?, ?, ?, 'pending', 0, ?, ?, ?)
+        """,
+        (
+            job_id,
+            kind,
+            target_id,
+            requested_by,
+            ",".join(map(str, _affected_organizations(conn, kind, target_id))),
+            now,
+            now,
+        ),
+    )
+    return get_job(conn, job_id)
+
+
+def _affected_organizations(
+    conn: sqlite3.Connection, kind: JobKind, target_id: int
+) -> list[int]:
+    if kind == "organization":
+        return [target_id]
+    # the member counts and admin lists of these organizations change
+    return [
+        row[0]
+        for row in conn.execute(
+            "SELECT organization_id FROM roles WHERE user_id = ?", (target_id,)
+        )
+    ]
+
+
+def get_job(conn: sqlite3.Connection, job_id: str) -> Optional[dict]:
+    row = conn.execute(
+        """
+        SELECT job_id, kind, target_id, status, deleted_rows, error, created_at, updated_at
+        FROM deletion_jobs
+        WHERE job_id = ?
+        """,
+        (job_id,),
+    ).fetchone()
+    return dict(row) if row is not None else None
+
+
+def find_active_job(
+    conn: sqlite3.Connection, kind: JobKind, target_id: int
+) -> Optional[dict]:
+    """Return the unfinished job deleting this target, if there is one."""
+    row = conn.execute(
+        """
+        SELECT job_id FROM deletion_jobs
+        WHERE kind = ? AND target_id = ? AND status IN ('pending', 'running')
+        """,
+        (kind, target_id),
+    ).fetchone()
+    return get_job(conn, row["job_id"]) if row is not None else None
+
+
+def ensure_organization_not_deleted(
+    conn: sqlite3.Connection, organization_id: int
+) -> None:
+    """Raise 409 if the organization is being deleted, for routes writing to it."""
+    if find_active_job(conn, "organization", organization_id) is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This organization is being deleted",
+        )
+
+
+def run_job(
+    conn: sqlite3.Connection,
+    job_id: str,
+    should_stop: Callable[[], bool] = lambda: False,
+) -> None:
+    """
+    Delete everything a job covers, chunk by chunk, recording progress.
+
+    If ``should_stop`` turns true between chunks the job is left ``running`` and picks
+    up where it stopped when it is run again.
+    """
+    job = conn.execute(
+        """
+        SELECT kind, target_id, deleted_rows, affected_organizations
+        FROM deletion_jobs
+        WHERE job_id = ?
+        """,
+        (job_id,),
+    ).fetchone()
+    if job is None:
+        return
+    kind, target_id, deleted_rows, stored_organizations = job
+    if stored_organizations is None:
+        # job created before the ids were stored, best effort
+        affected_organizations = _affected_organizations(conn, kind, target_id)
+    else:
+        affected_organizations = [int(i) for i in stored_organizations.split(",") if i]
+    _set_status(conn, job_id, "running")
+    *dependent_steps, (parent_table, parent_condition) = _DELETION_STEPS[kind]
+    try:
+        for table, condition in dependent_steps:
+            while True:
+                cursor = conn.execute(
+                    f"""
+                    DELETE FROM {table} WHERE rowid IN (
+                        SELECT rowid FROM {table} WHERE {condition} LIMIT ?
+                    )
+                    """,
+                    (target_id, DELETION_CHUNK_SIZE),
+                )
+                deleted_rows += cursor.rowcount
+                conn.execute(
+                    """
+                    UPDATE deletion_jobs SET deleted_rows = ?, updated_at = ?
+                    WHERE job_id = ?
+                    """,
+                    (deleted_rows, time.time(), job_id),
+                )
+                conn.commit()
+                if should_stop():
+                    return
+                if cursor.rowcount < DELETION_CHUNK_SIZE:
+                    break
+                time.sleep(DELETION_PAUSE_SECONDS)
+
+        # rows written since their step ran (e.g. an event created meanwhile) would
+        # make the parent's delete fail, so they go in the same transaction
+        for table, condition in dependent_steps:
+            deleted_rows += conn.execute(
+                f"DELETE FROM {table} WHERE {condition}", (target_id,)
+            ).rowcount
+        deleted_rows += conn.execute(
+            f"DELETE FROM {parent_table} WHERE {parent_condition}", (target_id,)
+        ).rowcount
+        conn.execute(
+            "UPDATE deletion_jobs SET deleted_rows = ?, updated_at = ? WHERE job_id = ?",
+            (deleted_rows, time.time(), job_id),
+        )
+        conn.commit()
+    except sqlite3.Error as exc:
+        conn.rollback()
+        logger.exception("Deletion job %s failed", job_id)
+        _set_status(conn, job_id, "failed", str(exc))
+        return
+
+    if kind == "organization":
+        invalidate_organization_memberships(target_id)
+    else:
+        invalidate_memberships(target_id)
+        invalidate_dashboard(target_id)
+    for organization_id in affected_organizations:
+        invalidate_organization_overview(organization_id)
+    _set_status(conn, job_id, "done")
+
+
+def _set_status(
+    conn: sqlite3.Connection, job_id: str, status: str, error: Optional[str] = None
+) -> None:
+    conn.execute(
+        "UPDATE deletion_jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+        (status, error, time.time(), job_id),
+    )
+    conn.commit()
+
+
+class DeletionWorker:
+    """Background thread running deletion jobs one at a time, in submission order."""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        self._connect = connect
+        self._queue: queue.Queue[Optional[str]] = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the thread and resume jobs left unfinished by a previous run."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                """
+                SELECT job_id FROM deletion_jobs
+                WHERE status IN ('pending', 'running')
+                ORDER BY created_at
+                """
+            ).fetchall()
+        finally:
+            conn.close()
+        self._queue = queue.Queue()
+        for row in rows:
+            self._queue.put(row[0])
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="deletion-jobs", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, job_id: str) -> None:
+        """Queue a job that has been committed to ``deletion_jobs``."""
+        self._queue.put(job_id)
+
+    def stop(self) -> None:
+        """Stop after the current chunk; unfinished jobs are resumed on the next start."""
+        self._stop.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        conn = self._connect()
+        try:
+            while not self._stop.is_set():
+                job_id = self._queue.get()
+                if job_id is None or self._stop.is_set():
+                    break
+                try:
+                    run_job(conn, job_id, self._stop.is_set)
+                except Exception as exc:
+                    # one broken job must not take the worker down with it
+                    logger.exception("Deletion job %s failed", job_id)
+                    try:
+                        conn.rollback()
+                        _set_status(conn, job_id, "failed", str(exc))
+                    except sqlite3.Error:
+                        logger.exception(
+                            "Could not mark deletion job %s failed", job_id
+                        )
+        finally:
+            conn.close()
+
+
+deletion_worker = DeletionWorker(connect)
+
+
+def submit_job(job_id: str) -> None:
+    """Hand a committed job to the background worker."""
+    deletion_worker.submit(job_id)
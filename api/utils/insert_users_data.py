@@ -7,8 +7,8 @@ def insert_users_data(conn, cursor, users_data):
     """Insert data in Users table"""
     insert_query = """
     INSERT INTO users (
-        email, first_name, last_name, availability
-    ) VALUES (?, ?, ?, ?)
+        email, first_name, last_name, skills, availability
+    ) VALUES (?, ?, ?, ?, ?)
     """
     try:
         cursor.executemany(insert_query, users_data)
@@ -43,8 +43,8 @@ def execute_insert_users_data(conn, cursor, num_records):
     print("Generating synthetic data...")
     generated_data = generate_user_data(num_records)
     users_data = [
-        (email, first_name, last_name, availability)
-        for email, _, first_name, last_name, *_, availability, _, _ in generated_data
+        (email, first_name, last_name, skills, availability)
+        for email, _, first_name, last_name, *_, skills, availability, _, _ in generated_data
     ]
     print(f"Inserting {num_records} records in DB...")
     insert_users_data(conn, cursor, users_data)
@@ -0,0 +1,62 @@
+"""
+Rolling latency summaries for operations that are worth watching on their own.
+"""
+
+import threading
+from collections import deque
+
+LATENCY_WINDOW_SIZE = 1000
+
+
+class LatencyTracker:
+    """
+    Keeps the most recent ``window`` durations of an operation and summarizes them as
+    percentiles. Memory use is fixed regardless of traffic.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW_SIZE):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._count = 0
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Record one duration, in seconds."""
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+            self._total += seconds
+
+    def total_seconds(self) -> float:
+        """Sum of every recorded duration, not only the current window."""
+        with self._lock:
+            return self._total
+
+    def summary(self) -> dict:
+        """
+        Return the total number of recorded operations and the p50/p90/p99/max of the
+        current window, in milliseconds.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self._count
+        if not samples:
+            return {
+                "count": count,
+                "p50_ms": None,
+                "p90_ms": None,
+                "p99_ms": None,
+                "max_ms": None,
+            }
+
+        def percentile(p: float) -> float:
+            index = min(len(samples) - 1, int(p * len(samples)))
+            return round(samples[index] * 1000, 3)
+
+        return {
+            "count": count,
+            "p50_ms": percentile(0.50),
+            "p90_ms": percentile(0.90),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(samples[-1] * 1000, 3),
+        }
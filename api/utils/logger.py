@@ -1,14 +1,246 @@
 """
 Centralized logging configuration for the application.
+
+Log calls never do I/O on the calling thread. The root logger's only handler puts
+records on a bounded queue, and a background thread writes them to stdout and the
+rotating log file in batches. When the queue is full, records are dropped and counted
+(``dropped_log_records``) instead of blocking the request.
+
+Records are JSON lines (``LOG_FORMAT=text`` for the classic format) carrying the
+request they were logged for: request id, method, route, time since the request
+started and the database time and statements so far (``utils.request_context``).
+
+Volume is controlled with ``LOG_LEVEL``, per-logger levels in ``LOG_LEVELS``
+(``httpx=WARNING,utils.query_stats=DEBUG``) and per-logger sampling of records below
+WARNING in ``LOG_SAMPLE_RATES`` (``api.access=0.1``). Both match a logger and its
+children.
 """
 
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
+import random
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, RotatingFileHandler
+from typing import Optional
+
+from utils.request_context import request_stats
 
 LOG_FILE = "app.log"
 LOG_MAX_BYTES = 5 * 1024 * 1024  # 5 MB
 LOG_BACKUP_COUNT = 3
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+# records waiting to be written; beyond this they are dropped
+LOG_QUEUE_SIZE = 10_000
+# records written with one write and flush
+LOG_BATCH_SIZE = 256
+
+# attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def _parse_mapping(value: str) -> dict[str, str]:
+    """Parse ``name=value,name=value`` into a dict."""
+    mapping = {}
+    for entry in value.split(","):
+        name, _, setting = entry.partition("=")
+        if name.strip() and setting.strip():
+            mapping[name.strip()] = setting.strip()
+    return mapping
+
+
+def _matching(mapping: dict, name: str):
+    """Return the value of the longest logger name in ``mapping`` covering ``name``."""
+    while name:
+        if name in mapping:
+            return mapping[name]
+        name = name.rpartition(".")[0]
+    return None
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a share of the records below WARNING of the configured loggers."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        # logger name -> rate (None for unsampled loggers)
+        self._resolved: dict[str, Optional[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        if record.name not in self._resolved:
+            self._resolved[record.name] = _matching(self.rates, record.name)
+        rate = self._resolved[record.name]
+        return rate is None or random.random() < rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks: records that don't fit in the queue are dropped.
+
+    The request context is copied onto the record here, on the logging thread, since
+    the writer thread doesn't see the request's context variables.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # render the message and traceback now, the arguments may change later
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+
+        stats = request_stats.get()
+        # records passing their own request fields (the access log) keep them
+        if stats is not None and not hasattr(record, "request_id"):
+            route = stats.scope.get("route")
+            record.request_id = stats.request_id
+            record.method = stats.scope.get("method")
+            record.route = getattr(route, "path_format", None)
+            record.elapsed_ms = round((time.perf_counter() - stats.start) * 1000, 3)
+            record.db_ms = round(stats.db_seconds * 1000, 3)
+            record.db_queries = stats.db_queries
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # only counted, a log call must not wait for the writer
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the request context and ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic format, with the request id when there is one."""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        return f"{text} [{request_id}]" if request_id else text
+
+
+class _BatchStreamHandler(logging.StreamHandler):
+    def emit_batch(self, records: list[logging.LogRecord]) -> None:
+        try:
+            self.stream.write(
+                "".join(self.format(r) + self.terminator for r in records)
+            )
+            self.flush()
+        except Exception:
+            self.handleError(records[0])
+
+
+class _BatchRotatingFileHandler(RotatingFileHandler):
+    def emit_batch(self, records: list[logging.LogRecord]) -> None:
+        try:
+            text = "".join(self.format(r) + self.terminator for r in records)
+            if self.stream is None:
+                self.stream = self._open()
+            position = self.stream.tell()
+            if self.maxBytes > 0 and position and position + len(text) >= self.maxBytes:
+                self.doRollover()
+            self.stream.write(text)
+            self.flush()
+        except Exception:
+            self.handleError(records[0])
+
+
+class BatchingQueueListener:
+    """Thread taking records off the queue and writing up to a batch at a time."""
+
+    _STOP = None
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler):
+        self.queue = log_queue
+        self.handlers = handlers
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write the queued records and stop the thread."""
+        if self._thread is None:
+            return
+        # blocks: at shutdown we want every record written
+        self.queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = self._STOP in batch
+            records = [record for record in batch if record is not self._STOP]
+            if records:
+                self._write(records)
+            if stop:
+                return
+
+    def _write(self, records: list[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            selected = [r for r in records if r.levelno >= handler.level]
+            if selected:
+                handler.emit_batch(selected)
+
+
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def dropped_log_records() -> int:
+    """Records dropped because the log queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def log_queue_depth() -> int:
+    """Records waiting to be written."""
+    return _queue_handler.queue.qsize() if _queue_handler is not None else 0
 
 
 def setup_logging():
@@ -16,25 +248,39 @@ def setup_logging():
     Configure logging for the application with a custom format.
     Should be called once at application startup.
 
-    Logs are written to both stdout and a rotating log file (app.log).
-    The log file rotates at 5 MB and keeps up to 3 backup files.
+    Logs are written to both stdout and a rotating log file (app.log) by a background
+    thread, see the module docstring. The log file rotates at 5 MB and keeps up to 3
+    backup files. Queued records are written when the process exits.
     """
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s: %(message)s"
-    )
+    global _queue_handler
+    if _queue_handler is not None:
+        return
+
+    formatter = TextFormatter() if LOG_FORMAT == "text" else JsonFormatter()
 
-    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler = _BatchStreamHandler(sys.stdout)
     stream_handler.setFormatter(formatter)
 
-    file_handler = RotatingFileHandler(
+    file_handler = _BatchRotatingFileHandler(
         LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
     )
     file_handler.setFormatter(formatter)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        handlers=[stream_handler, file_handler],
-    )
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    rates = {
+        name: float(rate)
+        for name, rate in _parse_mapping(os.environ.get("LOG_SAMPLE_RATES", "")).items()
+    }
+    _queue_handler.addFilter(SamplingFilter(rates))
+
+    listener = BatchingQueueListener(log_queue, stream_handler, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logging.basicConfig(level=LOG_LEVEL, handlers=[_queue_handler])
+    for name, level in _parse_mapping(os.environ.get("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level.upper())
 
 
 def get_logger(name: str) -> logging.Logger:
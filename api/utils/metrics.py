@@ -0,0 +1,318 @@
+"""
+Request and database metrics in the Prometheus text exposition format.
+
+Collection avoids locks on the request path. ``MetricsMiddleware`` updates the
+per-route series from the event loop thread, which is the only thread that touches
+them. Statement timings come from the database threads and go to per-thread shards of
+``ShardedHistogram``, which are only summed when ``/metrics`` is scraped. Work done
+for one request is added to its ``RequestStats`` (``utils.request_context``).
+"""
+
+import bisect
+import logging
+import re
+import threading
+import time
+import uuid
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.logger import get_logger
+from utils.request_context import RequestStats, request_stats
+
+# seconds; the Prometheus client defaults
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5, 1.0)
+
+# label used for requests that matched no route, so random paths can't create series
+UNMATCHED_ROUTE = "unmatched"
+
+# one INFO record per request, with its latency and database time
+access_logger = get_logger("api.access")
+
+# X-Request-ID values accepted from clients or proxies; others are replaced
+_REQUEST_ID_RE = re.compile(rb"[\w.-]{1,64}")
+
+
+class Histogram:
+    """Cumulative histogram for use from a single thread."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        # one slot per bucket plus +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class ShardedHistogram:
+    """
+    Histogram that any thread can observe into without taking a lock: every thread
+    writes to its own shard, and ``snapshot`` adds the shards up. Shards of threads that
+    have exited (the threadpool retires idle workers) are folded into one at snapshot
+    time, so the number of shards stays bounded.
+    """
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, Histogram]] = []
+        self._retired = Histogram(buckets)
+        self._shards_lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = Histogram(self.buckets)
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        shard.observe(value)
+
+    def snapshot(self) -> Histogram:
+        total = Histogram(self.buckets)
+        with self._shards_lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    _add(self._retired, shard)
+            self._shards = live
+            _add(total, self._retired)
+        for _, shard in live:
+            _add(total, shard)
+        return total
+
+
+def _add(total: Histogram, other: Histogram) -> None:
+    total.counts = [a + b for a, b in zip(total.counts, other.counts)]
+    total.sum += other.sum
+    total.count += other.count
+
+
+# every SQL statement run on an instrumented connection, see db.InstrumentedConnection
+db_query_seconds = ShardedHistogram(DB_QUERY_BUCKETS)
+
+
+def record_query(seconds: float) -> None:
+    """Record one statement run up to its first row, for its latency and its request."""
+    db_query_seconds.observe(seconds)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.db_seconds += seconds
+        stats.db_queries += 1
+
+
+def record_fetch(seconds: float) -> None:
+    """Record time spent fetching the remaining rows of a statement."""
+    stats = request_stats.get()
+    if stats is not None:
+        stats.db_seconds += seconds
+
+
+class _RouteSeries:
+    __slots__ = ("duration", "db_seconds", "db_queries", "responses")
+
+    def __init__(self) -> None:
+        self.duration = Histogram(REQUEST_BUCKETS)
+        self.db_seconds = Histogram(REQUEST_BUCKETS)
+        self.db_queries = 0
+        # status code -> count
+        self.responses: dict[int, int] = {}
+
+
+# (method, route template) -> series; only touched from the event loop thread
+_routes: dict[tuple[str, str], _RouteSeries] = {}
+_in_flight = 0
+
+
+def _request_id(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-request-id" and _REQUEST_ID_RE.fullmatch(value):
+            return value.decode()
+    return uuid.uuid4().hex[:16]
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request and attributing it to its route
+    template (``/api/events/{event_id}``, not the concrete path).
+
+    It also gives the request its id, taken from the ``X-Request-ID`` header or
+    generated, returns it in the response's ``X-Request-ID`` and logs the request to
+    ``api.access`` once done.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _in_flight
+        status_code = 500
+
+        stats = RequestStats(_request_id(scope), scope)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", stats.request_id.encode()),
+                ]
+            await send(message)
+
+        token = request_stats.set(stats)
+        _in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_flight -= 1
+            request_stats.reset(token)
+            # the router adds the matched route to the scope
+            route = scope.get("route")
+            key = (
+                scope["method"],
+                getattr(route, "path_format", None) or UNMATCHED_ROUTE,
+            )
+            series = _routes.get(key)
+            if series is None:
+                series = _routes[key] = _RouteSeries()
+            series.duration.observe(elapsed)
+            series.db_seconds.observe(stats.db_seconds)
+            series.db_queries += stats.db_queries
+            series.responses[status_code] = series.responses.get(status_code, 0) + 1
+            if access_logger.isEnabledFor(logging.INFO):
+                # logged after the reset, so the request fields are passed explicitly
+                access_logger.info(
+                    "%s %s %d",
+                    key[0],
+                    scope["path"],
+                    status_code,
+                    extra={
+                        "request_id": stats.request_id,
+                        "method": key[0],
+                        "route": key[1],
+                        "status_code": status_code,
+                        "elapsed_ms": round(elapsed * 1000, 3),
+                        "db_ms": round(stats.db_seconds * 1000, 3),
+                        "db_queries": stats.db_queries,
+                    },
+                )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict[str, object]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in labels.items()
+    )
+    return "{" + inner + "}"
+
+
+class MetricsWriter:
+    """Builds an exposition: one ``# HELP``/``# TYPE`` header per metric family."""
+
+    def __init__(self) -> None:
+        self._lines: list[str] = []
+
+    def family(self, name: str, kind: str, help_text: str) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(
+        self, name: str, value: float, labels: Optional[dict[str, object]] = None
+    ) -> None:
+        self._lines.append(f"{name}{_labels(labels or {})} {value}")
+
+    def histogram(
+        self,
+        name: str,
+        histogram: Histogram,
+        labels: Optional[dict[str, object]] = None,
+    ) -> None:
+        labels = labels or {}
+        cumulative = 0
+        for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+            cumulative += count
+            self.sample(f"{name}_bucket", cumulative, {**labels, "le": bound})
+        self.sample(f"{name}_sum", histogram.sum, labels)
+        self.sample(f"{name}_count", histogram.count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def write_request_metrics(writer: MetricsWriter) -> None:
+    """Add the per-route request and database series. Call from the event loop."""
+    routes = sorted(_routes.items())
+
+    writer.family("http_requests_total", "counter", "HTTP requests served.")
+    for (method, route), series in routes:
+        for status_code, count in sorted(series.responses.items()):
+            writer.sample(
+                "http_requests_total",
+                count,
+                {"method": method, "route": route, "status": status_code},
+            )
+
+    writer.family("http_request_duration_seconds", "histogram", "HTTP request latency.")
+    for (method, route), series in routes:
+        writer.histogram(
+            "http_request_duration_seconds",
+            series.duration,
+            {"method": method, "route": route},
+        )
+
+    writer.family(
+        "http_request_db_seconds",
+        "histogram",
+        "Time spent in SQL statements per HTTP request.",
+    )
+    for (method, route), series in routes:
+        writer.histogram(
+            "http_request_db_seconds",
+            series.db_seconds,
+            {"method": method, "route": route},
+        )
+
+    writer.family(
+        "http_request_db_queries_total",
+        "counter",
+        "SQL statements run while serving HTTP requests.",
+    )
+    for (method, route), series in routes:
+        writer.sample(
+            "http_request_db_queries_total",
+            series.db_queries,
+            {"method": method, "route": route},
+        )
+
+    writer.family("http_requests_in_flight", "gauge", "HTTP requests being served.")
+    writer.sample("http_requests_in_flight", _in_flight)
+
+    writer.family(
+        "db_query_duration_seconds",
+        "histogram",
+        "Latency of single SQL statements, up to their first row.",
+    )
+    writer.histogram("db_query_duration_seconds", db_query_seconds.snapshot())
@@ -0,0 +1,122 @@
+"""
+Organization overview: everything the organization page needs in one response.
+
+The overview is the same for every caller except for the caller's own role, so the
+shared part is cached per organization for ``OVERVIEW_CACHE_TTL_SECONDS``. Any code that
+changes an organization, its roles, its events or their registrations must call
+``invalidate_organization_overview`` afterwards.
+"""
+
+import sqlite3
+from typing import Optional
+
+from utils.cache import TTLCache
+from utils.schedule import utc_today
+
+OVERVIEW_CACHE_SIZE = 1024
+OVERVIEW_CACHE_TTL_SECONDS = 60
+OVERVIEW_UPCOMING_EVENTS = 20
+
+_overview_cache = TTLCache(
+    maxsize=OVERVIEW_CACHE_SIZE,
+    ttl=OVERVIEW_CACHE_TTL_SECONDS,
+    name="organization_overview",
+)
+
+
+def invalidate_organization_overview(organization_id: int) -> None:
+    _overview_cache.pop(organization_id)
+
+
+def load_organization_overview(
+    conn: sqlite3.Connection, organization_id: int
+) -> Optional[dict]:
+    """
+    Return the cached overview of an organization, building it on a miss.
+
+    Returns None if the organization does not exist. Every query is an indexed lookup on
+    ``organization_id``.
+    """
+    overview = _overview_cache.get(organization_id)
+    if overview is not None:
+        return overview
+
+    organization = conn.execute(
+        """
+        SELECT organization_id, name, description, category, created_by_user_id
+        FROM organizations
+        WHERE organization_id = ?
+        """,
+        (organization_id,),
+    ).fetchone()
+    if organization is None:
+        return None
+
+    # covering scan of idx_roles_org_level
+    member_count = conn.execute(
+        "SELECT COUNT(*) FROM roles WHERE organization_id = ?", (organization_id,)
+    ).fetchone()[0]
+
+    admins = conn.execute(
+        """
+        SELECT r.user_id, u.first_name, u.last_name
+        FROM roles r
+        JOIN users u ON u.user_id = r.user_id
+        WHERE r.organization_id = ? AND r.permission_level = 'admin'
+        ORDER BY r.user_id
+        """,
+        (organization_id,),
+    ).fetchall()
+
+    # date_time values start with their UTC date, so comparing against today in UTC
+    # keeps the range scan on idx_events_org_date (events from earlier today are still
+    # listed)
+    events = conn.execute(
+        """
+        SELECT id, name, description, location, date_time, end_date_time, organization_id, category
+        FROM events
+        WHERE organization_id = ? AND date_time >= ?
+        ORDER BY date_time
+        LIMIT ?
+        """,
+        (organization_id, utc_today(), OVERVIEW_UPCOMING_EVENTS),
+    ).fetchall()
+
+    registration_counts: dict[int, int] = {}
+    if events:
+        event_ids = [event["id"] for event in events]
+        # covering scan of idx_event_registrations_event
+        registration_counts = dict(
+            conn.execute(
+                f"""
+                SELECT event_id, COUNT(*)
+                FROM event_registrations
+                WHERE event_id IN ({", ".join("?" for _ in event_ids)})
+                GROUP BY event_id
+                """,
+                event_ids,
+            ).fetchall()
+        )
+
+    overview = {
+        "organization": dict(organization),
+        "member_count": member_count,
+        "admins": [
+            {
+                "user_id": admin["user_id"],
+                "organization_id": organization_id,
+                "name": f"{admin['first_name']} {admin['last_name']}",
+                "permission_level": "admin",
+            }
+            for admin in admins
+        ],
+        "upcoming_events": [
+            {
+                **dict(event),
+                "registration_count": registration_counts.get(event["id"], 0),
+            }
+            for event in events
+        ],
+    }
+    _overview_cache.set(organization_id, overview)
+    return overview
@@ -1,6 +1,7 @@
 import os
 import sqlite3
 
+from categories import seed_categories
 from db_schema import DB_SCHEMA
 from insert_organizations_data import execute_insert_orgs_data
 from insert_roles_data import execute_insert_roles_data
@@ -22,6 +23,9 @@ if __name__ == "__main__":
     conn = sqlite3.connect(db_file)
     cursor = conn.cursor()
     cursor.executescript(DB_SCHEMA)
+    # before any data, the category triggers resolve categories against this table
+    seed_categories(conn)
+    conn.commit()
 
     try:
         execute_insert_users_data(conn, cursor, NUM_RECORDS)
@@ -0,0 +1,273 @@
+"""
+Sampling profiler for individual requests.
+
+A request is profiled when it sends ``X-Profile: 1`` together with a valid
+``X-Debug-Token``, or when it is picked at random with probability
+``PROFILE_SAMPLE_RATE``. While at least one profiled request is in flight, a
+background thread records the Python stacks of the threads working for it every
+``PROFILE_INTERVAL_MS``:
+
+- threadpool workers running a sync endpoint of the request. ``attribute_endpoints``
+  wraps those endpoints so that, inside the worker, the thread registers itself on the
+  profile found in the request's context until the endpoint returns. Sync dependencies,
+  response validation and streamed bodies also run in the threadpool but are not
+  attributed;
+- the event loop thread, while it isn't idle. It is shared by all requests, so these
+  samples can include the async work of concurrent requests.
+
+Nothing is sampled while no request is profiled. Finished profiles are kept in a ring
+buffer of ``PROFILE_BUFFER_SIZE`` and rendered as collapsed stacks, the input format of
+flamegraph.pl and speedscope. Work done outside the process (bcrypt in the password
+pool) shows up as the handler thread waiting for it.
+"""
+
+import asyncio
+import functools
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from types import FrameType
+from typing import Any, Callable, Optional
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.metrics import UNMATCHED_ROUTE
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_BUFFER_SIZE = 50
+# stacks deeper than this are cut at the root end
+PROFILE_MAX_DEPTH = 128
+
+# top frame of the event loop thread while it waits for I/O
+_IDLE_CODE_NAME = "select"
+
+_active_profile: ContextVar[Optional["Profile"]] = ContextVar(
+    "active_profile", default=None
+)
+
+
+class Profile:
+    """Stack samples of one request."""
+
+    def __init__(self, method: str, path: str, loop_thread_id: int):
+        self.profile_id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.route = UNMATCHED_ROUTE
+        self.status_code = 500
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.loop_thread_id = loop_thread_id
+        # threadpool workers currently running an endpoint of this request
+        self.worker_threads: set[int] = set()
+        # collapsed stack -> samples; only written by the sampler thread
+        self.stacks: Counter[str] = Counter()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def summary(self) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "route": self.route,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "samples": self.samples,
+        }
+
+    def collapsed(self) -> str:
+        """One ``root;...;leaf count`` line per distinct stack."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    filename = "/".join(parts[-2:])
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def _collapse(root: str, frame: Optional[FrameType]) -> str:
+    names = []
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        names.append(_frame_name(frame).replace(";", ":"))
+        frame = frame.f_back
+    names.append(root)
+    return ";".join(reversed(names))
+
+
+def _attributed(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a sync endpoint so its worker thread is sampled for the request's profile."""
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        # runs in the worker thread, with a copy of the request's context
+        profile = _active_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        thread_id = threading.get_ident()
+        profile.worker_threads.add(thread_id)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.worker_threads.discard(thread_id)
+
+    return wrapper
+
+
+def attribute_endpoints(app: FastAPI) -> None:
+    """
+    Let the profiler sample the threads running the app's sync endpoints. Call once,
+    after every router has been included.
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not asyncio.iscoroutinefunction(
+            route.dependant.call
+        ):
+            route.dependant.call = _attributed(route.dependant.call)
+
+
+class _Sampler:
+    """Background thread sampling stacks while profiled requests are in flight."""
+
+    def __init__(self) -> None:
+        self._profiles: set[Profile] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+
+    def remove(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self) -> None:
+        interval = PROFILE_INTERVAL_MS / 1000
+        while True:
+            # sampling under the lock, so a profile is no longer written to once
+            # remove() returns
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                self._sample(self._profiles)
+            time.sleep(interval)
+
+    def _sample(self, profiles: set[Profile]) -> None:
+        frames = sys._current_frames()
+        loop_threads = {profile.loop_thread_id for profile in profiles}
+        worker_profiles = {
+            thread_id: profile
+            for profile in profiles
+            for thread_id in list(profile.worker_threads)
+        }
+        for thread_id, frame in frames.items():
+            if thread_id in loop_threads:
+                if frame.f_code.co_name == _IDLE_CODE_NAME:
+                    continue
+                stack = _collapse("event-loop", frame)
+                for profile in profiles:
+                    if profile.loop_thread_id == thread_id:
+                        profile.stacks[stack] += 1
+                continue
+            profile = worker_profiles.get(thread_id)
+            if profile is not None:
+                profile.stacks[_collapse("threadpool", frame)] += 1
+
+
+_sampler = _Sampler()
+_recent: deque[Profile] = deque(maxlen=PROFILE_BUFFER_SIZE)
+_recent_lock = threading.Lock()
+
+
+def recent_profiles() -> list[Profile]:
+    """Finished profiles, most recent first."""
+    with _recent_lock:
+        return list(reversed(_recent))
+
+
+def get_profile(profile_id: str) -> Optional[Profile]:
+    with _recent_lock:
+        return next((p for p in _recent if p.profile_id == profile_id), None)
+
+
+def clear_profiles() -> None:
+    with _recent_lock:
+        _recent.clear()
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware profiling the requests selected by header or sampling rate.
+    The response of a profiled request carries its id in ``X-Profile-Id``.
+
+    ``authorize`` receives the ``X-Debug-Token`` header value (or None) and decides
+    whether ``X-Profile`` is honoured.
+    """
+
+    def __init__(self, app: ASGIApp, authorize: Callable[[Optional[str]], bool]):
+        self.app = app
+        self.authorize = authorize
+
+    def _should_profile(self, scope: Scope) -> bool:
+        requested = False
+        token = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                requested = value not in (b"", b"0")
+            elif name == b"x-debug-token":
+                token = value.decode("latin-1")
+        if requested and self.authorize(token):
+            return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], threading.get_ident())
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-id", profile.profile_id.encode()),
+                ]
+            await send(message)
+
+        token = _active_profile.set(profile)
+        _sampler.add(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.duration_ms = (time.perf_counter() - start) * 1000
+            _sampler.remove(profile)
+            _active_profile.reset(token)
+            route = scope.get("route")
+            profile.route = getattr(route, "path_format", None) or UNMATCHED_ROUTE
+            with _recent_lock:
+                _recent.append(profile)
@@ -0,0 +1,178 @@
+"""
+Per-statement statistics and the slow-query log.
+
+Every statement run on a connection from ``db.connect`` is reduced to a fingerprint
+(literals replaced by ``?``, ``IN`` lists collapsed, whitespace normalized), so the
+same inline SQL string in ``routes/`` always lands on the same row, whatever its
+parameters. For each fingerprint we keep the number of runs, the total time, the rows
+fetched and a rolling window of latencies for percentiles.
+
+A statement taking longer than ``SLOW_QUERY_MS`` is logged with the shapes of its
+bound parameters (types and lengths, never values) and its ``EXPLAIN QUERY PLAN``. The
+plan is looked up at most once per fingerprint every ``SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS``,
+so a hot slow query doesn't double its own cost.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Literal, Optional
+
+from utils.latency import LatencyTracker
+from utils.logger import get_logger
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = 300
+# latencies kept per fingerprint for the percentiles
+QUERY_STATS_WINDOW = 500
+# statements beyond this many distinct fingerprints are counted under OTHER_FINGERPRINT
+QUERY_STATS_MAX_FINGERPRINTS = 1000
+OTHER_FINGERPRINT = "<other>"
+
+logger = get_logger(__name__)
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """Normalize SQL text so statements differing only in literals compare equal."""
+    text = _COMMENT_RE.sub(" ", sql)
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return _PLACEHOLDER_LIST_RE.sub("(?, ...)", text)
+
+
+class StatementStats:
+    """Counters for one fingerprint."""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.latency = LatencyTracker(window=QUERY_STATS_WINDOW)
+        # time spent fetching rows after the first one, and the rows fetched
+        self.fetch_seconds = 0.0
+        self.rows = 0
+        self.last_explained = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        self.latency.record(seconds)
+
+    def record_fetch(self, seconds: float, rows: int) -> None:
+        with self._lock:
+            self.fetch_seconds += seconds
+            self.rows += rows
+
+    def should_explain(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self.last_explained < SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+                return False
+            self.last_explained = now
+            return True
+
+    def summary(self) -> dict:
+        latency = self.latency.summary()
+        count = latency["count"]
+        total_seconds = self.latency.total_seconds()
+        with self._lock:
+            total_seconds += self.fetch_seconds
+            rows = self.rows
+        return {
+            "fingerprint": self.fingerprint,
+            **latency,
+            "total_ms": round(total_seconds * 1000, 3),
+            "mean_ms": round(total_seconds * 1000 / count, 3) if count else None,
+            "rows": rows,
+        }
+
+
+_stats: dict[str, StatementStats] = {}
+_stats_lock = threading.Lock()
+
+
+def statement_stats(sql: str) -> StatementStats:
+    """Return the stats of the fingerprint of ``sql``, creating them on first use."""
+    key = fingerprint(sql)
+    stats = _stats.get(key)
+    if stats is None:
+        with _stats_lock:
+            if key not in _stats and len(_stats) >= QUERY_STATS_MAX_FINGERPRINTS:
+                key = OTHER_FINGERPRINT
+            stats = _stats.get(key)
+            if stats is None:
+                stats = _stats[key] = StatementStats(key)
+    return stats
+
+
+def top_statements(
+    limit: int, order_by: Literal["total", "p99", "count", "rows"] = "total"
+) -> list[dict]:
+    """Return the summaries of the ``limit`` heaviest fingerprints."""
+    with _stats_lock:
+        summaries = [stats.summary() for stats in _stats.values()]
+    sort_key = {
+        "total": "total_ms",
+        "p99": "p99_ms",
+        "count": "count",
+        "rows": "rows",
+    }[order_by]
+    summaries.sort(key=lambda summary: summary[sort_key] or 0, reverse=True)
+    return summaries[:limit]
+
+
+def reset_statement_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def parameter_shapes(parameters: Any) -> str:
+    """Describe bound parameters by type (and length for text/blobs), never by value."""
+
+    def shape(value: Any) -> str:
+        if value is None:
+            return "NULL"
+        if isinstance(value, (str, bytes)):
+            return f"{type(value).__name__}({len(value)})"
+        return type(value).__name__
+
+    if isinstance(parameters, dict):
+        return ", ".join(f":{name}={shape(v)}" for name, v in parameters.items())
+    return ", ".join(shape(value) for value in parameters)
+
+
+def log_slow_statement(
+    conn: sqlite3.Connection,
+    stats: StatementStats,
+    sql: str,
+    parameters: Optional[Any],
+    seconds: float,
+) -> None:
+    """
+    Log a statement that took longer than ``SLOW_QUERY_MS``, with its query plan.
+
+    ``parameters`` is None for ``executemany``, whose plan isn't looked up.
+    """
+    plan = ""
+    if parameters is not None and stats.should_explain():
+        try:
+            # a plain cursor, so the EXPLAIN itself isn't recorded
+            rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            plan = "\n".join(f"  {row[3]}" for row in rows)
+        except sqlite3.Error as exc:
+            plan = f"  (no plan: {exc})"
+    logger.warning(
+        "Slow query (%.1f ms): %s [params: %s]%s",
+        seconds * 1000,
+        stats.fingerprint,
+        "executemany" if parameters is None else parameter_shapes(parameters),
+        f"\n{plan}" if plan else "",
+    )
@@ -0,0 +1,147 @@
+"""
+In-memory request throttling for expensive, abuse-prone endpoints (login, password reset).
+
+Limits are per process, so with several workers the effective limit is multiplied by the
+number of workers. That is fine for the purpose here: keeping a credential-stuffing burst
+from pinning every core on bcrypt.
+
+Per-IP limits key on the real client address. Requests relayed by a proxy listed in
+``TRUSTED_PROXIES`` (the Next.js server rewrites ``/api/*`` to the API from localhost)
+are keyed on the address it reports in ``X-Forwarded-For``; otherwise all users behind
+the proxy would share one bucket.
+"""
+
+import ipaddress
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+
+class SlidingWindowLimiter:
+    """
+    Allows at most ``limit`` hits per key in any ``window`` second period.
+
+    Each key keeps at most ``limit`` timestamps and at most ``max_keys`` keys are tracked
+    (least recently used keys are dropped first), so memory is bounded. Keys whose hits
+    have all left the window are swept every ``sweep_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        window: float,
+        max_keys: int = 100_000,
+        sweep_interval: float = 60,
+    ):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self._hits: OrderedDict[str, deque[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def hit(self, key: str) -> Optional[float]:
+        """
+        Record a hit for ``key``.
+
+        Returns None if the hit is allowed, otherwise the number of seconds until the
+        key is allowed again. Rejected hits are not recorded.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = deque(maxlen=self.limit)
+                self._hits[key] = hits
+                if len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+            else:
+                self._hits.move_to_end(key)
+
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return hits[0] + self.window - now
+            hits.append(now)
+            return None
+
+    def undo(self, key: str) -> None:
+        """Forget the most recent hit of ``key``, e.g. for an attempt that succeeded."""
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits:
+                hits.pop()
+
+    def _sweep(self, now: float) -> None:
+        cutoff = now - self.window
+        stale = [
+            key for key, hits in self._hits.items() if not hits or hits[-1] <= cutoff
+        ]
+        for key in stale:
+            del self._hits[key]
+        self._last_sweep = now
+
+
+# attempts per client IP / per account email
+login_ip_limiter = SlidingWindowLimiter(limit=30, window=60)
+login_email_limiter = SlidingWindowLimiter(limit=10, window=300)
+reset_ip_limiter = SlidingWindowLimiter(limit=5, window=60)
+reset_email_limiter = SlidingWindowLimiter(limit=3, window=900)
+
+
+# comma-separated addresses or networks of proxies whose X-Forwarded-For is believed
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.environ.get("TRUSTED_PROXIES", "127.0.0.1,::1").split(",")
+    if entry.strip()
+]
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """
+    The address of the client. When the connection comes from a trusted proxy, the
+    ``X-Forwarded-For`` chain is read from the right and the first address not added
+    by a trusted proxy is used; a client can only spoof entries to the left of it.
+    """
+    address = request.client.host if request.client else "unknown"
+    if not _is_trusted_proxy(address):
+        return address
+    forwarded = request.headers.get("x-forwarded-for", "")
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        address = hop
+        if not _is_trusted_proxy(hop):
+            break
+    return address
+
+
+def enforce_rate_limits(*checks: tuple[SlidingWindowLimiter, str]) -> None:
+    """
+    Raise 429 if any ``(limiter, key)`` pair is over its limit.
+
+    Checks run in order and stop at the first rejection, so a request rejected by its
+    IP limit does not use up the account's allowance.
+    """
+    for limiter, key in checks:
+        retry_after = limiter.hit(key)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, please try again later",
+                headers={"Retry-After": str(max(1, round(retry_after)))},
+            )
@@ -0,0 +1,47 @@
+"""
+Event recommendations, shared by ``/api/events/recommended`` and the dashboard.
+"""
+
+import sqlite3
+
+
+def load_recommended_events(
+    conn: sqlite3.Connection, user_id: int, limit: int
+) -> list[dict]:
+    """
+    Return up to ``limit`` events the user has not registered for, those matching one of
+    their interests first, each group by ``date_time`` ascending.
+
+    Interests are read from the ``interests_mask`` bitmask, so each event's category is
+    matched with a single bit test.
+    """
+    mask_row = conn.execute(
+        "SELECT interests_mask FROM users WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    mask = mask_row["interests_mask"] if mask_row else 0
+
+    if mask:
+        query = """
+            SELECT id, name, description, location, date_time, end_date_time, organization_id, category
+            FROM events
+            WHERE id NOT IN (
+                SELECT event_id FROM event_registrations WHERE user_id = ?
+            )
+            ORDER BY COALESCE((? >> (category_id - 1)) & 1, 0) DESC,
+                     date_time ASC
+            LIMIT ?
+        """
+        params: list = [user_id, mask, limit]
+    else:
+        query = """
+            SELECT id, name, description, location, date_time, end_date_time, organization_id, category
+            FROM events
+            WHERE id NOT IN (
+                SELECT event_id FROM event_registrations WHERE user_id = ?
+            )
+            ORDER BY date_time ASC
+            LIMIT ?
+        """
+        params = [user_id, limit]
+
+    return [dict(row) for row in conn.execute(query, params).fetchall()]
@@ -0,0 +1,46 @@
+"""
+Request-scoped state carried in context variables.
+
+Context variables follow the request through ``await`` and into the threadpool that
+runs sync endpoints and dependencies. Anything set here must be reset once the request
+or batch that set it is done.
+"""
+
+import sqlite3
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# Set by POST /api/batch while it dispatches its sub-requests: they reuse the batch's
+# connection and its authenticated principal instead of opening and resolving their own.
+shared_connection: ContextVar[Optional[sqlite3.Connection]] = ContextVar(
+    "shared_connection", default=None
+)
+shared_principal: ContextVar[Optional[dict]] = ContextVar(
+    "shared_principal", default=None
+)
+
+
+class RequestStats:
+    """
+    One request being served: its id, its ASGI scope (the router adds the matched
+    route to it) and the database work done so far.
+
+    Only the thread currently running the request's code updates it, so it needs no
+    lock; the metrics middleware reads it once the response is sent.
+    """
+
+    __slots__ = ("request_id", "scope", "start", "db_seconds", "db_queries")
+
+    def __init__(self, request_id: str, scope: dict) -> None:
+        self.request_id = request_id
+        self.scope = scope
+        self.start = time.perf_counter()
+        self.db_seconds = 0.0
+        self.db_queries = 0
+
+
+# set by the metrics middleware for every HTTP request
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
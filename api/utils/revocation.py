@@ -0,0 +1,110 @@
+"""
+Revocation of JWTs before they expire.
+
+Two mechanisms, both persisted in SQLite:
+
+- ``revoked_tokens``: individual tokens, by their ``jti`` claim (e.g. on logout). Rows
+  are only needed until the token would have expired anyway.
+- ``token_watermarks``: a per-user "tokens issued before" timestamp that revokes every
+  token of a user at once (e.g. account deletion or password reset).
+
+``is_token_revoked`` only consults in-memory copies (a hash set and a dict), so checking
+costs a couple of lookups per request. Each process picks up revocations made by other
+workers every ``REVOCATION_SYNC_SECONDS``.
+"""
+
+import sqlite3
+import threading
+import time
+
+REVOCATION_SYNC_SECONDS = 5
+
+_revoked: dict[str, float] = {}  # jti -> token expiry
+_watermarks: dict[str, float] = {}  # user ID (as in the "sub" claim) -> not_before
+_last_revoked_rowid = 0
+_last_sync = 0.0
+_lock = threading.Lock()
+
+
+def sync_revocations(conn: sqlite3.Connection, force: bool = False) -> None:
+    """
+    Load revocations added since the last sync and drop expired ones.
+
+    Cheap to call on every request: it only touches the database once every
+    ``REVOCATION_SYNC_SECONDS`` (or when ``force`` is set).
+    """
+    global _last_revoked_rowid, _last_sync
+    now = time.time()
+    if not force and now - _last_sync < REVOCATION_SYNC_SECONDS:
+        return
+
+    rows = conn.execute(
+        "SELECT rowid, jti, expires_at FROM revoked_tokens WHERE rowid > ? AND expires_at > ?",
+        (_last_revoked_rowid, now),
+    ).fetchall()
+    watermark_rows = conn.execute(
+        "SELECT user_id, not_before FROM token_watermarks"
+    ).fetchall()
+
+    with _lock:
+        for rowid, jti, expires_at in rows:
+            _revoked[jti] = expires_at
+            _last_revoked_rowid = max(_last_revoked_rowid, rowid)
+        for user_id, not_before in watermark_rows:
+            _watermarks[str(user_id)] = not_before
+        for jti in [jti for jti, expires_at in _revoked.items() if expires_at <= now]:
+            del _revoked[jti]
+        _last_sync = now
+
+
+def load_revocations(conn: sqlite3.Connection) -> None:
+    """Purge expired rows and load every revocation. Called once at startup."""
+    conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (time.time(),))
+    conn.commit()
+    sync_revocations(conn, force=True)
+
+
+def is_token_revoked(claims: dict) -> bool:
+    """
+    Return True if the token with these (already verified) claims has been revoked.
+
+    Tokens without an ``iat`` claim predate revocation support and are treated as
+    revoked once their user has a watermark.
+    """
+    jti = claims.get("jti")
+    if jti is not None and jti in _revoked:
+        return True
+    not_before = _watermarks.get(str(claims.get("sub")))
+    if not_before is None:
+        return False
+    return claims.get("iat", 0) < not_before
+
+
+def revoke_token(conn: sqlite3.Connection, claims: dict) -> None:
+    """Revoke a single token. Tokens without a ``jti`` claim can't be revoked individually."""
+    jti = claims.get("jti")
+    if jti is None:
+        return
+    expires_at = claims.get("exp", time.time())
+    conn.execute(
+        "INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+        (jti, expires_at),
+    )
+    conn.commit()
+    with _lock:
+        _revoked[jti] = expires_at
+
+
+def revoke_user_tokens(conn: sqlite3.Connection, user_id: int) -> None:
+    """Revoke every token issued to a user up to now."""
+    not_before = time.time()
+    conn.execute(
+        """
+        INSERT INTO token_watermarks (user_id, not_before) VALUES (?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET not_before = excluded.not_before
+        """,
+        (user_id, not_before),
+    )
+    conn.commit()
+    with _lock:
+        _watermarks[str(user_id)] = not_before
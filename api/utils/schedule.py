@@ -0,0 +1,96 @@
+"""
+Schedule-conflict helpers for events and event registrations.
+
+Events have a start ``date_time`` and an optional ``end_date_time``. Events without an
+end time are treated as lasting ``DEFAULT_EVENT_DURATION_MINUTES`` (utils/db_schema.py). Both columns are
+stored as ``YYYY-MM-DD HH:MM:SS`` (UTC when an offset was given), normalized by
+triggers whatever writes them, so they compare correctly as plain text. The generated
+``effective_end`` column holds the end time with the default applied, and
+``duration_seconds`` the length of the event.
+
+Two events conflict when their intervals overlap, i.e. each one starts before the other
+ends. Conflicts are only ever checked against the events a single user is registered
+for, which are reached through the ``event_registrations`` primary key (``user_id`` is
+its leading column). For each of them the candidates are found by a range search on
+``idx_events_schedule``: an overlapping event starts before the registered one ends and
+at most the longest event duration (``idx_events_duration``) before it starts.
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+
+
+def utc_today() -> str:
+    """Today's date in UTC, the zone event times are stored in, as ``YYYY-MM-DD``."""
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def overlap_sql(left: str, right: str) -> str:
+    """SQL condition that is true when the events aliased ``left`` and ``right`` overlap."""
+    return (
+        f"{left}.date_time < {right}.effective_end "
+        f"AND {right}.date_time < {left}.effective_end"
+    )
+
+
+def conflicting_event_ids_sql() -> str:
+    """
+    SQL query selecting the ids of the events that overlap another event the user is
+    registered for. Takes the user ID as its only parameter.
+
+    It is not correlated with the outer query, so ``id NOT IN (...)`` runs it once.
+    """
+    return f"""
+        SELECT candidate.id
+        FROM event_registrations er_conflict
+        JOIN events registered ON registered.id = er_conflict.event_id
+        JOIN events candidate
+          ON candidate.date_time > datetime(
+                 registered.date_time,
+                 '-' || (SELECT MAX(duration_seconds) FROM events) || ' seconds'
+             )
+         AND {overlap_sql("candidate", "registered")}
+        WHERE er_conflict.user_id = ?
+          AND candidate.id != registered.id
+    """
+
+
+def normalize_event_times(conn: sqlite3.Connection) -> None:
+    """Rewrite the times of events stored before the normalizing triggers existed."""
+    conn.execute(
+        """
+        UPDATE events
+        SET date_time = COALESCE(datetime(date_time), date_time),
+            end_date_time = datetime(end_date_time)
+        WHERE date_time IS NOT datetime(date_time)
+           OR end_date_time IS NOT datetime(end_date_time)
+        """
+    )
+
+
+def find_conflicting_events(
+    conn: sqlite3.Connection, user_id: int, event_id: int
+) -> list[sqlite3.Row]:
+    """
+    Return the events the user is registered for that overlap the given event.
+
+    :param conn: the connection to the database
+    :type conn: sqlite3.Connection
+    :param user_id: the user whose registrations are checked
+    :type user_id: int
+    :param event_id: the event the user wants to register for
+    :type event_id: int
+    """
+    return conn.execute(
+        f"""
+        SELECT registered.id, registered.name, registered.date_time, registered.end_date_time
+        FROM events target
+        JOIN event_registrations er ON er.user_id = ?
+        JOIN events registered ON registered.id = er.event_id
+        WHERE target.id = ?
+          AND registered.id != target.id
+          AND {overlap_sql("registered", "target")}
+        ORDER BY registered.date_time
+        """,
+        (user_id, event_id),
+    ).fetchall()
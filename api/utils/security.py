@@ -1,8 +1,22 @@
+import hashlib
+import logging
+import math
+import multiprocessing
 import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta, timezone
+from typing import Callable
+
 import bcrypt
 import jwt
 
+from utils.cache import TTLCache
+from utils.latency import LatencyTracker
+
 _DEV_SECRET = "dev-secret-key-change-in-production"
 SECRET_KEY = os.environ.get("SECRET_KEY", _DEV_SECRET)
 ALGORITHM = "HS256"
@@ -17,33 +31,229 @@ if _ENV != "development" and SECRET_KEY == _DEV_SECRET:
     )
 
 
+# bcrypt runs in a dedicated process pool so a burst of logins can neither hold the GIL
+# nor tie up the threadpool every other route needs. Set PASSWORD_HASH_WORKERS=0 to hash
+# inline instead (e.g. for scripts).
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+# Hash/verify calls allowed to be queued or running at once. Beyond that, callers get
+# PasswordHasherBusy immediately instead of waiting.
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "16"))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(
+    os.environ.get("PASSWORD_HASH_TIMEOUT_SECONDS", "5")
+)
+
+# bcrypt work factor. Each extra round doubles the hashing time. Set BCRYPT_ROUNDS to pin
+# it; otherwise calibrate_bcrypt_rounds() picks the highest cost whose hash time stays
+# within BCRYPT_TARGET_MS on this host when the application starts.
+_BCRYPT_ROUNDS_OVERRIDE = os.environ.get("BCRYPT_ROUNDS")
+BCRYPT_TARGET_MS = float(os.environ.get("BCRYPT_TARGET_MS", "250"))
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+bcrypt_rounds = int(_BCRYPT_ROUNDS_OVERRIDE or 12)
+
+logger = logging.getLogger(__name__)
+
+# Time spent in hash_password/verify_password, including the wait for a pool worker.
+password_hash_latency = LatencyTracker()
+password_verify_latency = LatencyTracker()
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool is saturated or did not answer in time."""
+
+
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn rather than fork: forking a process that already runs threads can
+            # leave locks in the child permanently held
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _release_pending(_future=None) -> None:
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def _run_bcrypt(func: Callable, *args):
+    """
+    Run a bcrypt call in the pool, enforcing the pending limit and the timeout.
+
+    A slot stays taken until its task actually finishes, even if the caller timed out,
+    so the pool's backlog can never grow past ``PASSWORD_HASH_MAX_PENDING``.
+    """
+    global _pending
+    if PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+
+    with _pending_lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            raise PasswordHasherBusy("Too many password operations in progress")
+        _pending += 1
+
+    try:
+        future = _get_pool().submit(func, *args)
+    except Exception:
+        _release_pending()
+        raise
+    future.add_done_callback(_release_pending)
+
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        future.cancel()
+        raise PasswordHasherBusy("Password operation timed out")
+
+
+def password_pool_queue_depth() -> int:
+    """Number of hash/verify calls currently queued or running in the pool."""
+    return _pending
+
+
+def shutdown_password_pool() -> None:
+    """Stop the pool's worker processes. Called when the application shuts down."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# Stored as the credential of users imported by an organization admin until they pick a
+# password through the reset flow. It is not a bcrypt hash, so no password matches it.
+PENDING_INVITE_HASH = "!pending-invite"
+
+
 def hash_password(plain_password: str) -> str:
     """Hash a plain-text password using bcrypt."""
-    password_bytes = plain_password.encode("utf-8")
-    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+    start = time.perf_counter()
+    try:
+        hashed = _run_bcrypt(_hashpw, plain_password.encode("utf-8"), bcrypt_rounds)
+    finally:
+        password_hash_latency.record(time.perf_counter() - start)
     return hashed.decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain-text password against a bcrypt hash."""
-    return bcrypt.checkpw(
-        plain_password.encode("utf-8"),
-        hashed_password.encode("utf-8"),
+    """
+    Verify a plain-text password against a bcrypt hash.
+
+    Placeholders such as ``PENDING_INVITE_HASH`` never match and skip bcrypt entirely.
+    """
+    if not hashed_password.startswith("$2"):
+        return False
+    start = time.perf_counter()
+    try:
+        return _run_bcrypt(
+            _checkpw,
+            plain_password.encode("utf-8"),
+            hashed_password.encode("utf-8"),
+        )
+    finally:
+        password_verify_latency.record(time.perf_counter() - start)
+
+
+def calibrate_bcrypt_rounds() -> int:
+    """
+    Choose the bcrypt work factor for this host, unless BCRYPT_ROUNDS pins it.
+
+    Times a hash at ``BCRYPT_MIN_ROUNDS`` and, since every extra round doubles the cost,
+    extrapolates the highest cost that stays within ``BCRYPT_TARGET_MS``. Called once
+    at startup.
+    """
+    global bcrypt_rounds
+    if _BCRYPT_ROUNDS_OVERRIDE:
+        return bcrypt_rounds
+
+    salt = bcrypt.gensalt(BCRYPT_MIN_ROUNDS)
+    elapsed_ms = math.inf
+    for _ in range(2):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", salt)
+        elapsed_ms = min(elapsed_ms, (time.perf_counter() - start) * 1000)
+
+    extra_rounds = math.floor(math.log2(max(BCRYPT_TARGET_MS / elapsed_ms, 1)))
+    bcrypt_rounds = min(BCRYPT_MIN_ROUNDS + extra_rounds, BCRYPT_MAX_ROUNDS)
+    logger.info(
+        f"bcrypt calibrated to {bcrypt_rounds} rounds "
+        f"({elapsed_ms:.1f} ms at {BCRYPT_MIN_ROUNDS} rounds, target {BCRYPT_TARGET_MS:.0f} ms)"
     )
+    return bcrypt_rounds
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Return True if a stored bcrypt hash uses a lower work factor than the current one.
+
+    Hashes are never downgraded automatically; lowering BCRYPT_ROUNDS only affects new
+    hashes.
+    """
+    try:
+        cost = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return False
+    return cost < bcrypt_rounds
+
+
+# Already-verified tokens, evicted at each token's own expiry (and at the latest after
+# the default access token lifetime).
+VERIFIED_TOKEN_CACHE_SIZE = 10_000
+_verified_tokens = TTLCache(
+    maxsize=VERIFIED_TOKEN_CACHE_SIZE,
+    ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    name="verified_tokens",
+)
 
 
 # When we login, we'll call create_access_token with a dict of claims ("sub" - user's ID && "role" - volunteer or org_admin) and return the token to the client.
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
-    """Create a JWT access token with the given claims."""
+    """
+    Create a JWT access token with the given claims.
+
+    Every token gets a unique ``jti`` and a sub-second ``iat`` so it can be revoked
+    individually or by a per-user watermark (see utils/revocation.py).
+    """
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (
-        expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    )
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode["exp"] = expire
+    to_encode["iat"] = now.timestamp()
+    to_encode["jti"] = uuid.uuid4().hex
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 # Our protected routes will receive the token in something like "Authorization: Bearer <token>" and call decode_access_token to validate it and then extract the userID and role from the claims.
 def decode_access_token(token: str) -> dict:
-    """Decode and validate a JWT access token. Raises jwt.ExpiredSignatureError or jwt.InvalidTokenError."""
-    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    """
+    Decode and validate a JWT access token. Raises jwt.ExpiredSignatureError or jwt.InvalidTokenError.
+
+    Successfully verified tokens are remembered (keyed by a SHA-256 digest of the token)
+    until their own ``exp``, so the same cookie is only verified once.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = _verified_tokens.get(key)
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        expires_in = claims["exp"] - time.time() if "exp" in claims else None
+        _verified_tokens.set(key, claims, ttl=expires_in)
+    # hand out a copy so callers can't mutate the cached entry
+    return dict(claims)
@@ -0,0 +1,260 @@
+"""
+Optional server-side sessions (``SESSION_MODE=opaque``).
+
+Instead of a signed JWT, the session cookie holds a random, opaque session ID. Sessions
+live in an in-memory store keyed by a SHA-256 digest of the ID, along with the user's
+cached principal, so resolving a request's user is a single dict lookup.
+
+Activity slides the expiry forward in memory only; a background thread checkpoints the
+new expiry times to the ``sessions`` table every ``SESSION_CHECKPOINT_SECONDS``. Creating
+and deleting sessions is written through immediately, so other workers can find a new
+session (on a cache miss). Every ``SESSION_SYNC_SECONDS`` the same thread drops the
+in-memory sessions whose row is gone, so a session ended by another worker (logout,
+password reset, account deletion) stops working here too, and is never resurrected.
+"""
+
+import hashlib
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from utils.logger import get_logger
+
+SESSION_MODE = os.environ.get("SESSION_MODE", "jwt")
+SESSION_IDLE_SECONDS = int(os.environ.get("SESSION_IDLE_SECONDS", "3600"))
+SESSION_CHECKPOINT_SECONDS = 30
+# how often sessions deleted by other workers are dropped from memory
+SESSION_SYNC_SECONDS = 5
+# session digests looked up per query by sync()
+SESSION_SYNC_BATCH_SIZE = 500
+# how long a principal stored on a session is trusted before it's reloaded
+SESSION_PRINCIPAL_TTL_SECONDS = 60
+
+logger = get_logger(__name__)
+
+
+def opaque_sessions_enabled() -> bool:
+    return SESSION_MODE == "opaque"
+
+
+def is_session_id(token: str) -> bool:
+    """Opaque session IDs never contain dots, JWTs always do."""
+    return "." not in token
+
+
+def _digest(session_id: str) -> str:
+    return hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Session:
+    """An in-memory session. ``dirty`` marks an expiry not yet checkpointed."""
+
+    user_id: int
+    expires_at: float
+    principal: Optional[dict] = None
+    principal_loaded_at: float = 0.0
+    dirty: bool = field(default=False, repr=False)
+
+
+class SessionStore:
+    """In-memory session table, indexed by session digest and by user."""
+
+    def __init__(self):
+        self._sessions: dict[str, Session] = {}
+        self._by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, conn: sqlite3.Connection, user_id: int) -> str:
+        """Start a session for the user and return its (secret) session ID."""
+        session_id = secrets.token_urlsafe(32)
+        key = _digest(session_id)
+        expires_at = time.time() + SESSION_IDLE_SECONDS
+        conn.execute(
+            "INSERT INTO sessions (session_hash, user_id, expires_at) VALUES (?, ?, ?)",
+            (key, user_id, expires_at),
+        )
+        conn.commit()
+        with self._lock:
+            self._add(key, Session(user_id=user_id, expires_at=expires_at))
+        return session_id
+
+    def resolve(self, conn: sqlite3.Connection, session_id: str) -> Optional[Session]:
+        """
+        Return the live session for an ID and extend its expiry, or None if the session
+        is unknown or has expired.
+
+        Sessions created by another worker are loaded from the database on first use.
+        """
+        key = _digest(session_id)
+        now = time.time()
+        session = self._sessions.get(key)
+        if session is None:
+            row = conn.execute(
+                "SELECT user_id, expires_at FROM sessions WHERE session_hash = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            session = Session(user_id=row["user_id"], expires_at=row["expires_at"])
+            with self._lock:
+                self._add(key, session)
+
+        if session.expires_at <= now:
+            self._discard(conn, [key])
+            return None
+
+        session.expires_at = now + SESSION_IDLE_SECONDS
+        session.dirty = True
+        return session
+
+    def delete(self, conn: sqlite3.Connection, session_id: str) -> None:
+        """End a single session (logout)."""
+        self._discard(conn, [_digest(session_id)])
+
+    def delete_user_sessions(self, conn: sqlite3.Connection, user_id: int) -> None:
+        """End every session of a user, including ones only known to other workers."""
+        with self._lock:
+            keys = list(self._by_user.get(user_id, ()))
+        self._discard(conn, keys)
+        conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+        conn.commit()
+
+    def forget_principal(self, user_id: int) -> None:
+        """Drop the principal stored on a user's sessions after their row changed."""
+        with self._lock:
+            for key in self._by_user.get(user_id, ()):
+                self._sessions[key].principal = None
+
+    def load(self, conn: sqlite3.Connection) -> None:
+        """Purge expired sessions and load the rest. Called once at startup."""
+        now = time.time()
+        conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+        conn.commit()
+        rows = conn.execute(
+            "SELECT session_hash, user_id, expires_at FROM sessions"
+        ).fetchall()
+        with self._lock:
+            for key, user_id, expires_at in rows:
+                self._add(key, Session(user_id=user_id, expires_at=expires_at))
+
+    def checkpoint(self, conn: sqlite3.Connection) -> None:
+        """Persist extended expiry times and drop expired sessions."""
+        now = time.time()
+        with self._lock:
+            updates = []
+            expired = []
+            for key, session in self._sessions.items():
+                if session.expires_at <= now:
+                    expired.append(key)
+                elif session.dirty:
+                    session.dirty = False
+                    updates.append((session.expires_at, key))
+        if updates:
+            # MAX() so a worker with an older view never shortens another worker's extension
+            conn.executemany(
+                "UPDATE sessions SET expires_at = MAX(expires_at, ?) WHERE session_hash = ?",
+                updates,
+            )
+            conn.commit()
+        self._discard(conn, expired)
+
+    def sync(self, conn: sqlite3.Connection) -> None:
+        """Drop the in-memory sessions whose row was deleted, e.g. by another worker."""
+        with self._lock:
+            # sessions created after this snapshot have their row already
+            keys = list(self._sessions)
+        gone = []
+        for start in range(0, len(keys), SESSION_SYNC_BATCH_SIZE):
+            batch = keys[start : start + SESSION_SYNC_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            found = {
+                row[0]
+                for row in conn.execute(
+                    f"SELECT session_hash FROM sessions WHERE session_hash IN ({placeholders})",
+                    batch,
+                )
+            }
+            gone.extend(key for key in batch if key not in found)
+        self._forget(gone)
+
+    def _add(self, key: str, session: Session) -> None:
+        self._sessions[key] = session
+        self._by_user.setdefault(session.user_id, set()).add(key)
+
+    def _forget(self, keys: list[str]) -> None:
+        """Remove sessions from memory only."""
+        with self._lock:
+            for key in keys:
+                session = self._sessions.pop(key, None)
+                if session is not None:
+                    user_keys = self._by_user.get(session.user_id)
+                    if user_keys is not None:
+                        user_keys.discard(key)
+                        if not user_keys:
+                            del self._by_user[session.user_id]
+
+    def _discard(self, conn: sqlite3.Connection, keys: list[str]) -> None:
+        if not keys:
+            return
+        self._forget(keys)
+        conn.executemany(
+            "DELETE FROM sessions WHERE session_hash = ?", [(key,) for key in keys]
+        )
+        conn.commit()
+
+
+session_store = SessionStore()
+
+
+class SessionCheckpointer:
+    """
+    Background thread that calls ``session_store.sync`` every ``SESSION_SYNC_SECONDS``
+    and ``session_store.checkpoint`` every ``SESSION_CHECKPOINT_SECONDS``.
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="session-checkpoint", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread after a final checkpoint."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        conn = self._connect()
+        last_checkpoint = time.monotonic()
+        try:
+            while not self._stop.wait(SESSION_SYNC_SECONDS):
+                self._sync(conn)
+                if time.monotonic() - last_checkpoint >= SESSION_CHECKPOINT_SECONDS:
+                    self._checkpoint(conn)
+                    last_checkpoint = time.monotonic()
+            self._checkpoint(conn)
+        finally:
+            conn.close()
+
+    def _sync(self, conn: sqlite3.Connection) -> None:
+        try:
+            session_store.sync(conn)
+        except sqlite3.Error:
+            logger.exception("Session sync failed")
+
+    def _checkpoint(self, conn: sqlite3.Connection) -> None:
+        try:
+            session_store.checkpoint(conn)
+        except sqlite3.Error:
+            logger.exception("Session checkpoint failed")
@@ -0,0 +1,123 @@
+"""
+Normalized skills and the user-skill inverted index.
+
+``users.skills`` stays the free-text, comma-separated string users type in. Each entry is
+normalized (lower-cased, whitespace collapsed) into the ``skills`` dictionary, and
+``user_skills`` holds one posting per (skill, user), keyed by ``skill_id`` first so the
+users having a skill are read straight off its posting list.
+"""
+
+import sqlite3
+from typing import Iterable, Literal
+
+MAX_SKILLS_PER_QUERY = 20
+
+
+def normalize_skill(skill: str) -> str:
+    return " ".join(skill.lower().split())
+
+
+def parse_skills(skills: str | None) -> set[str]:
+    """Split a comma-separated skills string into normalized skill names."""
+    if not skills:
+        return set()
+    return {name for name in map(normalize_skill, skills.split(",")) if name}
+
+
+def sync_user_skills(
+    conn: sqlite3.Connection, user_id: int, skills: str | None
+) -> None:
+    """
+    Bring the postings of one user in line with their skills string, only touching
+    the skills that were added or removed. The caller commits.
+    """
+    wanted = parse_skills(skills)
+    current = {
+        row[0]: row[1]
+        for row in conn.execute(
+            """
+            SELECT s.name, s.skill_id
+            FROM user_skills us
+            JOIN skills s ON s.skill_id = us.skill_id
+            WHERE us.user_id = ?
+            """,
+            (user_id,),
+        )
+    }
+
+    removed = [current[name] for name in current.keys() - wanted]
+    if removed:
+        conn.executemany(
+            "DELETE FROM user_skills WHERE skill_id = ? AND user_id = ?",
+            [(skill_id, user_id) for skill_id in removed],
+        )
+
+    added = wanted - current.keys()
+    if added:
+        conn.executemany(
+            "INSERT OR IGNORE INTO skills (name) VALUES (?)",
+            [(name,) for name in added],
+        )
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO user_skills (skill_id, user_id)
+            SELECT skill_id, ? FROM skills WHERE name = ?
+            """,
+            [(user_id, name) for name in added],
+        )
+
+
+def backfill_user_skills(conn: sqlite3.Connection) -> int:
+    """
+    Index users with a skills string but no postings, e.g. rows written by the populate
+    scripts or created before the index existed. Returns the number of users indexed.
+    """
+    rows = conn.execute(
+        """
+        SELECT user_id, skills
+        FROM users
+        WHERE skills != '' AND user_id NOT IN (SELECT user_id FROM user_skills)
+        """
+    ).fetchall()
+    for user_id, skills in rows:
+        sync_user_skills(conn, user_id, skills)
+    return len(rows)
+
+
+def skills_filter_sql(
+    conn: sqlite3.Connection,
+    skills: Iterable[str],
+    match: Literal["any", "all"] = "any",
+) -> tuple[str, list[object]] | None:
+    """
+    Build a condition on ``u.user_id`` selecting users with any or all of ``skills``.
+
+    The condition only reads the postings of the requested skills. Returns None when
+    no user can match, i.e. none of the skills exist, or one is missing for "all".
+    """
+    names = {normalize_skill(skill) for skill in skills} - {""}
+    if not names:
+        return None
+    skill_ids = [
+        row[0]
+        for row in conn.execute(
+            f"SELECT skill_id FROM skills WHERE name IN ({', '.join('?' for _ in names)})",
+            list(names),
+        )
+    ]
+    if not skill_ids or (match == "all" and len(skill_ids) < len(names)):
+        return None
+
+    placeholders = ", ".join("?" for _ in skill_ids)
+    if match == "all" and len(skill_ids) > 1:
+        return (
+            f"""u.user_id IN (
+                SELECT user_id FROM user_skills WHERE skill_id IN ({placeholders})
+                GROUP BY user_id HAVING COUNT(*) = ?
+            )""",
+            [*skill_ids, len(skill_ids)],
+        )
+    return (
+        f"u.user_id IN (SELECT user_id FROM user_skills WHERE skill_id IN ({placeholders}))",
+        skill_ids,
+    )
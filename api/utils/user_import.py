@@ -0,0 +1,216 @@
+"""
+Bulk import of volunteers from a CSV upload.
+
+Rows are read lazily from the uploaded file (which Starlette spools to disk once it is
+large), validated, and written ``IMPORT_BATCH_SIZE`` at a time: one transaction per batch,
+with ``executemany`` for users, interests, credentials and roles. Only the current batch
+and a capped list of row errors are held in memory, however large the file is.
+
+Imported users get ``PENDING_INVITE_HASH`` as their credential and set a password through
+the reset flow.
+"""
+
+import csv
+import io
+import sqlite3
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, Optional
+
+from pydantic import ValidationError
+
+from models.user import UserIn
+from utils.security import PENDING_INVITE_HASH
+from utils.skills import sync_user_skills
+from utils.user_search import index_user
+
+IMPORT_BATCH_SIZE = 500
+# row errors listed in the report; later ones are only counted
+IMPORT_MAX_ERRORS = 1000
+
+IMPORT_REQUIRED_COLUMNS = ("email", "first_name", "last_name")
+# interests are given in one column, separated by this character
+INTEREST_SEPARATOR = ";"
+
+AVAILABILITY_OPTIONS = {"Mornings", "Afternoons", "Evenings", "Weekends", "Flexible"}
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+    # set when reading the file stopped early
+    aborted: Optional[str] = None
+
+    def add_error(self, row: int, email: Optional[str], error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "email": email, "error": error})
+
+
+class ImportFileError(ValueError):
+    """The upload can't be read as an import file at all (encoding, header)."""
+
+
+def read_import_rows(file: BinaryIO) -> Iterator[tuple[int, dict[str, str]]]:
+    """
+    Check the CSV header and return an iterator of ``(line number, row)`` pairs, the
+    header being line 1.
+
+    Raises ``ImportFileError`` right away if the header is unreadable or lacks required
+    columns, and from the iterator if a later line can't be decoded.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    try:
+        header = reader.fieldnames or []
+    except (UnicodeDecodeError, csv.Error):
+        raise ImportFileError("File must be a UTF-8 encoded CSV")
+    missing = [column for column in IMPORT_REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ImportFileError(f"Missing required columns: {', '.join(missing)}")
+
+    def rows() -> Iterator[tuple[int, dict[str, str]]]:
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ImportFileError(f"Unreadable CSV after line {reader.line_num}: {exc}")
+
+    return rows()
+
+
+def _parse_row(row: dict[str, str]) -> UserIn:
+    interests = row.get("interests") or ""
+    user = UserIn(
+        email=(row.get("email") or "").strip(),
+        first_name=(row.get("first_name") or "").strip(),
+        last_name=(row.get("last_name") or "").strip(),
+        availability=(row.get("availability") or "").strip() or None,
+        skills=(row.get("skills") or "").strip(),
+        interests=[
+            interest.strip()
+            for interest in interests.split(INTEREST_SEPARATOR)
+            if interest.strip()
+        ],
+    )
+    if not user.first_name or not user.last_name:
+        raise ValueError("first_name and last_name are required")
+    if user.availability is not None and user.availability not in AVAILABILITY_OPTIONS:
+        raise ValueError(f"Invalid availability: {user.availability}")
+    return user
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def import_users(
+    conn: sqlite3.Connection,
+    organization_id: int,
+    rows: Iterator[tuple[int, dict[str, str]]],
+) -> ImportReport:
+    """Validate and insert ``rows`` batch by batch, adding each user as a volunteer."""
+    report = ImportReport()
+    batch: list[tuple[int, UserIn]] = []
+    try:
+        for line, row in rows:
+            try:
+                batch.append((line, _parse_row(row)))
+            except ValidationError as exc:
+                report.add_error(line, row.get("email"), _validation_message(exc))
+            except ValueError as exc:
+                report.add_error(line, row.get("email"), str(exc))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _insert_batch(conn, organization_id, batch, report)
+                batch = []
+    except ImportFileError as exc:
+        # rows before the unreadable part are still imported, the rest is skipped
+        report.aborted = str(exc)
+    if batch:
+        _insert_batch(conn, organization_id, batch, report)
+    report.errors.sort(key=lambda error: error["row"])
+    return report
+
+
+def _insert_batch(
+    conn: sqlite3.Connection,
+    organization_id: int,
+    batch: list[tuple[int, UserIn]],
+    report: ImportReport,
+) -> None:
+    # emails are unique case-sensitively in the users table, like in signup
+    emails = [user.email for _, user in batch]
+    existing = {
+        row[0]
+        for row in conn.execute(
+            f"SELECT email FROM users WHERE email IN ({', '.join('?' for _ in emails)})",
+            emails,
+        )
+    }
+    new_users: dict[str, UserIn] = {}
+    for line, user in batch:
+        if user.email in existing:
+            report.add_error(line, user.email, "A user with this email already exists")
+        elif user.email in new_users:
+            report.add_error(line, user.email, "Duplicate email in file")
+        else:
+            new_users[user.email] = user
+    if not new_users:
+        return
+
+    try:
+        conn.executemany(
+            """
+            INSERT INTO users (email, first_name, last_name, availability, skills)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (u.email, u.first_name, u.last_name, u.availability, u.skills)
+                for u in new_users.values()
+            ],
+        )
+        user_ids = dict(
+            conn.execute(
+                f"""
+                SELECT email, user_id FROM users
+                WHERE email IN ({", ".join("?" for _ in new_users)})
+                """,
+                list(new_users),
+            ).fetchall()
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO user_interests (user_id, category) VALUES (?, ?)",
+            [
+                (user_ids[email], category)
+                for email, user in new_users.items()
+                for category in user.interests
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO credentials (user_id, hashed_password) VALUES (?, ?)",
+            [(user_id, PENDING_INVITE_HASH) for user_id in user_ids.values()],
+        )
+        conn.executemany(
+            """
+            INSERT INTO roles (user_id, organization_id, permission_level)
+            VALUES (?, ?, 'volunteer')
+            """,
+            [(user_id, organization_id) for user_id in user_ids.values()],
+        )
+        for email, user in new_users.items():
+            index_user(conn, user_ids[email], email, user.first_name, user.last_name)
+            sync_user_skills(conn, user_ids[email], user.skills)
+        conn.commit()
+    except sqlite3.Error as exc:
+        # e.g. a concurrent signup took one of the emails; nothing of the batch is kept
+        conn.rollback()
+        for line, user in batch:
+            if new_users.get(user.email) is user:
+                report.add_error(line, user.email, f"Batch failed: {exc}")
+        return
+
+    report.imported += len(new_users)
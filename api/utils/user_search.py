@@ -0,0 +1,127 @@
+"""
+Trigram index for fuzzy user search.
+
+Every user's email, first name and last name are split into lower-cased words, and each
+word is padded (two spaces in front, one behind) and cut into three-character trigrams.
+The distinct trigrams of a user are stored in ``user_trigrams`` keyed by
+``(trigram, user_id)``, so a search only reads the posting lists of the trigrams in the
+query instead of scanning the users table.
+
+Users are ranked by how many of the query's trigrams they share. Requiring only a share
+of them (``MIN_TRIGRAM_SIMILARITY``) makes the match tolerant to typos: "jonh" still
+finds "John", because most of their trigrams are the same.
+"""
+
+import math
+import re
+import sqlite3
+from typing import Iterable, Optional, Sequence
+
+# fraction of the query's trigrams a user must share to count as a match
+MIN_TRIGRAM_SIMILARITY = 0.4
+# longer queries are truncated, so a search never binds an unbounded number of trigrams
+MAX_QUERY_LENGTH = 100
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def trigrams(*values: Optional[str]) -> set[str]:
+    """Return the padded trigrams of every word in ``values``."""
+    grams: set[str] = set()
+    for value in values:
+        if not value:
+            continue
+        for word in _WORD_RE.findall(value.lower()):
+            padded = f"  {word} "
+            grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def index_user(
+    conn: sqlite3.Connection,
+    user_id: int,
+    email: str,
+    first_name: str,
+    last_name: str,
+) -> None:
+    """
+    (Re)build the trigram entries of one user. Call after inserting a user or changing
+    their email or name; the caller commits.
+    """
+    conn.execute("DELETE FROM user_trigrams WHERE user_id = ?", (user_id,))
+    conn.executemany(
+        "INSERT INTO user_trigrams (trigram, user_id) VALUES (?, ?)",
+        [(gram, user_id) for gram in trigrams(email, first_name, last_name)],
+    )
+
+
+def backfill_user_trigrams(conn: sqlite3.Connection) -> int:
+    """
+    Index users that have no trigram entries yet, e.g. rows written by the populate
+    scripts or created before the index existed. Returns the number of users indexed.
+    """
+    rows = conn.execute(
+        """
+        SELECT user_id, email, first_name, last_name
+        FROM users
+        WHERE user_id NOT IN (SELECT user_id FROM user_trigrams)
+        """
+    ).fetchall()
+    for user_id, email, first_name, last_name in rows:
+        index_user(conn, user_id, email, first_name, last_name)
+    return len(rows)
+
+
+def search_user_ids(
+    conn: sqlite3.Connection,
+    query: str,
+    limit: int,
+    skip: int = 0,
+    conditions: Sequence[str] = (),
+    params: Sequence[object] = (),
+) -> list[int]:
+    """
+    Return one page of user IDs matching ``query``, best match first.
+
+    ``conditions`` are extra SQL filters on the users table aliased as ``u``, with their
+    ``params``. Ties are broken by ``user_id`` so pagination is stable.
+    """
+    grams = sorted(trigrams(query[:MAX_QUERY_LENGTH]))
+    if not grams:
+        return []
+    min_hits = max(1, math.ceil(len(grams) * MIN_TRIGRAM_SIMILARITY))
+
+    sql = f"""
+        SELECT t.user_id, COUNT(*) AS hits
+        FROM user_trigrams t
+        {"JOIN users u ON u.user_id = t.user_id" if conditions else ""}
+        WHERE t.trigram IN ({", ".join("?" for _ in grams)})
+        {"".join(f" AND {condition}" for condition in conditions)}
+        GROUP BY t.user_id
+        HAVING hits >= ?
+        ORDER BY hits DESC, t.user_id
+        LIMIT ? OFFSET ?
+    """
+    return [
+        row[0] for row in conn.execute(sql, [*grams, *params, min_hits, limit, skip])
+    ]
+
+
+def load_interests(
+    conn: sqlite3.Connection, user_ids: Iterable[int]
+) -> dict[int, list[str]]:
+    """Map each of ``user_ids`` to its interest categories."""
+    user_ids = list(user_ids)
+    interests: dict[int, list[str]] = {user_id: [] for user_id in user_ids}
+    if not user_ids:
+        return interests
+    rows = conn.execute(
+        f"""
+        SELECT user_id, category FROM user_interests
+        WHERE user_id IN ({", ".join("?" for _ in user_ids)})
+        """,
+        user_ids,
+    )
+    for user_id, category in rows:
+        interests[user_id].append(category)
+    return interests
@@ -19,7 +19,11 @@ import {
 import { useRoles } from "@/context/RolesContext";
 import { getEventById, updateEvent } from "@/lib/events";
 import { getOrganizations } from "@/lib/organizations";
-import { EVENT_CATEGORIES, type EventCategory } from "@/models/eventCategories";
+import {
+  EVENT_CATEGORIES,
+  getEventCategoryLabel,
+  type EventCategory,
+} from "@/models/eventCategories";
 import type { Event } from "@/models/event";
 import type { Organization } from "@/models/organizations";
 
@@ -73,7 +77,9 @@ const EditEventPage = (props: EditEventPageProps) => {
         setDate(toDateString(ev.date_time));
         setTime(toTimeString(ev.date_time));
         setOrganizationId(String(ev.organization_id));
-        setCategory(ev.category ?? NO_CATEGORY);
+        setCategory(
+          ev.category ? (getEventCategoryLabel(ev.category) as EventCategory) : NO_CATEGORY,
+        );
         setOrganizations(orgs);
       })
       .catch(() => setError("Failed to load event data."))
@@ -9,6 +9,7 @@ import { Skeleton } from "@/components/ui/skeleton";
 import { useRoles } from "@/context/RolesContext";
 import { useCurrentUserId } from "@/lib/useCurrentUserId";
 import { Event } from "@/models/event";
+import { getEventCategoryLabel } from "@/models/eventCategories";
 import Link from "next/link";
 import { useRouter } from "next/navigation";
 import { use, useEffect, useState } from "react";
@@ -185,7 +186,9 @@ const EventDetailPage = (props: PageProps) => {
             <div className="flex items-start justify-between gap-4 flex-wrap">
               <CardTitle className="text-3xl">{event.name}</CardTitle>
               <div className="flex gap-2 flex-wrap">
-                {event.category && <Badge variant="secondary">{event.category}</Badge>}
+                {event.category && (
+                  <Badge variant="secondary">{getEventCategoryLabel(event.category)}</Badge>
+                )}
               </div>
             </div>
 
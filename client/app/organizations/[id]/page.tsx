@@ -9,12 +9,10 @@ import { Separator } from "@/components/ui/separator";
 import { Skeleton } from "@/components/ui/skeleton";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { useRoles } from "@/context/RolesContext";
-import { useCurrentUserId } from "@/lib/useCurrentUserId";
-import { Event } from "@/models/event";
 import { getOrganizationCategoryLabel } from "@/models/organizationCategories";
-import { Organization, RoleAndUser } from "@/models/organizations";
+import { OrganizationOverview } from "@/models/organizations";
 import Link from "next/link";
-import { use, useEffect, useState } from "react";
+import { use, useCallback, useEffect, useState } from "react";
 
 interface PageProps {
   params: Promise<{ id: string }>;
@@ -24,45 +22,36 @@ const IndividualOrganizationPage = (props: PageProps) => {
   const params = use(props.params);
   const orgId = Number(params.id);
 
-  const [org, setOrg] = useState<Organization | null>(null);
-  const [members, setMembers] = useState<RoleAndUser[]>([]);
-  const [events, setEvents] = useState<Event[]>([]);
+  const [overview, setOverview] = useState<OrganizationOverview | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [joining, setJoining] = useState(false);
   const [joinSuccess, setJoinSuccess] = useState(false);
   const { refreshRoles } = useRoles();
-  const currentUserId = useCurrentUserId();
+
+  // Organization, member count, admins, upcoming events and the caller's role in a
+  // single request
+  const fetchOverview = useCallback(async () => {
+    const res = await fetch(`/api/organization/${orgId}/overview`, {
+      credentials: "include",
+    });
+    if (res.status === 404) {
+      setError("Organization not found.");
+      return;
+    }
+    if (!res.ok) {
+      setError("Failed to load organization.");
+      return;
+    }
+    setOverview(await res.json());
+  }, [orgId]);
 
   useEffect(() => {
-    const fetchAll = async () => {
+    const load = async () => {
       setLoading(true);
       setError(null);
       try {
-        const [orgRes, membersRes, eventsRes] = await Promise.all([
-          fetch(`/api/organization/${orgId}`),
-          fetch(`/api/organization/${orgId}/users`),
-          fetch(`/api/events?organization_id=${orgId}`),
-        ]);
-
-        if (orgRes.status === 404) {
-          setError("Organization not found.");
-          return;
-        }
-        if (!orgRes.ok) {
-          setError("Failed to load organization.");
-          return;
-        }
-
-        const [orgData, membersData, eventsData] = await Promise.all([
-          orgRes.json(),
-          membersRes.ok ? membersRes.json() : [],
-          eventsRes.ok ? eventsRes.json() : [],
-        ]);
-
-        setOrg(orgData);
-        setMembers(membersData);
-        setEvents(eventsData);
+        await fetchOverview();
       } catch {
         setError("An unexpected error occurred.");
       } finally {
@@ -70,8 +59,8 @@ const IndividualOrganizationPage = (props: PageProps) => {
       }
     };
 
-    fetchAll();
-  }, [orgId]);
+    load();
+  }, [fetchOverview]);
 
   const handleJoin = async () => {
     setJoining(true);
@@ -85,9 +74,8 @@ const IndividualOrganizationPage = (props: PageProps) => {
       if (res.ok) {
         setJoinSuccess(true);
         await refreshRoles();
-        // Refresh member list
-        const updated = await fetch(`/api/organization/${orgId}/users`);
-        if (updated.ok) setMembers(await updated.json());
+        // Refresh member count and role
+        await fetchOverview();
       }
     } finally {
       setJoining(false);
@@ -113,7 +101,7 @@ const IndividualOrganizationPage = (props: PageProps) => {
     );
   }
 
-  if (error || !org) {
+  if (error || !overview) {
     return (
       <div>
         <NavBar />
@@ -129,10 +117,9 @@ const IndividualOrganizationPage = (props: PageProps) => {
     );
   }
 
-  const isAdmin =
-    currentUserId != null &&
-    members.some((m) => m.user_id === currentUserId && m.permission_level === "admin");
-  const isMember = members.some((m) => m.user_id === 1);
+  const { organization: org, member_count, admins, upcoming_events } = overview;
+  const isAdmin = overview.my_role === "admin";
+  const isMember = overview.my_role != null;
 
   return (
     <div>
@@ -175,17 +162,19 @@ const IndividualOrganizationPage = (props: PageProps) => {
 
         <Tabs defaultValue="members">
           <TabsList className="mb-6">
-            <TabsTrigger value="members">Members ({members.length})</TabsTrigger>
-            <TabsTrigger value="events">Events ({events.length})</TabsTrigger>
+            <TabsTrigger value="members">Members ({member_count})</TabsTrigger>
+            <TabsTrigger value="events">
+              Upcoming Events ({upcoming_events.length})
+            </TabsTrigger>
           </TabsList>
 
           {/* Members tab */}
           <TabsContent value="members">
-            {members.length === 0 ? (
+            {member_count === 0 ? (
               <p className="text-muted-foreground text-sm">No members yet.</p>
             ) : (
               <div className="flex flex-col gap-2">
-                {members.map((member) => (
+                {admins.map((member) => (
                   <Card key={member.user_id} className="py-0">
                     <CardHeader className="flex flex-row items-center justify-between py-3 px-4">
                       <CardTitle className="text-base font-medium">
@@ -201,13 +190,18 @@ const IndividualOrganizationPage = (props: PageProps) => {
                     </CardHeader>
                   </Card>
                 ))}
+                <Button asChild variant="link" className="self-start px-0">
+                  <Link href={`/organizations/${orgId}/users`}>
+                    View all {member_count} members
+                  </Link>
+                </Button>
               </div>
             )}
           </TabsContent>
 
           {/* Events tab */}
           <TabsContent value="events">
-            <EventCarousel events={events} />
+            <EventCarousel events={upcoming_events} />
           </TabsContent>
         </Tabs>
       </main>
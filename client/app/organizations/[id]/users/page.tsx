@@ -37,6 +37,8 @@ import type { PermissionLevel } from "@/models/roles";
 import { use, useEffect, useState } from "react";
 import { toast } from "sonner";
 
+const MEMBERS_PAGE_SIZE = 50;
+
 interface PageProps {
   params: Promise<{ id: string }>;
 }
@@ -47,9 +49,16 @@ const OrgUsersPage = (props: PageProps) => {
   const { roles } = useRoles();
 
   const [members, setMembers] = useState<RoleAndUser[]>([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
+  // Member list filters
+  const [search, setSearch] = useState("");
+  const [levelFilter, setLevelFilter] = useState<PermissionLevel | "all">("all");
+
   // Add user form state
   const [addUserId, setAddUserId] = useState("");
   const [addPermission, setAddPermission] = useState<PermissionLevel>("volunteer");
@@ -59,28 +68,47 @@ const OrgUsersPage = (props: PageProps) => {
     (r) => r.organization_id === orgId && r.permission_level === "admin",
   );
 
-  const fetchMembers = async () => {
+  /**
+   * Load the first page of members matching the filters, or the page after `cursor`
+   * which is appended to the current list.
+   */
+  const fetchMembers = async (cursor: string | null = null) => {
+    const query = new URLSearchParams({ limit: String(MEMBERS_PAGE_SIZE) });
+    if (search.trim()) query.set("query", search.trim());
+    if (levelFilter !== "all") query.set("permission_level", levelFilter);
+    if (cursor) query.set("cursor", cursor);
     try {
-      const res = await fetch(`/api/organization/${orgId}/users`);
+      const res = await fetch(`/api/organization/${orgId}/users?${query}`);
       if (!res.ok) {
         setError("Failed to load members.");
         return;
       }
-      setMembers(await res.json());
+      const page: RoleAndUser[] = await res.json();
+      setMembers((prev) => (cursor ? [...prev, ...page] : page));
+      setTotal(Number(res.headers.get("X-Total-Count") ?? page.length));
+      setNextCursor(res.headers.get("X-Next-Cursor"));
     } catch {
       setError("An unexpected error occurred.");
     }
   };
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    await fetchMembers(nextCursor);
+    setLoadingMore(false);
+  };
+
   useEffect(() => {
     const init = async () => {
       setLoading(true);
       await fetchMembers();
       setLoading(false);
     };
-    init();
+    // debounce so typing in the search box doesn't fire a request per keystroke
+    const timeout = setTimeout(init, 300);
+    return () => clearTimeout(timeout);
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [orgId]);
+  }, [orgId, search, levelFilter]);
 
   const handleAddUser = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -151,14 +179,6 @@ const OrgUsersPage = (props: PageProps) => {
     }
   };
 
-  if (loading) {
-    return (
-      <main className="container mx-auto px-4 py-8 max-w-3xl">
-        <p className="text-muted-foreground">Loading…</p>
-      </main>
-    );
-  }
-
   if (error) {
     return (
       <main className="container mx-auto px-4 py-8 max-w-3xl">
@@ -171,11 +191,34 @@ const OrgUsersPage = (props: PageProps) => {
     <main className="container mx-auto px-4 py-8 max-w-3xl space-y-6">
       <Card>
         <CardHeader>
-          <CardTitle>Members</CardTitle>
+          <CardTitle>Members ({total})</CardTitle>
         </CardHeader>
-        <CardContent>
-          {members.length === 0 ? (
-            <p className="text-muted-foreground text-sm">No members yet.</p>
+        <CardContent className="space-y-4">
+          <div className="flex flex-col gap-2 sm:flex-row">
+            <Input
+              aria-label="Search members"
+              placeholder="Search by name"
+              value={search}
+              onChange={(e) => setSearch(e.target.value)}
+            />
+            <Select
+              value={levelFilter}
+              onValueChange={(val) => setLevelFilter(val as PermissionLevel | "all")}
+            >
+              <SelectTrigger aria-label="Filter by role" className="w-36">
+                <SelectValue />
+              </SelectTrigger>
+              <SelectContent>
+                <SelectItem value="all">All roles</SelectItem>
+                <SelectItem value="volunteer">Volunteers</SelectItem>
+                <SelectItem value="admin">Admins</SelectItem>
+              </SelectContent>
+            </Select>
+          </div>
+          {loading ? (
+            <p className="text-muted-foreground text-sm">Loading…</p>
+          ) : members.length === 0 ? (
+            <p className="text-muted-foreground text-sm">No members found.</p>
           ) : (
             <Table>
               <TableHeader>
@@ -256,6 +299,11 @@ const OrgUsersPage = (props: PageProps) => {
               </TableBody>
             </Table>
           )}
+          {!loading && nextCursor && (
+            <Button variant="outline" onClick={handleLoadMore} disabled={loadingMore}>
+              {loadingMore ? "Loading…" : "Load more"}
+            </Button>
+          )}
         </CardContent>
       </Card>
 
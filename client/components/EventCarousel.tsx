@@ -16,6 +16,7 @@ import {
 } from "@/components/ui/dialog";
 import { Button } from "@/components/ui/button";
 import { Event } from "@/models/event";
+import { getEventCategoryLabel } from "@/models/eventCategories";
 import { CalendarDays, MapPin } from "lucide-react";
 import { useState } from "react";
 import { useRouter } from "next/navigation";
@@ -121,7 +122,7 @@ const EventCarousel = ({ events, groupByCategory = false }: EventCarouselProps)
   if (groupByCategory) {
     const categoryMap = new Map<string, Event[]>();
     for (const event of events) {
-      const key = event.category ?? "Other";
+      const key = event.category ? getEventCategoryLabel(event.category) : "Other";
       const group = categoryMap.get(key) ?? [];
       group.push(event);
       categoryMap.set(key, group);
@@ -71,6 +71,8 @@ export interface Event {
   location: string;
   /** ISO 8601 datetime string (e.g., "2026-02-17T08:00:00") */
   date_time: string;
+  /** Optional ISO 8601 end datetime, events without one are treated as lasting an hour */
+  end_date_time?: string | null;
   organization_id: number;
 
   category: EventCategory | null;
@@ -86,6 +88,7 @@ export interface EventIn {
   location: string;
   /** ISO 8601 datetime string (e.g., "2026-03-15T14:00:00") */
   date_time: string;
+  end_date_time?: string | null;
   organization_id: number;
   category?: EventCategory | null;
 }
@@ -1,3 +1,5 @@
+import { getOrganizationCategoryLabel } from "./organizationCategories";
+
 export const EVENT_CATEGORIES = [
   "Animal Welfare",
   "Hunger and Food Security",
@@ -22,3 +24,11 @@ export const EVENT_CATEGORIES = [
 ] as const;
 
 export type EventCategory = (typeof EVENT_CATEGORIES)[number];
+
+/**
+ * The API returns event categories as slugs (e.g. "arts_and_culture"); this maps one back
+ * to its display name, leaving unknown values untouched.
+ */
+export function getEventCategoryLabel(value: string): string {
+  return getOrganizationCategoryLabel(value);
+}
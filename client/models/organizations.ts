@@ -1,4 +1,6 @@
+import { Event } from "./event";
 import { OrganizationCategoryValue } from "./organizationCategories";
+import { PermissionLevel, RoleAndUser } from "./roles";
 
 export interface Organization {
   organization_id: number;
@@ -8,4 +10,16 @@ export interface Organization {
   created_by_user_id: number;
 }
 
-export type { RoleAndUser } from "@/models/roles";
+export interface EventWithRegistrationCount extends Event {
+  registration_count: number;
+}
+
+export interface OrganizationOverview {
+  organization: Organization;
+  member_count: number;
+  admins: RoleAndUser[];
+  upcoming_events: EventWithRegistrationCount[];
+  my_role: PermissionLevel | null;
+}
+
+export type { RoleAndUser };